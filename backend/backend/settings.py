@@ -1,5 +1,6 @@
 from os import getenv, path
 from pathlib import Path
+from tempfile import gettempdir
 from datetime import timedelta
 from django.core.management.utils import get_random_secret_key
 import dotenv
@@ -28,11 +29,15 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'django_filters',
     'drf_yasg',
     'users',
     'bancos',
+    'transacoes',
+    'painel',
+    'investimentos',
 ]
 
 MIDDLEWARE = [
@@ -46,6 +51,7 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'users.middleware.LogRequestMiddleware',
+    'users.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
@@ -71,12 +77,134 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# DB_ENGINE=sqlite (padrão) ou postgresql. DB_REPLICA_NAME (SQLite) ou
+# DB_REPLICA_HOST (PostgreSQL) criam o alias 'replica', usado pelas leituras
+# das requisições GET/HEAD (ver users.replica).
+DB_ENGINE = getenv('DB_ENGINE', 'sqlite')
+# Segundos que uma conexão é reaproveitada entre requisições (0 = uma por
+# requisição). Padrão 60 no PostgreSQL (com CONN_HEALTH_CHECKS); no SQLite
+# abrir a conexão é barato e não há verificação de saúde, então 0
+DB_CONN_MAX_AGE = int(getenv('DB_CONN_MAX_AGE', '60' if DB_ENGINE == 'postgresql' else '0'))
+
+if DB_ENGINE == 'postgresql':
+    # Pool de conexões do Django (requer psycopg 3); 0 = conexões persistentes
+    DB_POOL_MAX = int(getenv('DB_POOL_MAX', '0'))
+
+    def _banco_postgresql(host, port):
+        banco = {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': getenv('DB_NAME', 'investsmart'),
+            'USER': getenv('DB_USER', 'postgres'),
+            'PASSWORD': getenv('DB_PASSWORD', ''),
+            'HOST': host,
+            'PORT': port,
+            'CONN_MAX_AGE': 0 if DB_POOL_MAX else DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+        if DB_POOL_MAX:
+            banco['OPTIONS']['pool'] = {
+                'min_size': int(getenv('DB_POOL_MIN', '2')),
+                'max_size': DB_POOL_MAX,
+                'timeout': int(getenv('DB_POOL_TIMEOUT', '10')),
+            }
+        return banco
+
+    DATABASES = {'default': _banco_postgresql(getenv('DB_HOST', 'localhost'), getenv('DB_PORT', '5432'))}
+    if getenv('DB_REPLICA_HOST'):
+        DATABASES['replica'] = _banco_postgresql(getenv('DB_REPLICA_HOST'), getenv('DB_REPLICA_PORT', '5432'))
+else:
+    # WAL: leitores não esperam o escritor; synchronous=NORMAL é seguro com WAL
+    # (perde no máximo as últimas transações numa queda de energia, sem corromper)
+    SQLITE_PRAGMAS = ';'.join([
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA mmap_size={int(getenv('DB_SQLITE_MMAP', str(256 * 2**20)))}",
+        f"PRAGMA busy_timeout={int(getenv('DB_SQLITE_BUSY_TIMEOUT', '5000'))}",
+    ])
+
+    def _banco_sqlite(nome):
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': nome,
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'init_command': SQLITE_PRAGMAS,
+                # As transações ficam DEFERRED (leitores não esperam); os
+                # trechos que leem e depois escrevem usam users.db.atomic_escrita
+            },
+        }
+
+    DATABASES = {'default': _banco_sqlite(getenv('DB_NAME', BASE_DIR / 'db.sqlite3'))}
+    if getenv('DB_REPLICA_NAME'):
+        DATABASES['replica'] = _banco_sqlite(getenv('DB_REPLICA_NAME'))
+
+if 'replica' in DATABASES:
+    # Nos testes a réplica aponta para o banco de teste principal
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['users.replica.ReplicaRouter']
+# Após uma escrita, as leituras do mesmo IP vão ao principal por alguns
+# segundos, cobrindo o atraso de replicação
+DB_REPLICA_FIXAR_SEGUNDOS = int(getenv('DB_REPLICA_FIXAR_SEGUNDOS', '5'))
+
+# Cache
+# Redis quando REDIS_URL estiver definido (compartilhado entre workers),
+# senão cache local em memória por processo. Com mais de um worker o Redis é
+# obrigatório: sem ele cada processo tem os próprios limites de tentativas
+# (users.throttling); ver 'manage.py check --deploy'.
+REDIS_URL = getenv('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
-}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'investsmart',
+        }
+    }
+
+# Cache do usuário autenticado (users.cache): LRU por processo e, opcionalmente,
+# o cache compartilhado (Redis) para os processos dividirem as consultas. Só
+# funciona com cache compartilhado (versão por usuário); sem ele cada
+# requisição consulta o banco
+USUARIOS_CACHE_TAMANHO = int(getenv('USUARIOS_CACHE_TAMANHO', '10000'))
+USUARIOS_CACHE_TTL = int(getenv('USUARIOS_CACHE_TTL', '30'))
+USUARIOS_CACHE_COMPARTILHADO = getenv('USUARIOS_CACHE_COMPARTILHADO', 'False') == 'True'
+USUARIOS_CACHE_TTL_COMPARTILHADO = int(getenv('USUARIOS_CACHE_TTL_COMPARTILHADO', '300'))
+
+# Métricas das requisições (users.metricas): um arquivo mapeado em memória
+# por worker, somados em /metrics. Em /dev/shm quando disponível
+METRICAS_ATIVAS = getenv('METRICAS_ATIVAS', 'True') == 'True'
+METRICAS_DIR = getenv(
+    'METRICAS_DIR',
+    '/dev/shm/investsmart-metricas' if path.isdir('/dev/shm') else path.join(gettempdir(), 'investsmart-metricas'),
+)
+# Vazio = /metrics só para conexões de loopback
+METRICAS_TOKEN = getenv('METRICAS_TOKEN', '')
+
+# Bancos
+# Idade máxima (segundos) do índice em memória do catálogo (bancos.catalogo)
+# antes de ser reconstruído em segundo plano; cobre alterações feitas por
+# outros processos, que os sinais não alcançam. 0 = só os sinais
+BANCOS_CATALOGO_TTL = int(getenv('BANCOS_CATALOGO_TTL', '300'))
+# A lista de bancos (/api/bancos/) só fica em cache e responde 304 sem
+# consultar o banco com o Redis; sem ele o ETag é o hash da lista montada
+
+# Investimentos
+# Taxas anuais usadas na avaliação da renda fixa pós-fixada
+INVESTIMENTOS_CDI_ANUAL = float(getenv('INVESTIMENTOS_CDI_ANUAL', '0.149'))
+INVESTIMENTOS_IPCA_ANUAL = float(getenv('INVESTIMENTOS_IPCA_ANUAL', '0.045'))
+# Séries diárias (CDI, SELIC, IPCA) em arrays mapeados em memória; ver carregar_series
+INVESTIMENTOS_SERIES_DIR = Path(getenv('INVESTIMENTOS_SERIES_DIR', BASE_DIR / 'dados' / 'series'))
+# Processos do pool das simulações de Monte Carlo (0 = um por CPU)
+INVESTIMENTOS_SIMULACAO_PROCESSOS = int(getenv('INVESTIMENTOS_SIMULACAO_PROCESSOS', '0'))
 
 # Emails settings
 # Configurações de Email
@@ -87,6 +215,9 @@ EMAIL_USE_TLS = getenv('EMAIL_USE_TLS', 'True') == 'True'
 EMAIL_HOST_USER = getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = getenv('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = getenv('DEFAULT_FROM_EMAIL', 'InvestSmart <noreply@investsmart.com>')
+# Os emails são enviados pelo comando enviar_emails; o timeout evita que um
+# servidor SMTP travado prenda o worker
+EMAIL_TIMEOUT = int(getenv('EMAIL_TIMEOUT', '30'))
 
 # Para desenvolvimento, usar console backend se não houver configuração de email
 if not EMAIL_HOST_USER:
@@ -107,6 +238,14 @@ USE_I18N = True
 USE_TZ = True
 
 # Logging Configuration
+# Com LOG_ASSINCRONO, os handlers abaixo rodam numa thread própria: a
+# requisição só enfileira o registro (users.logs). Fila cheia descarta
+LOG_ASSINCRONO = getenv('LOG_ASSINCRONO', 'True') == 'True'
+LOG_FILA_TAMANHO = int(getenv('LOG_FILA_TAMANHO', '10000'))
+# Fração das requisições com log de acesso (INFO) gravado; 1 = todas
+LOG_AMOSTRA_ACESSO = float(getenv('LOG_AMOSTRA_ACESSO', '1'))
+LOGGING_CONFIG = 'users.logs.configurar_logging'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -120,7 +259,7 @@ LOGGING = {
             'style': '{',
         },
         'json': {
-            'format': '%(asctime)s %(name)s %(levelname)s %(message)s',
+            '()': 'users.logs.FormatadorJSON',
         },
     },
     'filters': {
@@ -160,7 +299,7 @@ LOGGING = {
             'filename': 'logs/api.log',
             'maxBytes': 1024*1024*15,  # 15MB
             'backupCount': 10,
-            'formatter': 'verbose',
+            'formatter': 'json',
         },
     },
     'root': {
@@ -188,6 +327,16 @@ LOGGING = {
             'level': 'INFO',
             'propagate': False,
         },
+        'transacoes': {
+            'handlers': ['console', 'api_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'investimentos': {
+            'handlers': ['console', 'api_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     }
 }
 
@@ -198,6 +347,10 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'static'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Prefixo opcional das URLs de fotos de perfil (users.fotos), ex. um CDN.
+# Vazio = caminho relativo ('/api/users/fotos/...'), resolvido pelo cliente
+# contra o host da API
+FOTOS_URL_BASE = getenv('FOTOS_URL_BASE', '')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -208,7 +361,7 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
@@ -229,6 +382,17 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.FormParser',
     ],
     'EXCEPTION_HANDLER': 'users.exceptions.custom_exception_handler',
+    # Proxies reversos confiáveis à frente da aplicação; com 0 o IP do cliente
+    # é o REMOTE_ADDR e o X-Forwarded-For (que o cliente pode forjar) é ignorado
+    'NUM_PROXIES': int(getenv('NUM_PROXIES', '0')),
+    # Token buckets de users.throttling: '<action>_ip' e '<action>_conta' (CPF/email)
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': getenv('LIMITE_LOGIN_IP', '20/min'),
+        'login_conta': getenv('LIMITE_LOGIN_CONTA', '5/min'),
+        'create_ip': getenv('LIMITE_CADASTRO_IP', '10/hour'),
+        'esqueceu_a_senha_ip': getenv('LIMITE_SENHA_IP', '10/hour'),
+        'esqueceu_a_senha_conta': getenv('LIMITE_SENHA_CONTA', '3/hour'),
+    },
 }
 
 SIMPLE_JWT = {
@@ -256,6 +420,7 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.TokenRefreshSerializer',
 }
 
 # CORS Settings
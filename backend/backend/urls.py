@@ -10,6 +10,7 @@ from rest_framework_simplejwt.views import (
 )
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from users.views import metricas_prometheus
 
 # Configuração do Swagger
 schema_view = get_schema_view(
@@ -29,6 +30,9 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/users/', include("users.urls")),
     path('api/bancos/', include("bancos.urls")),
+    path('api/transacoes/', include("transacoes.urls")),
+    path('api/painel/', include("painel.urls")),
+    path('api/investimentos/', include("investimentos.urls")),
     
     # Endpoints JWT do SimpleJWT
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
@@ -40,4 +44,7 @@ urlpatterns = [
     re_path(r'^swagger/$', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     re_path(r'^redoc/$', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
     path('api/docs/', schema_view.with_ui('swagger', cache_timeout=0), name='api-docs'),
+    
+    # Métricas para o Prometheus (users.metricas)
+    path('metrics', metricas_prometheus, name='metricas'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
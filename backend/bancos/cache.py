@@ -0,0 +1,83 @@
+import hashlib
+import json
+import time
+
+from django.core.cache import cache
+
+CHAVE_VERSAO_USUARIO = 'bancos:versao:{user_id}'
+CHAVE_VERSAO_CATALOGO = 'bancos:versao:catalogo'
+CHAVE_LISTA = 'bancos:lista:{user_id}:{versao}:{pagina}'
+TIMEOUT_LISTA = 60 * 60
+
+
+def _versao_inicial():
+    # Se a chave de versão for descartada pelo cache, recomeça em um valor
+    # que não repete ETags já entregues.
+    return int(time.time() * 1000)
+
+
+def versao_lista(user_id):
+    """
+    Retorna a versão da lista de bancos do usuário no formato
+    '<versão do usuário>.<versão do catálogo>'. Só vale com um cache
+    compartilhado entre os workers (users.cache.cache_compartilhado).
+    """
+    chave_usuario = CHAVE_VERSAO_USUARIO.format(user_id=user_id)
+    versoes = cache.get_many([chave_usuario, CHAVE_VERSAO_CATALOGO])
+    versao_usuario = versoes.get(chave_usuario)
+    versao_catalogo = versoes.get(CHAVE_VERSAO_CATALOGO)
+    if versao_usuario is None:
+        versao_usuario = _versao_inicial()
+        cache.add(chave_usuario, versao_usuario, timeout=None)
+    if versao_catalogo is None:
+        versao_catalogo = _versao_inicial()
+        cache.add(CHAVE_VERSAO_CATALOGO, versao_catalogo, timeout=None)
+    return f"{versao_usuario}.{versao_catalogo}"
+
+
+def etag_lista(user_id, versao):
+    return f'"bancos-{user_id}-{versao}"'
+
+
+def etag_conteudo(user_id, dados):
+    """
+    ETag calculado a partir da própria lista, válido em qualquer processo.
+    Usado sem cache compartilhado: poupa a transferência, não a consulta.
+    """
+    conteudo = json.dumps(dados, sort_keys=True, default=str).encode('utf-8')
+    return f'"bancos-{user_id}-{hashlib.md5(conteudo).hexdigest()}"'
+
+
+def _chave_lista(user_id, versao, url):
+    # Cada página (cursor/page_size) e host geram links next/previous diferentes
+    pagina = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return CHAVE_LISTA.format(user_id=user_id, versao=versao, pagina=pagina)
+
+
+def obter_lista(user_id, versao, url):
+    return cache.get(_chave_lista(user_id, versao, url))
+
+
+def salvar_lista(user_id, versao, url, dados):
+    cache.set(_chave_lista(user_id, versao, url), dados, timeout=TIMEOUT_LISTA)
+
+
+def _incrementar(chave):
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _versao_inicial(), timeout=None)
+
+
+def invalidar_lista(user_id):
+    """
+    Invalida a lista de bancos do usuário (vínculos criados, alterados ou removidos).
+    """
+    _incrementar(CHAVE_VERSAO_USUARIO.format(user_id=user_id))
+
+
+def invalidar_catalogo():
+    """
+    Invalida as listas de todos os usuários (dados de algum Banco mudaram).
+    """
+    _incrementar(CHAVE_VERSAO_CATALOGO)
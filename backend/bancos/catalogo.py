@@ -0,0 +1,280 @@
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from functools import partial
+
+from django.conf import settings
+
+# Prefixos até 14 caracteres cobrem o CNPJ completo (somente dígitos).
+TAMANHO_MAXIMO_PREFIXO = 14
+
+
+def normalizar(texto):
+    """
+    Remove acentos e converte para minúsculas ("Itaú" -> "itau").
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def somente_digitos(texto):
+    return re.sub(r'\D', '', texto or '')
+
+
+def _termos(texto):
+    return re.findall(r'[a-z0-9]+', normalizar(texto))
+
+
+def _trigramas(termo):
+    return {termo[i:i + 3] for i in range(len(termo) - 2)}
+
+
+class CatalogoBancos:
+    """
+    Índice em memória do catálogo de bancos para buscas de autocompletar.
+
+    Mantém um índice de prefixos (por palavra do nome sem acentos, CNPJ
+    somente com dígitos e código COMPE) e um índice de trigramas usado como
+    fallback para buscas por trechos no meio das palavras. O índice é
+    construído na primeira busca (uma vez, mesmo com buscas simultâneas) e
+    atualizado pelos sinais de Banco depois do commit.
+
+    Como os sinais só alcançam o processo atual (e o import_bancos grava com
+    bulk_create), uma busca com o índice mais velho que BANCOS_CATALOGO_TTL
+    segundos dispara a reconstrução numa thread, sem esperar por ela.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._lock_construcao = threading.Lock()
+        self._construido = False
+        self._reconstruindo = False
+        self._pendentes = []
+        self._construido_em = 0.0
+        self._registros = {}
+        self._nomes = {}
+        self._prefixos = {}
+        self._trigramas = {}
+        self._inicios = {}
+        self._exatos = {}
+        self._chaves = {}
+
+    @property
+    def construido(self):
+        return self._construido
+
+    def construir(self):
+        """
+        (Re)constrói o índice completo a partir do banco de dados. O novo
+        índice é montado fora do lock e trocado de uma vez; alterações
+        recebidas durante a montagem são reaplicadas em seguida.
+        """
+        from .models import Banco
+
+        with self._lock:
+            self._reconstruindo = True
+            self._pendentes = []
+        try:
+            registros = list(Banco.objects.values('id', 'codigo', 'nome', 'cnpj', 'tipo'))
+            novo = CatalogoBancos()
+            for registro in registros:
+                novo._indexar(registro)
+        except BaseException:
+            with self._lock:
+                self._reconstruindo = False
+            raise
+        with self._lock:
+            self._registros = novo._registros
+            self._nomes = novo._nomes
+            self._prefixos = novo._prefixos
+            self._trigramas = novo._trigramas
+            self._inicios = novo._inicios
+            self._exatos = novo._exatos
+            self._chaves = novo._chaves
+            for aplicar in self._pendentes:
+                aplicar()
+            self._pendentes = []
+            self._reconstruindo = False
+            self._construido = True
+            self._construido_em = time.monotonic()
+
+    def garantir(self):
+        """
+        Constrói o índice se ainda não existe. Se estiver vencido, agenda a
+        reconstrução numa thread e segue com o índice atual.
+        """
+        if not self._construido:
+            with self._lock_construcao:
+                if not self._construido:
+                    self.construir()
+            return
+        ttl = settings.BANCOS_CATALOGO_TTL
+        if ttl and time.monotonic() - self._construido_em > ttl and self._lock_construcao.acquire(blocking=False):
+            threading.Thread(target=self._reconstruir, name='catalogo-bancos', daemon=True).start()
+
+    def _reconstruir(self):
+        from django.db import connection
+
+        try:
+            self.construir()
+        finally:
+            self._lock_construcao.release()
+            connection.close()
+
+    def atualizar(self, banco):
+        """
+        Reindexa um único banco. Ignorado enquanto o índice não foi construído.
+        """
+        registro = {
+            'id': banco.pk,
+            'codigo': banco.codigo,
+            'nome': banco.nome,
+            'cnpj': banco.cnpj,
+            'tipo': banco.tipo,
+        }
+        self._alterar(partial(self._reindexar, registro))
+
+    def remover(self, banco_id):
+        self._alterar(partial(self._remover, banco_id))
+
+    def _alterar(self, aplicar):
+        with self._lock:
+            if self._reconstruindo:
+                self._pendentes.append(aplicar)
+            if self._construido:
+                aplicar()
+
+    def _reindexar(self, registro):
+        self._remover(registro['id'])
+        self._indexar(registro)
+
+    def buscar(self, termo, limite=10):
+        """
+        Retorna (resultados, total) para o termo informado.
+
+        Todas as palavras do termo precisam casar com o início de alguma
+        palavra do nome, do CNPJ ou do código. Sem resultados por prefixo,
+        termos com 3+ caracteres são procurados como trechos via trigramas.
+        """
+        self.garantir()
+
+        termos = _termos(termo)
+        if not termos:
+            return [], 0
+
+        with self._lock:
+            ids = self._buscar_prefixos(termos)
+            if not ids:
+                ids = self._buscar_trigramas(termos)
+            consulta = ' '.join(termos)
+            exatos = self._exatos.get(consulta, set()) & ids
+            inicio = self._inicios.get(consulta[:TAMANHO_MAXIMO_PREFIXO], set()) & ids
+            if len(consulta) > TAMANHO_MAXIMO_PREFIXO:
+                inicio = {banco_id for banco_id in inicio if self._nomes[banco_id].startswith(consulta)}
+
+            # Códigos/CNPJs exatos primeiro, depois nomes que começam com o
+            # termo e por fim o restante, cada grupo em ordem alfabética.
+            melhores = []
+            for grupo in (exatos, inicio - exatos, ids - inicio - exatos):
+                if len(melhores) >= limite:
+                    break
+                melhores.extend(heapq.nsmallest(limite - len(melhores), grupo, key=self._nomes.__getitem__))
+            return [self._registros[banco_id]['dados'] for banco_id in melhores], len(ids)
+
+    def _buscar_prefixos(self, termos):
+        conjuntos = []
+        for termo in termos:
+            ids = self._prefixos.get(termo[:TAMANHO_MAXIMO_PREFIXO])
+            if not ids:
+                return set()
+            conjuntos.append(ids)
+        conjuntos.sort(key=len)
+        ids = set(conjuntos[0]).intersection(*conjuntos[1:])
+        longos = [termo for termo in termos if len(termo) > TAMANHO_MAXIMO_PREFIXO]
+        if longos:
+            ids = {
+                banco_id for banco_id in ids
+                if all(termo in self._registros[banco_id]['texto'] for termo in longos)
+            }
+        return ids
+
+    def _buscar_trigramas(self, termos):
+        conjuntos = []
+        for termo in termos:
+            if len(termo) < 3:
+                return set()
+            for trigrama in _trigramas(termo):
+                ids = self._trigramas.get(trigrama)
+                if not ids:
+                    return set()
+                conjuntos.append(ids)
+        conjuntos.sort(key=len)
+        candidatos = set(conjuntos[0]).intersection(*conjuntos[1:])
+        return {
+            banco_id for banco_id in candidatos
+            if all(termo in self._registros[banco_id]['texto'] for termo in termos)
+        }
+
+    def _indexar(self, registro):
+        nome = normalizar(registro['nome'])
+        cnpj = somente_digitos(registro['cnpj'])
+        codigo = somente_digitos(registro['codigo'])
+        palavras = set(re.findall(r'[a-z0-9]+', nome))
+        palavras.update(p for p in (cnpj, codigo, codigo.lstrip('0')) if p)
+
+        prefixos = {
+            palavra[:tamanho]
+            for palavra in palavras
+            for tamanho in range(1, min(len(palavra), TAMANHO_MAXIMO_PREFIXO) + 1)
+        }
+        trigramas = set()
+        for palavra in palavras:
+            trigramas |= _trigramas(palavra)
+
+        nome_consulta = ' '.join(re.findall(r'[a-z0-9]+', nome))
+        inicios = {
+            nome_consulta[:tamanho]
+            for tamanho in range(1, min(len(nome_consulta), TAMANHO_MAXIMO_PREFIXO) + 1)
+        }
+        exatos = {p for p in (cnpj, codigo, codigo.lstrip('0')) if p}
+
+        banco_id = registro['id']
+        chaves = (
+            (self._prefixos, prefixos),
+            (self._trigramas, trigramas),
+            (self._inicios, inicios),
+            (self._exatos, exatos),
+        )
+        for indice, valores in chaves:
+            for chave in valores:
+                indice.setdefault(chave, set()).add(banco_id)
+        self._chaves[banco_id] = chaves
+        self._nomes[banco_id] = nome_consulta
+        self._registros[banco_id] = {
+            'texto': ' '.join(sorted(palavras)),
+            'dados': {
+                'id': banco_id,
+                'codigo': registro['codigo'],
+                'nome': registro['nome'],
+                'cnpj': registro['cnpj'],
+                'tipo': registro['tipo'],
+            },
+        }
+
+    def _remover(self, banco_id):
+        for indice, valores in self._chaves.pop(banco_id, ()):
+            for chave in valores:
+                ids = indice.get(chave)
+                if ids is not None:
+                    ids.discard(banco_id)
+                    if not ids:
+                        del indice[chave]
+        self._nomes.pop(banco_id, None)
+        self._registros.pop(banco_id, None)
+
+
+catalogo_bancos = CatalogoBancos()
@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bancos.metadados import atualizar_metadados, TAMANHO_MAXIMO_PADRAO
+from bancos.models import Banco
+
+
+class Command(BaseCommand):
+    help = (
+        "Atualiza os metadados das instituições a partir de Banco.url_dados usando "
+        "requisições condicionais (ETag/If-Modified-Since) em paralelo. "
+        "Use --intervalo para rodar continuamente ou agende via cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--banco', type=int, action='append', dest='bancos', help="ID do banco (repetível)")
+        parser.add_argument('--concorrencia', type=int, default=20, help="Requisições simultâneas (padrão: 20)")
+        parser.add_argument('--por-host', type=int, default=4, help="Requisições simultâneas por host (padrão: 4)")
+        parser.add_argument('--timeout', type=float, default=10.0, help="Timeout por requisição em segundos")
+        parser.add_argument('--tamanho-maximo', type=int, default=TAMANHO_MAXIMO_PADRAO,
+                            help="Tamanho máximo do conteúdo em bytes")
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help="Repete a atualização a cada N segundos (0 = executa uma vez)")
+
+    def handle(self, *args, **options):
+        if options['concorrencia'] < 1 or options['por_host'] < 1:
+            raise CommandError("--concorrencia e --por-host devem ser maiores que zero.")
+
+        while True:
+            self._executar(options)
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _executar(self, options):
+        bancos = None
+        if options['bancos']:
+            bancos = Banco.objects.filter(pk__in=options['bancos'])
+
+        resultado = atualizar_metadados(
+            bancos,
+            concorrencia=options['concorrencia'],
+            por_host=options['por_host'],
+            timeout=options['timeout'],
+            tamanho_maximo=options['tamanho_maximo'],
+        )
+
+        for mensagem in resultado.mensagens_erro:
+            self.stderr.write(mensagem)
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.consultas} consultas em {resultado.duracao:.2f}s "
+            f"({resultado.consultas_por_segundo:.1f} consultas/s): "
+            f"{resultado.alterados} alterados, {resultado.nao_modificados} não modificados (304), "
+            f"{resultado.iguais} sem mudança, {resultado.erros} erros. "
+            f"{resultado.bytes_baixados} bytes baixados, {resultado.bytes_economizados} bytes economizados."
+        ))
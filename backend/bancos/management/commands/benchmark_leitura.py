@@ -0,0 +1,109 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from bancos.models import Banco, UsuarioBanco
+from bancos.serializers import UsuarioBancoSerializer, usuario_banco_leitura
+from users.models import CustomUser, UserPerfil
+from users.serializers import UserSerializer, UserDetailSerializer, user_leitura, user_detail_leitura
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara linhas/segundo dos serializers DRF com as projeções de leitura "
+        "(ProjecaoLeitura). Os dados de teste são criados em uma transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, nargs='+', default=[1000, 100000])
+        parser.add_argument('--repeticoes', type=int, default=3)
+
+    def handle(self, *args, **options):
+        maximo = max(options['linhas'])
+        try:
+            with transaction.atomic():
+                self._popular(maximo)
+                for linhas in options['linhas']:
+                    self._comparar(linhas, options['repeticoes'])
+                raise _Rollback
+        except _Rollback:
+            pass
+
+    def _popular(self, quantidade):
+        self.stdout.write(f"Criando {quantidade} usuários, perfis e vínculos...")
+        inicio = CustomUser.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        usuarios = CustomUser.objects.bulk_create(
+            [
+                CustomUser(
+                    id=inicio + i,
+                    nome_completo=f"Usuário Benchmark {i}",
+                    cpf=f"9{i:010d}",
+                    email=f"benchmark{i}@investsmart.test",
+                    data_nascimento=date(1990, 1, 1),
+                    password='!',
+                )
+                for i in range(1, quantidade + 1)
+            ],
+            batch_size=5000,
+        )
+        UserPerfil.objects.bulk_create(
+            [UserPerfil(user=usuario, cidade='São Paulo', estado='SP') for usuario in usuarios],
+            batch_size=5000,
+        )
+        Banco.objects.bulk_create(
+            [
+                Banco(cnpj=f"BENCH{i:06d}", nome=f"Banco Benchmark {i}", tipo='conta_corrente', recurso='benchmark')
+                for i in range(100)
+            ]
+        )
+        bancos = list(Banco.objects.filter(cnpj__startswith='BENCH'))
+        UsuarioBanco.objects.bulk_create(
+            [UsuarioBanco(user=usuario, banco=bancos[i % len(bancos)]) for i, usuario in enumerate(usuarios)],
+            batch_size=5000,
+        )
+
+    def _comparar(self, linhas, repeticoes):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n{linhas} linhas"))
+        usuarios = CustomUser.objects.filter(cpf__startswith='9').order_by('id')[:linhas]
+        vinculos = UsuarioBanco.objects.filter(banco__cnpj__startswith='BENCH').order_by('id')[:linhas]
+
+        casos = [
+            (
+                'UserSerializer',
+                lambda: UserSerializer(usuarios, many=True).data,
+                lambda: user_leitura.serializar(usuarios),
+            ),
+            (
+                'UserDetailSerializer',
+                lambda: UserDetailSerializer(usuarios.select_related('perfil'), many=True).data,
+                lambda: user_detail_leitura.serializar(usuarios),
+            ),
+            (
+                'UsuarioBancoSerializer',
+                lambda: UsuarioBancoSerializer(vinculos.select_related('banco'), many=True).data,
+                lambda: usuario_banco_leitura.serializar(vinculos),
+            ),
+        ]
+        for nome, drf, projecao in casos:
+            tempo_drf = self._medir(drf, repeticoes)
+            tempo_projecao = self._medir(projecao, repeticoes)
+            self.stdout.write(
+                f"{nome:<24} DRF: {linhas / tempo_drf:>10.0f} linhas/s | "
+                f"projeção: {linhas / tempo_projecao:>10.0f} linhas/s | "
+                f"{tempo_drf / tempo_projecao:.1f}x"
+            )
+
+    def _medir(self, funcao, repeticoes):
+        melhor = None
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            duracao = time.perf_counter() - inicio
+            melhor = duracao if melhor is None else min(melhor, duracao)
+        return melhor
@@ -0,0 +1,153 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bancos.cache import invalidar_catalogo
+from bancos.models import Banco, normalizar_cnpj
+
+# Nomes de colunas aceitos para cada campo, em ordem de preferência.
+# Inclui os cabeçalhos da lista de participantes publicada pelo BACEN.
+COLUNAS = {
+    'cnpj': ['cnpj', 'CNPJ'],
+    'nome': ['nome', 'Nome', 'Nome_Extenso', 'Nome_Reduzido'],
+    'codigo': ['codigo', 'Código', 'Número_Código', 'Numero_Codigo', 'COMPE'],
+    'tipo': ['tipo'],
+    'email': ['email'],
+    'recurso': ['recurso'],
+    'url_dados': ['url_dados'],
+    'url_consulta': ['url_consulta'],
+}
+
+CAMPOS_ATUALIZADOS = ['nome', 'codigo', 'tipo', 'email', 'recurso', 'url_dados', 'url_consulta']
+TIPOS_VALIDOS = {tipo for tipo, _ in Banco.TIPO_CHOICES}
+
+
+class Command(BaseCommand):
+    help = "Importa/atualiza o catálogo de instituições financeiras a partir de um arquivo CSV, JSON ou JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo de participantes")
+        parser.add_argument('--formato', choices=['csv', 'json', 'jsonl'], help="Padrão: deduzido pela extensão")
+        parser.add_argument('--lote', type=int, default=2000, help="Linhas por bulk_create (padrão: 2000)")
+        parser.add_argument('--delimitador', default=',', help="Delimitador do CSV (padrão: ',')")
+        parser.add_argument('--encoding', default='utf-8-sig')
+        parser.add_argument('--tipo', default='conta_corrente', choices=sorted(TIPOS_VALIDOS),
+                            help="Tipo usado quando o arquivo não informa")
+        parser.add_argument('--recurso', default='BACEN', help="Recurso usado quando o arquivo não informa")
+
+    def handle(self, *args, **options):
+        caminho = Path(options['arquivo'])
+        if not caminho.is_file():
+            raise CommandError(f"Arquivo não encontrado: {caminho}")
+        if options['lote'] < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        formato = options['formato'] or caminho.suffix.lstrip('.').lower()
+        if formato not in ('csv', 'json', 'jsonl'):
+            raise CommandError("Não foi possível deduzir o formato; use --formato.")
+
+        lidos = importados = invalidos = 0
+        lote = {}
+        inicio = time.perf_counter()
+
+        with caminho.open(encoding=options['encoding'], newline='') as arquivo:
+            if formato == 'csv':
+                linhas = csv.DictReader(arquivo, delimiter=options['delimitador'])
+            elif formato == 'jsonl':
+                linhas = (json.loads(linha) for linha in arquivo if linha.strip())
+            else:
+                linhas = _ler_array_json(arquivo)
+
+            for linha in linhas:
+                lidos += 1
+                banco = self._montar_banco(linha, options)
+                if banco is None:
+                    invalidos += 1
+                    continue
+                # Dentro do lote vale a última ocorrência do CNPJ
+                lote[banco.cnpj] = banco
+                if len(lote) >= options['lote']:
+                    importados += self._gravar(lote)
+                    lote = {}
+
+            if lote:
+                importados += self._gravar(lote)
+
+        # bulk_create não dispara post_save
+        invalidar_catalogo()
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{importados} bancos importados/atualizados, {invalidos} linhas inválidas, "
+            f"{lidos} linhas lidas em {duracao:.2f}s ({lidos / duracao if duracao else 0:.0f} linhas/s)."
+        ))
+
+    def _montar_banco(self, linha, options):
+        valores = {campo: _coluna(linha, nomes) for campo, nomes in COLUNAS.items()}
+        cnpj = normalizar_cnpj(valores['cnpj'])
+        if not cnpj or not valores['nome']:
+            return None
+
+        tipo = valores['tipo'] if valores['tipo'] in TIPOS_VALIDOS else options['tipo']
+        codigo = valores['codigo']
+        if codigo and codigo.isdigit():
+            codigo = codigo.zfill(3)
+        return Banco(
+            cnpj=cnpj,
+            nome=valores['nome'][:255],
+            codigo=codigo[:3] if codigo else None,
+            tipo=tipo,
+            email=valores['email'] or None,
+            recurso=(valores['recurso'] or options['recurso'])[:255],
+            url_dados=valores['url_dados'] or None,
+            url_consulta=valores['url_consulta'] or None,
+        )
+
+    def _gravar(self, lote):
+        Banco.objects.bulk_create(
+            lote.values(),
+            update_conflicts=True,
+            unique_fields=['cnpj'],
+            update_fields=CAMPOS_ATUALIZADOS,
+        )
+        return len(lote)
+
+
+def _coluna(linha, nomes):
+    for nome in nomes:
+        valor = linha.get(nome)
+        if valor not in (None, ''):
+            return str(valor).strip()
+    return ''
+
+
+def _ler_array_json(arquivo, tamanho_bloco=64 * 1024):
+    """
+    Lê um array JSON de objetos de forma incremental, sem carregar o
+    arquivo inteiro em memória.
+    """
+    decoder = json.JSONDecoder()
+    buffer = arquivo.read(tamanho_bloco).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError("O arquivo JSON deve conter um array de objetos.")
+    buffer = buffer[1:]
+    fim_arquivo = False
+
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            objeto, posicao = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if fim_arquivo:
+                raise CommandError("JSON inválido ou truncado.")
+            bloco = arquivo.read(tamanho_bloco)
+            fim_arquivo = not bloco
+            buffer += bloco
+            continue
+        yield objeto
+        buffer = buffer[posicao:]
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+import ipaddress
+import socket
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import httpx
+from django.utils import timezone
+
+from .models import Banco, MetadadosBanco
+
+TAMANHO_MAXIMO_PADRAO = 5 * 1024 * 1024
+ESQUEMAS_PERMITIDOS = ('http', 'https')
+
+
+class DestinoNaoPermitido(Exception):
+    """
+    url_dados fora de http/https ou que aponta para um endereço interno.
+    """
+
+
+def verificar_esquema(url):
+    partes = urlsplit(url)
+    if partes.scheme.lower() not in ESQUEMAS_PERMITIDOS or not partes.hostname:
+        raise DestinoNaoPermitido("Apenas URLs http ou https são aceitas.")
+
+
+@dataclass
+class ResultadoAtualizacao:
+    consultas: int = 0
+    alterados: int = 0
+    nao_modificados: int = 0
+    iguais: int = 0
+    erros: int = 0
+    bytes_baixados: int = 0
+    bytes_economizados: int = 0
+    duracao: float = 0.0
+    mensagens_erro: list = field(default_factory=list)
+
+    @property
+    def consultas_por_segundo(self):
+        return self.consultas / self.duracao if self.duracao else 0.0
+
+
+def atualizar_metadados(bancos=None, concorrencia=20, por_host=4, timeout=10.0,
+                        tamanho_maximo=TAMANHO_MAXIMO_PADRAO, transport=None):
+    """
+    Consulta Banco.url_dados de todos os bancos (ou dos informados) e grava
+    os snapshots em MetadadosBanco.
+
+    As requisições rodam em paralelo com um único httpx.AsyncClient (pool de
+    conexões keep-alive por host), limitadas a 'concorrencia' no total e a
+    'por_host' por servidor. Cada requisição envia If-None-Match e
+    If-Modified-Since do snapshot anterior, então fontes sem mudança custam
+    apenas um 304. O ORM é usado só antes e depois do loop assíncrono.
+
+    A url_dados é informada pelos usuários: cada requisição, inclusive as
+    de redirecionamento, só sai para http/https e para hosts cujos
+    endereços resolvidos são todos públicos (nada de rede privada, loopback
+    ou link-local, como o endpoint de metadados da nuvem).
+    """
+    if bancos is None:
+        bancos = Banco.objects.exclude(url_dados__isnull=True).exclude(url_dados='')
+    bancos = [banco for banco in bancos if banco.url_dados]
+    snapshots = {
+        snapshot.banco_id: snapshot
+        for snapshot in MetadadosBanco.objects.filter(banco__in=[banco.pk for banco in bancos])
+    }
+
+    inicio = time.perf_counter()
+    respostas = asyncio.run(_consultar_todos(
+        bancos, snapshots, concorrencia, por_host, timeout, tamanho_maximo, transport
+    ))
+    resultado = ResultadoAtualizacao(consultas=len(bancos))
+    resultado.duracao = time.perf_counter() - inicio
+
+    agora = timezone.now()
+    novos, alterados = [], []
+    for banco, resposta in zip(bancos, respostas):
+        snapshot = snapshots.get(banco.pk)
+        if snapshot is None:
+            snapshot = MetadadosBanco(banco=banco)
+            novos.append(snapshot)
+        else:
+            alterados.append(snapshot)
+        _aplicar(snapshot, banco, resposta, agora, resultado)
+
+    MetadadosBanco.objects.bulk_create(novos, batch_size=500)
+    MetadadosBanco.objects.bulk_update(
+        alterados,
+        ['url', 'etag', 'last_modified', 'content_type', 'conteudo', 'hash_conteudo',
+         'tamanho', 'status_http', 'erro', 'atualizado_em', 'verificado_em'],
+        batch_size=500,
+    )
+    return resultado
+
+
+async def _consultar_todos(bancos, snapshots, concorrencia, por_host, timeout, tamanho_maximo, transport):
+    limites = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+    global_semaforo = asyncio.Semaphore(concorrencia)
+    semaforos_host = {}
+
+    async with httpx.AsyncClient(
+        limits=limites,
+        timeout=timeout,
+        follow_redirects=True,
+        transport=transport,
+        event_hooks={'request': [_verificar_destino]},
+        headers={'User-Agent': 'InvestSmart/1.0 (+metadados de bancos)'},
+    ) as cliente:
+        async def consultar(banco):
+            host = urlsplit(banco.url_dados).netloc
+            semaforo_host = semaforos_host.setdefault(host, asyncio.Semaphore(por_host))
+            async with global_semaforo, semaforo_host:
+                return await _consultar(cliente, banco, snapshots.get(banco.pk), tamanho_maximo)
+
+        return await asyncio.gather(*(consultar(banco) for banco in bancos))
+
+
+async def _verificar_destino(request):
+    url = request.url
+    if url.scheme not in ESQUEMAS_PERMITIDOS:
+        raise DestinoNaoPermitido(f"Esquema {url.scheme} não permitido.")
+    porta = url.port or (443 if url.scheme == 'https' else 80)
+    try:
+        enderecos = await asyncio.get_running_loop().getaddrinfo(url.host, porta, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise DestinoNaoPermitido(f"Host {url.host} não resolvido: {e}")
+    for *_, endereco in enderecos:
+        ip = ipaddress.ip_address(endereco[0].split('%')[0])
+        if ip.version == 6 and ip.ipv4_mapped:
+            ip = ip.ipv4_mapped
+        if not ip.is_global:
+            raise DestinoNaoPermitido(f"{url.host} resolve para o endereço interno {ip}.")
+
+
+async def _consultar(cliente, banco, snapshot, tamanho_maximo):
+    headers = {}
+    if snapshot and snapshot.url == banco.url_dados:
+        if snapshot.etag:
+            headers['If-None-Match'] = snapshot.etag
+        if snapshot.last_modified:
+            headers['If-Modified-Since'] = snapshot.last_modified
+
+    try:
+        async with cliente.stream('GET', banco.url_dados, headers=headers) as resposta:
+            if resposta.status_code != 200:
+                return {'status': resposta.status_code, 'headers': resposta.headers}
+            partes = []
+            tamanho = 0
+            async for parte in resposta.aiter_bytes():
+                tamanho += len(parte)
+                if tamanho > tamanho_maximo:
+                    return {'erro': f"Conteúdo maior que {tamanho_maximo} bytes.", 'bytes': tamanho}
+                partes.append(parte)
+            return {'status': 200, 'headers': resposta.headers, 'corpo': b''.join(partes), 'bytes': tamanho}
+    except (httpx.HTTPError, DestinoNaoPermitido) as e:
+        return {'erro': f"{type(e).__name__}: {e}"[:255]}
+
+
+def _aplicar(snapshot, banco, resposta, agora, resultado):
+    snapshot.url = banco.url_dados
+    snapshot.verificado_em = agora
+    resultado.bytes_baixados += resposta.get('bytes', 0)
+
+    if 'erro' in resposta:
+        snapshot.erro = resposta['erro']
+        resultado.erros += 1
+        resultado.mensagens_erro.append(f"{banco.nome}: {resposta['erro']}")
+        return
+
+    snapshot.status_http = resposta['status']
+    if resposta['status'] == 304:
+        snapshot.erro = ''
+        resultado.nao_modificados += 1
+        resultado.bytes_economizados += snapshot.tamanho
+        return
+    if resposta['status'] != 200:
+        snapshot.erro = f"HTTP {resposta['status']}"
+        resultado.erros += 1
+        resultado.mensagens_erro.append(f"{banco.nome}: HTTP {resposta['status']}")
+        return
+
+    headers = resposta['headers']
+    corpo = resposta['corpo']
+    snapshot.erro = ''
+    snapshot.etag = headers.get('ETag', '')[:255]
+    snapshot.last_modified = headers.get('Last-Modified', '')[:64]
+    snapshot.content_type = headers.get('Content-Type', '')[:255]
+
+    hash_conteudo = hashlib.sha256(corpo).hexdigest()
+    if hash_conteudo == snapshot.hash_conteudo:
+        # Servidor sem suporte a requisições condicionais, mas nada mudou
+        resultado.iguais += 1
+        return
+
+    snapshot.conteudo = _decodificar(corpo, snapshot.content_type)
+    snapshot.hash_conteudo = hash_conteudo
+    snapshot.tamanho = len(corpo)
+    snapshot.atualizado_em = agora
+    resultado.alterados += 1
+
+
+def _decodificar(corpo, content_type):
+    charset = 'utf-8'
+    for parte in content_type.split(';'):
+        chave, _, valor = parte.strip().partition('=')
+        if chave.lower() == 'charset' and valor:
+            charset = valor.strip('"')
+    try:
+        return corpo.decode(charset, errors='replace')
+    except LookupError:
+        return corpo.decode('utf-8', errors='replace')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bancos', '0004_rename_email_contato_banco_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='banco',
+            name='codigo',
+            field=models.CharField(blank=True, help_text='Código de compensação (COMPE)', max_length=3, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bancos', '0005_banco_codigo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetadadosBanco',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField()),
+                ('etag', models.CharField(blank=True, default='', max_length=255)),
+                ('last_modified', models.CharField(blank=True, default='', max_length=64)),
+                ('content_type', models.CharField(blank=True, default='', max_length=255)),
+                ('conteudo', models.TextField(blank=True, default='')),
+                ('hash_conteudo', models.CharField(blank=True, default='', max_length=64)),
+                ('tamanho', models.PositiveIntegerField(default=0)),
+                ('status_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('erro', models.CharField(blank=True, default='', max_length=255)),
+                ('atualizado_em', models.DateTimeField(blank=True, help_text='Última vez que o conteúdo mudou', null=True)),
+                ('verificado_em', models.DateTimeField(blank=True, help_text='Última consulta à url_dados', null=True)),
+                ('banco', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='metadados', to='bancos.banco')),
+            ],
+            options={
+                'verbose_name': 'Metadados do Banco',
+                'verbose_name_plural': 'Metadados dos Bancos',
+            },
+        ),
+    ]
@@ -1,5 +1,26 @@
 from django.db import models
 from users.models import CustomUser
+import re
+
+
+def normalizar_cnpj(value):
+    """
+    Retorna o CNPJ no formato 00.000.000/0000-00 ou None se for inválido
+    (tamanho, sequência repetida ou dígitos verificadores).
+    """
+    cnpj = re.sub(r'[^0-9]', '', value or '')
+    if len(cnpj) != 14 or cnpj == cnpj[0] * 14:
+        return None
+
+    for tamanho in (12, 13):
+        pesos = list(range(tamanho - 7, 1, -1)) + list(range(9, 1, -1))
+        soma = sum(int(d) * p for d, p in zip(cnpj[:tamanho], pesos))
+        digito = 11 - soma % 11
+        if int(cnpj[tamanho]) != (0 if digito >= 10 else digito):
+            return None
+
+    return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
 
 class Banco(models.Model):
     TIPO_CHOICES = [
@@ -8,6 +29,7 @@ class Banco(models.Model):
         ('conta_investimentos', 'Conta de Investimentos'),
     ]
     cnpj = models.CharField(max_length=18, unique=True)
+    codigo = models.CharField(max_length=3, blank=True, null=True, help_text="Código de compensação (COMPE)")
     nome = models.CharField(max_length=255)
     tipo = models.CharField(max_length=50, choices=TIPO_CHOICES)
     email = models.EmailField(blank=True, null=True)
@@ -33,4 +55,29 @@ class UsuarioBanco(models.Model):
         verbose_name_plural = "Bancos do Usuário"
 
     def __str__(self):
-        return f"{self.user.username} - {self.banco.nome}"
\ No newline at end of file
+        return f"{self.user.username} - {self.banco.nome}"
+
+class MetadadosBanco(models.Model):
+    """
+    Último snapshot baixado de Banco.url_dados, com os validadores HTTP
+    (ETag/Last-Modified) usados nas requisições condicionais.
+    """
+    banco = models.OneToOneField(Banco, on_delete=models.CASCADE, related_name="metadados")
+    url = models.URLField()
+    etag = models.CharField(max_length=255, blank=True, default='')
+    last_modified = models.CharField(max_length=64, blank=True, default='')
+    content_type = models.CharField(max_length=255, blank=True, default='')
+    conteudo = models.TextField(blank=True, default='')
+    hash_conteudo = models.CharField(max_length=64, blank=True, default='')
+    tamanho = models.PositiveIntegerField(default=0)
+    status_http = models.PositiveSmallIntegerField(null=True, blank=True)
+    erro = models.CharField(max_length=255, blank=True, default='')
+    atualizado_em = models.DateTimeField(null=True, blank=True, help_text="Última vez que o conteúdo mudou")
+    verificado_em = models.DateTimeField(null=True, blank=True, help_text="Última consulta à url_dados")
+
+    class Meta:
+        verbose_name = "Metadados do Banco"
+        verbose_name_plural = "Metadados dos Bancos"
+
+    def __str__(self):
+        return f"Metadados de {self.banco.nome}"
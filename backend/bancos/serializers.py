@@ -1,6 +1,8 @@
 from rest_framework import serializers
+from .metadados import DestinoNaoPermitido, verificar_esquema
 from .models import Banco, UsuarioBanco
 from users.models import CustomUser
+from users.projecoes import ProjecaoLeitura
 
 class BancoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -8,6 +10,7 @@ class BancoSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'cnpj',
+            'codigo',
             'nome',
             'tipo',
             'email',
@@ -17,6 +20,15 @@ class BancoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
+    def validate_url_dados(self, value):
+        # URLField também aceita ftp; o atualizador de metadados só usa http(s)
+        if value:
+            try:
+                verificar_esquema(value)
+            except DestinoNaoPermitido as e:
+                raise serializers.ValidationError(str(e))
+        return value
+
 class UsuarioBancoSerializer(serializers.ModelSerializer):
     banco = BancoSerializer(read_only=True)
     banco_id = serializers.PrimaryKeyRelatedField(
@@ -40,3 +52,27 @@ class UsuarioBancoSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
+
+
+# Leitura rápida da lista de bancos do usuário (mesmo formato de UsuarioBancoSerializer)
+usuario_banco_leitura = ProjecaoLeitura(UsuarioBancoSerializer)
+
+
+class BancoLoteSerializer(BancoSerializer):
+    """
+    Valida os dados de um banco novo recebido no vínculo em lote.
+
+    A unicidade do CNPJ não é verificada aqui: o lote já consultou os CNPJs
+    existentes em uma única query e a inserção usa ignore_conflicts.
+    """
+    class Meta(BancoSerializer.Meta):
+        extra_kwargs = {'cnpj': {'validators': []}}
+
+
+class VinculoLoteSerializer(serializers.Serializer):
+    bancos = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=100,
+        help_text="Lista de itens com 'banco_id' ou 'cnpj' (e dados do banco, se ainda não existir)"
+    )
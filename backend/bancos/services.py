@@ -0,0 +1,138 @@
+from functools import partial
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from users.db import atomic_escrita
+from .models import Banco, UsuarioBanco, normalizar_cnpj
+from .catalogo import catalogo_bancos
+from .serializers import BancoSerializer, BancoLoteSerializer
+
+
+def vincular_bancos_em_lote(user, itens):
+    """
+    Vincula vários bancos ao usuário em uma única transação.
+
+    Cada item informa 'banco_id' ou 'cnpj'. O CNPJ é normalizado para
+    00.000.000/0000-00 (com ou sem pontuação) tanto na busca quanto na
+    criação. Bancos inexistentes informados por CNPJ são criados com os
+    demais campos do item ('banco_criado' só quando esta chamada o inseriu).
+    Todos os bancos são resolvidos com uma única query IN e os vínculos usam
+    bulk_create(ignore_conflicts=True), então requisições concorrentes não
+    violam o unique_together de UsuarioBanco.
+
+    Retorna uma lista de resultados na mesma ordem dos itens.
+    """
+    resultados = [None] * len(itens)
+    indices_por_id = {}
+    indices_por_cnpj = {}
+
+    for indice, item in enumerate(itens):
+        banco_id = item.get('banco_id')
+        cnpj = item.get('cnpj')
+        if banco_id not in (None, ''):
+            try:
+                indices_por_id.setdefault(int(banco_id), []).append(indice)
+            except (TypeError, ValueError):
+                resultados[indice] = _erro(indice, {'banco_id': ['Identificador inválido.']})
+        elif cnpj:
+            normalizado = normalizar_cnpj(str(cnpj))
+            if normalizado:
+                indices_por_cnpj.setdefault(normalizado, []).append(indice)
+            else:
+                resultados[indice] = _erro(indice, {'cnpj': ['CNPJ inválido.']})
+        else:
+            resultados[indice] = _erro(indice, {'non_field_errors': ['Informe banco_id ou cnpj.']})
+
+    with atomic_escrita():
+        bancos_por_id = {}
+        bancos_por_cnpj = {}
+        if indices_por_id or indices_por_cnpj:
+            for banco in Banco.objects.filter(Q(id__in=indices_por_id) | Q(cnpj__in=indices_por_cnpj)):
+                bancos_por_id[banco.id] = banco
+                bancos_por_cnpj[banco.cnpj] = banco
+
+        novos = []
+        for cnpj, indices in indices_por_cnpj.items():
+            if cnpj in bancos_por_cnpj:
+                continue
+            serializer = BancoLoteSerializer(data={**itens[indices[0]], 'cnpj': cnpj})
+            if serializer.is_valid():
+                novos.append(Banco(**serializer.validated_data))
+            else:
+                for indice in indices:
+                    resultados[indice] = _erro(indice, serializer.errors)
+
+        cnpjs_criados = set()
+        if novos:
+            cnpjs_criados = _inserir_bancos(novos)
+            for banco in Banco.objects.filter(cnpj__in={banco.cnpj for banco in novos}):
+                bancos_por_id[banco.id] = banco
+                bancos_por_cnpj[banco.cnpj] = banco
+                # bulk_create não dispara post_save; só indexa após o commit
+                transaction.on_commit(partial(catalogo_bancos.atualizar, banco))
+
+        alvos = {}
+        for banco_id, indices in indices_por_id.items():
+            banco = bancos_por_id.get(banco_id)
+            for indice in indices:
+                if banco:
+                    alvos[indice] = banco
+                else:
+                    resultados[indice] = _erro(indice, {'banco_id': ['Banco não encontrado.']})
+        for cnpj, indices in indices_por_cnpj.items():
+            banco = bancos_por_cnpj.get(cnpj)
+            for indice in indices:
+                if banco and resultados[indice] is None:
+                    alvos[indice] = banco
+
+        ids_alvo = {banco.id for banco in alvos.values()}
+        vinculos = {}
+        if ids_alvo:
+            ja_vinculados = set(
+                UsuarioBanco.objects.filter(user=user, banco_id__in=ids_alvo).values_list('banco_id', flat=True)
+            )
+            UsuarioBanco.objects.bulk_create(
+                [UsuarioBanco(user=user, banco_id=banco_id) for banco_id in ids_alvo - ja_vinculados],
+                ignore_conflicts=True
+            )
+            vinculos = dict(
+                UsuarioBanco.objects.filter(user=user, banco_id__in=ids_alvo).values_list('banco_id', 'id')
+            )
+
+    for indice, banco in alvos.items():
+        resultados[indice] = {
+            'indice': indice,
+            'status': 'ja_vinculado' if banco.id in ja_vinculados else 'vinculado',
+            'banco_criado': banco.cnpj in cnpjs_criados,
+            'id': vinculos.get(banco.id),
+            'banco': BancoSerializer(banco).data,
+        }
+
+    return resultados
+
+
+def _inserir_bancos(novos):
+    """
+    Insere os bancos e retorna os CNPJs de fato inseridos. Se outra
+    requisição criou algum deles depois da consulta, refaz um a um e deixa
+    de fora os que já existiam.
+    """
+    try:
+        with transaction.atomic():
+            Banco.objects.bulk_create(novos)
+        return {banco.cnpj for banco in novos}
+    except IntegrityError:
+        pass
+    inseridos = set()
+    for banco in novos:
+        try:
+            with transaction.atomic():
+                Banco.objects.bulk_create([banco])
+        except IntegrityError:
+            continue
+        inseridos.add(banco.cnpj)
+    return inseridos
+
+
+def _erro(indice, erros):
+    return {'indice': indice, 'status': 'erro', 'erros': erros}
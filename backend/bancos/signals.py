@@ -0,0 +1,23 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Banco
+from .catalogo import catalogo_bancos
+from .cache import invalidar_catalogo
+
+
+# O índice e as versões em cache só mudam depois do commit: com rollback,
+# o catálogo não pode ficar com um banco que não existe no banco de dados
+
+@receiver(post_save, sender=Banco)
+def atualizar_catalogo(sender, instance, **kwargs):
+    transaction.on_commit(partial(catalogo_bancos.atualizar, instance))
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver(post_delete, sender=Banco)
+def remover_do_catalogo(sender, instance, **kwargs):
+    transaction.on_commit(partial(catalogo_bancos.remover, instance.pk))
+    transaction.on_commit(invalidar_catalogo)
@@ -1,3 +1,274 @@
-from django.test import TestCase
+import io
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import httpx
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from . import cache as cache_bancos
+from .catalogo import CatalogoBancos, catalogo_bancos
+from .metadados import atualizar_metadados
+from .management.commands.import_bancos import _ler_array_json
+from .models import Banco, MetadadosBanco, UsuarioBanco, normalizar_cnpj
+from .serializers import BancoSerializer
+from .services import vincular_bancos_em_lote
+
+
+class VincularEmLoteTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.banco = Banco.objects.create(
+            cnpj='00.000.000/0001-91', nome="Banco do Brasil", tipo='conta_corrente', recurso='api',
+        )
+
+    def test_cnpj_sem_pontuacao_encontra_o_banco_existente(self):
+        resultados = vincular_bancos_em_lote(self.user, [
+            {'cnpj': ' 00000000000191 '},
+            {'cnpj': '00.000.000/0001-91'},
+        ])
+        self.assertEqual([r['status'] for r in resultados], ['vinculado', 'vinculado'])
+        self.assertFalse(resultados[0]['banco_criado'])
+        self.assertEqual(Banco.objects.count(), 1)
+        self.assertEqual(UsuarioBanco.objects.get(user=self.user).banco, self.banco)
+
+    def test_banco_novo_gravado_com_cnpj_normalizado(self):
+        resultados = vincular_bancos_em_lote(self.user, [
+            {'cnpj': '60746948000112', 'nome': "Bradesco", 'tipo': 'conta_corrente', 'recurso': 'api'},
+            {'cnpj': '11111111111111'},
+        ])
+        self.assertTrue(resultados[0]['banco_criado'])
+        self.assertEqual(resultados[0]['banco']['cnpj'], '60.746.948/0001-12')
+        self.assertEqual(resultados[1]['erros'], {'cnpj': ['CNPJ inválido.']})
+
+    def test_banco_criado_por_outra_requisicao_nao_conta_como_criado(self):
+        bulk_create = Banco.objects.bulk_create
+
+        def concorrente(objs, *args, **kwargs):
+            if not Banco.objects.filter(cnpj='60.746.948/0001-12').exists():
+                Banco.objects.create(cnpj='60.746.948/0001-12', nome="Bradesco",
+                                     tipo='conta_corrente', recurso='api')
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(Banco.objects, 'bulk_create', side_effect=concorrente):
+            resultados = vincular_bancos_em_lote(self.user, [
+                {'cnpj': '60746948000112', 'nome': "Bradesco", 'tipo': 'conta_corrente', 'recurso': 'api'},
+                {'cnpj': '33000167000101', 'nome': "Petrobras", 'tipo': 'conta_corrente', 'recurso': 'api'},
+            ])
+        self.assertEqual([r['status'] for r in resultados], ['vinculado', 'vinculado'])
+        self.assertEqual([r['banco_criado'] for r in resultados], [False, True])
+        self.assertEqual(UsuarioBanco.objects.filter(user=self.user).count(), 2)
+
+    def test_lote_sem_vinculo_nao_invalida_a_lista(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(cache_bancos, 'invalidar_lista') as invalidar:
+            resposta = client.post('/api/bancos/lote/', {'bancos': [{'cnpj': '11111111111111'}]},
+                                   format='json')
+            self.assertEqual(resposta.data['vinculados'], 0)
+            invalidar.assert_not_called()
+            client.post('/api/bancos/lote/', {'bancos': [{'cnpj': '00000000000191'}]}, format='json')
+            invalidar.assert_called_once_with(self.user.id)
+
+
+class CatalogoAposCommitTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        catalogo_bancos.construir()
+
+    def buscar(self, termo):
+        return [banco['nome'] for banco in catalogo_bancos.buscar(termo)[0]]
+
+    def test_rollback_nao_deixa_banco_no_indice(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco Fantasma",
+                                     tipo='conta_corrente', recurso='api')
+                vincular_bancos_em_lote(self.user, [
+                    {'cnpj': '60746948000112', 'nome': "Bradesco Fantasma", 'tipo': 'conta_corrente',
+                     'recurso': 'api'},
+                ])
+                raise RuntimeError
+        self.assertEqual(self.buscar('fantasma'), [])
+
+    def test_indexado_depois_do_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco do Brasil",
+                                 tipo='conta_corrente', recurso='api')
+            self.assertEqual(self.buscar('brasil'), [])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.buscar('brasil'), ["Banco do Brasil"])
+
+
+class ConstrucaoCatalogoTests(TestCase):
+
+    def setUp(self):
+        self.banco = Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco do Brasil",
+                                          tipo='conta_corrente', recurso='api')
+        self.catalogo = CatalogoBancos()
+
+    def test_indice_vencido_reconstroi_em_segundo_plano(self):
+        self.catalogo.construir()
+        self.catalogo._construido_em -= 3600
+        with mock.patch('bancos.catalogo.threading.Thread') as thread:
+            self.assertEqual(self.catalogo.buscar('brasil')[1], 1)
+            self.catalogo.buscar('brasil')
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+    def test_alteracao_durante_a_construcao_e_reaplicada(self):
+        catalogo = self.catalogo
+        renomeado = Banco(pk=self.banco.pk, cnpj=self.banco.cnpj, nome="Banco Renomeado",
+                          tipo='conta_corrente', recurso='api')
+
+        def novo_indice():
+            catalogo.atualizar(renomeado)
+            return CatalogoBancos()
+
+        with mock.patch('bancos.catalogo.CatalogoBancos', side_effect=novo_indice):
+            catalogo.construir()
+        self.assertEqual([b['nome'] for b in catalogo.buscar('renomeado')[0]], ["Banco Renomeado"])
+        self.assertEqual(catalogo.buscar('brasil')[1], 0)
+
+
+class ImportBancosTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = Path(diretorio.name)
+
+    def importar(self, nome, conteudo, *args):
+        caminho = self.diretorio / nome
+        caminho.write_text(conteudo, encoding='utf-8')
+        call_command('import_bancos', str(caminho), *args, stdout=io.StringIO())
+
+    def test_normalizar_cnpj_confere_digitos(self):
+        self.assertEqual(normalizar_cnpj('60746948000112'), '60.746.948/0001-12')
+        self.assertEqual(normalizar_cnpj('00.000.000/0001-91'), '00.000.000/0001-91')
+        self.assertIsNone(normalizar_cnpj('60746948000113'))
+        self.assertIsNone(normalizar_cnpj('60746948000102'))
+        self.assertIsNone(normalizar_cnpj('11111111111111'))
+        self.assertIsNone(normalizar_cnpj('6074694800011'))
+
+    def test_csv_do_bacen_com_reimportacao(self):
+        self.importar('participantes.csv', (
+            "CNPJ;Nome_Extenso;Número_Código\n"
+            "60746948000112;Banco Bradesco S.A.;237\n"
+            "60746948000113;CNPJ Errado;1\n"
+            "00000000000191;Banco do Brasil;1\n"
+            "00000000000191;Banco do Brasil S.A.;1\n"
+        ), '--delimitador', ';')
+        self.assertEqual(
+            dict(Banco.objects.values_list('cnpj', 'nome')),
+            {'60.746.948/0001-12': "Banco Bradesco S.A.", '00.000.000/0001-91': "Banco do Brasil S.A."},
+        )
+        self.assertEqual(Banco.objects.get(cnpj='00.000.000/0001-91').codigo, '001')
+
+        self.importar('participantes.jsonl', '{"cnpj": "60746948000112", "nome": "Bradesco"}\n', '--lote', '1')
+        self.assertEqual(Banco.objects.count(), 2)
+        self.assertEqual(Banco.objects.get(cnpj='60.746.948/0001-12').nome, "Bradesco")
+
+    def test_array_json_lido_em_blocos(self):
+        objetos = [{'cnpj': '60701190000104', 'nome': "Itaú Unibanco, \"S.A.\""}, {'cnpj': '90400888000142'}]
+        lidos = list(_ler_array_json(io.StringIO(json.dumps(objetos)), tamanho_bloco=7))
+        self.assertEqual(lidos, objetos)
+
+
+class ListaBancosETagTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_sem_cache_compartilhado_etag_pelo_conteudo(self):
+        etag = self.client.get('/api/bancos/')['ETag']
+        self.assertEqual(self.client.get('/api/bancos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        vincular_bancos_em_lote(self.user, [
+            {'cnpj': '00000000000191', 'nome': "Banco do Brasil", 'tipo': 'conta_corrente', 'recurso': 'api'},
+        ])
+        resposta = self.client.get('/api/bancos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta['ETag'], etag)
+
+    def test_etag_com_cache_compartilhado(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': diretorio.name}}
+        with override_settings(CACHES=caches):
+            etag = self.client.get('/api/bancos/')['ETag']
+            self.assertEqual(self.client.get('/api/bancos/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            vincular_bancos_em_lote(self.user, [
+                {'cnpj': '00000000000191', 'nome': "Banco do Brasil", 'tipo': 'conta_corrente', 'recurso': 'api'},
+            ])
+            cache_bancos.invalidar_lista(self.user.id)
+            resposta = self.client.get('/api/bancos/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(resposta.status_code, 200)
+            self.assertEqual(len(resposta.data['results']), 1)
+
+
+class AtualizarMetadadosTests(TestCase):
+
+    def setUp(self):
+        self.requisicoes = []
+
+    def servidor(self, request):
+        self.requisicoes.append(str(request.url))
+        if request.url.path == '/redireciona':
+            return httpx.Response(302, headers={'Location': 'http://169.254.169.254/latest/meta-data/'})
+        return httpx.Response(200, text='{"nome": "Banco"}', headers={'Content-Type': 'application/json'})
+
+    def atualizar(self, *urls):
+        bancos = [
+            Banco.objects.create(
+                cnpj=cnpj, nome=f"Banco {indice}", tipo='conta_corrente', recurso='api', url_dados=url,
+            )
+            for indice, (cnpj, url) in enumerate(zip(
+                ['00.000.000/0001-91', '60.746.948/0001-12', '60.701.190/0001-04', '90.400.888/0001-42'], urls,
+            ))
+        ]
+        return atualizar_metadados(bancos, transport=httpx.MockTransport(self.servidor)), bancos
+
+    def test_enderecos_internos_nao_sao_consultados(self):
+        resultado, _ = self.atualizar(
+            'http://127.0.0.1:8000/api/', 'http://localhost/', 'ftp://93.184.216.34/dados',
+            'http://[::ffff:10.0.0.1]/',
+        )
+        self.assertEqual(resultado.erros, 4)
+        self.assertEqual(self.requisicoes, [])
+        self.assertTrue(all('DestinoNaoPermitido' in erro for erro in MetadadosBanco.objects.values_list('erro', flat=True)))
+
+    def test_redirecionamento_para_endereco_interno(self):
+        resultado, bancos = self.atualizar('http://93.184.216.34/redireciona', 'http://93.184.216.34/dados')
+        self.assertEqual((resultado.erros, resultado.alterados), (1, 1))
+        # As consultas são concorrentes: a ordem de chegada varia
+        self.assertEqual(sorted(self.requisicoes), ['http://93.184.216.34/dados', 'http://93.184.216.34/redireciona'])
+        self.assertIn('169.254.169.254', bancos[0].metadados.erro)
+
+    def test_cadastro_so_aceita_http(self):
+        serializer = BancoSerializer(data={
+            'cnpj': '00.000.000/0001-91', 'nome': "Banco", 'tipo': 'conta_corrente', 'recurso': 'api',
+            'url_dados': 'ftp://exemplo.com.br/dados',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('url_dados', serializer.errors)
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import BancoView, BancoDetalhesView, BancoCadastrarView
+from .views import BancoView, BancoDetalhesView, BancoCadastrarView, BancoLoteView, BancoCatalogoView
 
 urlpatterns = [
     path('', BancoView.as_view(), name='bancos-list-update'),
     path('cadastrar/', BancoCadastrarView.as_view(), name='banco-cadastrar'),
+    path('lote/', BancoLoteView.as_view(), name='bancos-lote'),
+    path('catalogo/', BancoCatalogoView.as_view(), name='bancos-catalogo'),
     path('<int:pk>/', BancoDetalhesView.as_view(), name='banco-detalhes'),
 ]
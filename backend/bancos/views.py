@@ -2,22 +2,59 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
+from django.utils.http import parse_etags
+from users.cache import cache_compartilhado
+from users.pagination import KeysetPagination
 from .models import UsuarioBanco, Banco
-from .serializers import UsuarioBancoSerializer, BancoSerializer
+from .serializers import UsuarioBancoSerializer, BancoSerializer, VinculoLoteSerializer, usuario_banco_leitura
+from .services import vincular_bancos_em_lote
+from .catalogo import catalogo_bancos
+from . import cache as cache_bancos
+
+class UsuarioBancoPagination(KeysetPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('id',)
 
 class BancoView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        bancos = UsuarioBanco.objects.filter(user=request.user)
-        serializer = UsuarioBancoSerializer(bancos, many=True)
-        print(serializer.data)
-        return Response(serializer.data)
+        if not cache_compartilhado():
+            # As versões ficariam no cache de cada worker: um deles poderia
+            # responder 304 ou a lista antiga depois de outro invalidá-la.
+            # O ETag sai do conteúdo, então a lista é sempre consultada
+            dados = self._listar(request)
+            etag = cache_bancos.etag_conteudo(request.user.id, dados)
+            if etag in parse_etags(request.headers.get('If-None-Match', '')):
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            return Response(dados, headers={'ETag': etag})
+
+        versao = cache_bancos.versao_lista(request.user.id)
+        etag = cache_bancos.etag_lista(request.user.id, versao)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        url = request.build_absolute_uri()
+        dados = cache_bancos.obter_lista(request.user.id, versao, url)
+        if dados is None:
+            dados = self._listar(request)
+            cache_bancos.salvar_lista(request.user.id, versao, url, dados)
+        return Response(dados, headers={'ETag': etag})
+
+    def _listar(self, request):
+        paginator = UsuarioBancoPagination()
+        queryset = UsuarioBanco.objects.filter(user=request.user)
+        linhas = usuario_banco_leitura.projetar(queryset, *paginator.campos_ordenacao(request, queryset, self))
+        pagina = paginator.paginate_queryset(linhas, request, view=self)
+        return paginator.get_paginated_response(usuario_banco_leitura.converter(pagina)).data
 
     def post(self, request):
         serializer = UsuarioBancoSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
+            cache_bancos.invalidar_lista(request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -30,15 +67,52 @@ class BancoCadastrarView(APIView):
 
         if banco:
             UsuarioBanco.objects.get_or_create(user=request.user, banco=banco)
+            cache_bancos.invalidar_lista(request.user.id)
             return Response(BancoSerializer(banco).data, status=status.HTTP_200_OK)
 
         serializer = BancoSerializer(data=request.data)
         if serializer.is_valid():
             banco = serializer.save()
             UsuarioBanco.objects.create(user=request.user, banco=banco)
+            cache_bancos.invalidar_lista(request.user.id)
             return Response(BancoSerializer(banco).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BancoLoteView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = VinculoLoteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        resultados = vincular_bancos_em_lote(request.user, serializer.validated_data['bancos'])
+        vinculados = sum(1 for r in resultados if r['status'] == 'vinculado')
+        if vinculados:
+            cache_bancos.invalidar_lista(request.user.id)
+        return Response({
+            'resultados': resultados,
+            'vinculados': vinculados,
+            'erros': sum(1 for r in resultados if r['status'] == 'erro'),
+        }, status=status.HTTP_200_OK)
+
+class BancoCatalogoView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        termo = request.query_params.get('q', '')
+        try:
+            limite = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            limite = 10
+
+        resultados, total = catalogo_bancos.buscar(termo, limite)
+        return Response({
+            'success': True,
+            'data': resultados,
+            'total': total,
+        })
+
 class BancoDetalhesView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -57,6 +131,7 @@ class BancoDetalhesView(APIView):
         serializer = UsuarioBancoSerializer(instance, data=request.data, context={'request': request})
         if serializer.is_valid():
             serializer.save(user=request.user)
+            cache_bancos.invalidar_lista(request.user.id)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -66,4 +141,5 @@ class BancoDetalhesView(APIView):
             return Response({'detail': 'Não encontrado ou não autorizado.'}, status=status.HTTP_404_NOT_FOUND)
         
         instance.delete()
+        cache_bancos.invalidar_lista(request.user.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
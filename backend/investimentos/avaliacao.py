@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+TIPOS = {'renda_fixa': 0, 'acao': 1}
+INDEXADORES = {'': 0, 'prefixado': 1, 'cdi': 2, 'ipca': 3}
+
+# Colunas lidas de Posicao, na ordem esperada por Colunas.de_linhas()
+CAMPOS = (
+    'id', 'tipo', 'indexador', 'quantidade', 'valor_aplicado', 'taxa',
+    'data_aplicacao', 'vencimento', 'ativo__preco',
+)
+
+
+@dataclass
+class Colunas:
+    """
+    Posições em formato colunar (um array NumPy por campo).
+    """
+    ids: np.ndarray
+    tipo: np.ndarray
+    indexador: np.ndarray
+    quantidade: np.ndarray
+    valor_aplicado: np.ndarray
+    taxa: np.ndarray
+    inicio: np.ndarray
+    vencimento: np.ndarray
+    preco: np.ndarray
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def de_linhas(cls, linhas):
+        """
+        Monta as colunas a partir de tuplas que começam com CAMPOS
+        (ex.: Posicao.objects.values_list(*CAMPOS, ...)); campos extras no
+        fim de cada tupla são ignorados.
+        """
+        linhas = list(linhas)
+        if not linhas:
+            return cls.vazia()
+        ids, tipos, indexadores, quantidades, aplicados, taxas, inicios, vencimentos, precos = (
+            list(zip(*linhas))[:len(CAMPOS)]
+        )
+        return cls(
+            ids=np.array(ids, dtype=np.int64),
+            tipo=np.array([TIPOS[t] for t in tipos], dtype=np.int8),
+            indexador=np.array([INDEXADORES[i] for i in indexadores], dtype=np.int8),
+            quantidade=np.array(quantidades, dtype=np.float64),
+            valor_aplicado=np.array(aplicados, dtype=np.float64),
+            taxa=np.array(taxas, dtype=np.float64),
+            inicio=np.array(inicios, dtype='datetime64[D]'),
+            vencimento=np.array(vencimentos, dtype='datetime64[D]'),
+            preco=np.array([np.nan if p is None else p for p in precos], dtype=np.float64),
+        )
+
+    @classmethod
+    def vazia(cls):
+        return cls(
+            ids=np.empty(0, np.int64), tipo=np.empty(0, np.int8), indexador=np.empty(0, np.int8),
+            quantidade=np.empty(0), valor_aplicado=np.empty(0), taxa=np.empty(0),
+            inicio=np.empty(0, 'datetime64[D]'), vencimento=np.empty(0, 'datetime64[D]'), preco=np.empty(0),
+        )
+
+
+def avaliar(colunas, data_base, cdi_anual, ipca_anual, calendario=None, indices=None):
+    """
+    Calcula o valor atual de todas as posições de uma vez.
+
+    - Renda variável: quantidade x último preço (sem preço: valor aplicado).
+    - Prefixado: (1 + taxa)^(du/252).
+    - CDI: fator acumulado do índice 'cdi' a %CDI; sem índice, (1 + CDI diário x %CDI)^du.
+    - IPCA+: fator do índice 'ipca' x (1 + spread)^(du/252); sem índice, (1 + IPCA)^(dc/365).
+
+    du são dias úteis entre a aplicação e min(data_base, vencimento), pelo
+    calendário informado (sem calendário, apenas seg-sex); dc são dias
+    corridos. 'indices' mapeia nome -> IndiceAcumulado. Posições com datas
+    fora do calendário ou dos índices ficam pelo valor aplicado. Retorna um
+    array float64 alinhado a colunas.ids.
+    """
+    indices = indices or {}
+    data_base = np.datetime64(data_base, 'D')
+    inicio = colunas.inicio
+    fim = np.where(np.isnat(colunas.vencimento), data_base, np.minimum(colunas.vencimento, data_base))
+    fim = np.maximum(fim, inicio)
+    calendarios = [calendario] + [indice.calendario for indice in indices.values() if indice is not None]
+    fora = np.zeros(len(colunas), dtype=bool)
+    for cal in calendarios:
+        if cal is not None:
+            fora |= ~(cal.contem(inicio) & cal.contem(fim))
+    if fora.any():
+        # Período vazio (fator 1) em uma data que todos os calendários aceitam
+        inicio = np.where(fora, data_base, inicio)
+        fim = np.where(fora, data_base, fim)
+    if calendario is not None:
+        du = calendario.dias_uteis(inicio, fim).astype(np.float64)
+    else:
+        du = np.busday_count(inicio, fim).astype(np.float64)
+    taxa = colunas.taxa / 100.0
+
+    fator = np.ones(len(colunas))
+    indexador = colunas.indexador
+    prefixado = indexador == INDEXADORES['prefixado']
+    fator[prefixado] = np.power(1.0 + taxa[prefixado], du[prefixado] / 252.0)
+
+    cdi = indexador == INDEXADORES['cdi']
+    if indices.get('cdi') is not None:
+        fator[cdi] = indices['cdi'].fator(inicio[cdi], fim[cdi], colunas.taxa[cdi])
+    else:
+        cdi_diario = (1.0 + cdi_anual) ** (1.0 / 252.0) - 1.0
+        fator[cdi] = np.power(1.0 + cdi_diario * taxa[cdi], du[cdi])
+
+    ipca = indexador == INDEXADORES['ipca']
+    if indices.get('ipca') is not None:
+        inflacao = indices['ipca'].fator(inicio[ipca], fim[ipca])
+    else:
+        dc = (fim[ipca] - inicio[ipca]).astype(np.float64)
+        inflacao = np.power(1.0 + ipca_anual, dc / 365.0)
+    fator[ipca] = inflacao * np.power(1.0 + taxa[ipca], du[ipca] / 252.0)
+
+    valores = colunas.valor_aplicado * fator
+    acao = (colunas.tipo == TIPOS['acao']) & ~np.isnan(colunas.preco)
+    valores[acao] = colunas.quantidade[acao] * colunas.preco[acao]
+    return np.round(valores, 2)
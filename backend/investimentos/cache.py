@@ -0,0 +1,62 @@
+import time
+
+from django.core.cache import cache
+
+CHAVE_VERSAO_IR = 'investimentos:ir:versao:{user_id}'
+CHAVE_IR = 'investimentos:ir:{user_id}:{ano}:{versao}'
+TIMEOUT_IR = 24 * 60 * 60
+
+
+def _versao_inicial():
+    # Igual a bancos.cache: recomeça em um valor que não repete versões antigas
+    return int(time.time() * 1000)
+
+
+def versao_ir(user_id):
+    chave = CHAVE_VERSAO_IR.format(user_id=user_id)
+    versao = cache.get(chave)
+    if versao is None:
+        versao = _versao_inicial()
+        cache.add(chave, versao, timeout=None)
+    return versao
+
+
+def versoes_ir(user_ids):
+    """
+    versao_ir() de vários usuários com um get_many.
+    """
+    chaves = {CHAVE_VERSAO_IR.format(user_id=user_id): user_id for user_id in user_ids}
+    encontradas = cache.get_many(chaves)
+    versoes = {chaves[chave]: versao for chave, versao in encontradas.items()}
+    for user_id in set(user_ids) - set(versoes):
+        versoes[user_id] = versao_ir(user_id)
+    return versoes
+
+
+def obter_ir(user_id, ano, versao):
+    return cache.get(CHAVE_IR.format(user_id=user_id, ano=ano, versao=versao))
+
+
+def salvar_ir(user_id, ano, versao, relatorio):
+    cache.set(CHAVE_IR.format(user_id=user_id, ano=ano, versao=versao), relatorio, timeout=TIMEOUT_IR)
+
+
+def salvar_ir_varios(ano, relatorios, versoes):
+    cache.set_many(
+        {
+            CHAVE_IR.format(user_id=user_id, ano=ano, versao=versoes[user_id]): relatorio
+            for user_id, relatorio in relatorios.items()
+        },
+        timeout=TIMEOUT_IR,
+    )
+
+
+def invalidar_ir(user_id):
+    """
+    Invalida os relatórios de IR do usuário (movimentações ou posições mudaram).
+    """
+    chave = CHAVE_VERSAO_IR.format(user_id=user_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _versao_inicial(), timeout=None)
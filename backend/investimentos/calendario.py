@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+# Feriados nacionais usados pela B3/ANBIMA na contagem de dias úteis
+FERIADOS_FIXOS = ['01-01', '04-21', '05-01', '09-07', '10-12', '11-02', '11-15', '12-25']
+# Dia Nacional de Zumbi e da Consciência Negra (Lei 14.759/2023)
+CONSCIENCIA_NEGRA_DESDE = 2024
+
+
+def pascoa(ano):
+    """
+    Domingo de Páscoa (algoritmo de Meeus/Jones/Butcher, calendário gregoriano).
+    """
+    a = ano % 19
+    b, c = divmod(ano, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(ano, mes, dia + 1)
+
+
+def feriados_nacionais(ano_inicial, ano_final):
+    feriados = []
+    for ano in range(ano_inicial, ano_final + 1):
+        feriados += [date.fromisoformat(f"{ano}-{dia}") for dia in FERIADOS_FIXOS]
+        if ano >= CONSCIENCIA_NEGRA_DESDE:
+            feriados.append(date(ano, 11, 20))
+        domingo = pascoa(ano)
+        feriados += [
+            domingo - timedelta(days=48),  # segunda de Carnaval
+            domingo - timedelta(days=47),  # terça de Carnaval
+            domingo - timedelta(days=2),   # Sexta-feira Santa
+            domingo + timedelta(days=60),  # Corpus Christi
+        ]
+    return np.array(feriados, dtype='datetime64[D]')
+
+
+class CalendarioDiasUteis:
+    """
+    Calendário de dias úteis pré-calculado entre ano_inicial e ano_final.
+
+    'util' é o mapa de bits (um bool por dia corrido) e 'acumulado[i]' a
+    quantidade de dias úteis em [base, base + i). Assim, dias úteis entre
+    duas datas (início incluído, fim excluído, como na convenção DU/252) são
+    duas leituras de array, para qualquer quantidade de pares de datas.
+    """
+
+    def __init__(self, ano_inicial=1990, ano_final=2099, feriados=None):
+        self.base = np.datetime64(f"{ano_inicial:04d}-01-01", 'D')
+        self.fim = np.datetime64(f"{ano_final + 1:04d}-01-01", 'D')
+        if feriados is None:
+            feriados = feriados_nacionais(ano_inicial, ano_final)
+        self.dias = np.arange(self.base, self.fim)
+        self.util = np.is_busday(self.dias, holidays=feriados)
+        self.acumulado = np.zeros(len(self.dias) + 1, dtype=np.int32)
+        np.cumsum(self.util, out=self.acumulado[1:])
+
+    def __len__(self):
+        return len(self.dias)
+
+    def indices(self, datas):
+        """
+        Posição de cada data no calendário (0 = base). Aceita escalares,
+        listas ou arrays de datas.
+        """
+        indices = (np.asarray(datas, dtype='datetime64[D]') - self.base).astype(np.int64)
+        if indices.size and (indices.min() < 0 or indices.max() > len(self.dias)):
+            raise ValueError(f"Data fora do calendário ({self.base} a {self.fim}).")
+        return indices
+
+    def contem(self, datas):
+        """
+        True para cada data que indices() aceita (da base até o fim, inclusive).
+        """
+        datas = np.asarray(datas, dtype='datetime64[D]')
+        return (datas >= self.base) & (datas <= self.fim)
+
+    def eh_dia_util(self, datas):
+        return self.util[self.indices(datas)]
+
+    def dias_uteis(self, inicios, fins):
+        """
+        Dias úteis em [inicio, fim) para cada par; negativo se fim < inicio.
+        """
+        return self.acumulado[self.indices(fins)] - self.acumulado[self.indices(inicios)]
+
+
+calendario_b3 = CalendarioDiasUteis()
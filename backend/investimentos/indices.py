@@ -0,0 +1,133 @@
+import threading
+
+import numpy as np
+
+from .calendario import calendario_b3
+from .series import ErroSerie, armazem_series
+
+# Termos da série de log(1 + p·r) = p·r - (p·r)²/2 + (p·r)³/3 - (p·r)⁴/4 + ...
+# Com taxas diárias de CDI/SELIC (~0,05%) o erro do truncamento fica abaixo
+# de 1e-15 por dia, bem menor que o arredondamento usado pelo mercado.
+ORDEM = 4
+
+PERIODICIDADES = {
+    'cdi': 'diaria',
+    'selic': 'diaria',
+    'ipca': 'mensal',
+}
+
+
+class IndiceAcumulado:
+    """
+    Índice de acumulação de uma taxa sobre o calendário de dias úteis.
+
+    Guarda, para cada dia do calendário, as somas acumuladas de r, r², r³ e r⁴
+    (r = taxa do dia útil). O fator de qualquer período a p% da taxa é
+    exp(Σ log(1 + p·r)), obtido com duas leituras por potência, sem percorrer
+    os dias do período:
+
+        fator(inicio, fim, p) = Π (1 + p·r_d) para d em [inicio, fim)
+    """
+
+    def __init__(self, taxas_diarias, calendario=calendario_b3):
+        if len(taxas_diarias) != len(calendario):
+            raise ValueError("As taxas precisam ter um valor por dia do calendário.")
+        self.calendario = calendario
+        taxas = np.where(calendario.util, taxas_diarias, 0.0)
+        # Uma linha por dia com as ORDEM somas: cada consulta lê uma linha contígua
+        self.somas = np.zeros((len(taxas) + 1, ORDEM))
+        potencia = np.ones_like(taxas)
+        for k in range(ORDEM):
+            potencia = potencia * taxas
+            np.cumsum(potencia, out=self.somas[1:, k])
+
+    @classmethod
+    def de_serie_diaria(cls, datas, valores, calendario=calendario_b3):
+        """
+        Série com a taxa de cada dia útil em % ao dia (ex.: SGS 12, CDI).
+        Dias sem dado usam a última taxa conhecida (antes do início, a primeira).
+        """
+        posicoes = _posicoes_validas(datas, calendario)
+        taxas = _preencher(len(calendario), posicoes, np.asarray(valores)[posicoes >= 0] / 100.0)
+        return cls(taxas, calendario)
+
+    @classmethod
+    def de_serie_mensal(cls, datas, valores, calendario=calendario_b3):
+        """
+        Série mensal em % ao mês (ex.: SGS 433, IPCA), com uma data por mês.
+        A variação do mês é distribuída igualmente pelos dias úteis do mês
+        (pro rata die útil); meses sem dado repetem a última variação.
+        """
+        meses_calendario = calendario.dias.astype('datetime64[M]')
+        primeiro_mes = meses_calendario[0]
+        indice_mes = (meses_calendario - primeiro_mes).astype(np.int64)
+        quantidade_meses = int(indice_mes[-1]) + 1
+
+        meses = (np.asarray(datas, dtype='datetime64[D]').astype('datetime64[M]') - primeiro_mes).astype(np.int64)
+        validos = (meses >= 0) & (meses < quantidade_meses)
+        variacao = _preencher(quantidade_meses, meses[validos], np.asarray(valores)[validos] / 100.0)
+        uteis_no_mes = np.bincount(indice_mes, weights=calendario.util, minlength=quantidade_meses)
+        taxa_mes = np.power(1.0 + variacao, 1.0 / np.maximum(uteis_no_mes, 1)) - 1.0
+        return cls(taxa_mes[indice_mes], calendario)
+
+    def fator(self, inicios, fins, percentuais=100.0):
+        """
+        Fator acumulado entre cada par de datas (vetorizado). 'percentuais' é
+        escalar ou array, em % da taxa (ex.: 110 para 110% do CDI).
+        """
+        i = self.calendario.indices(inicios)
+        j = self.calendario.indices(fins)
+        p = np.asarray(percentuais, dtype=np.float64) / 100.0
+        periodo = self.somas[j] - self.somas[i]
+        # Horner: p·(S1 - p·(S2/2 - p·(S3/3 - p·S4/4)))
+        log = periodo[..., ORDEM - 1] / ORDEM
+        for k in range(ORDEM - 2, -1, -1):
+            log = periodo[..., k] / (k + 1) - p * log
+        return np.exp(p * log)
+
+
+def _posicoes_validas(datas, calendario):
+    posicoes = (np.asarray(datas, dtype='datetime64[D]') - calendario.base).astype(np.int64)
+    return np.where((posicoes >= 0) & (posicoes < len(calendario)), posicoes, -1)
+
+
+def _preencher(tamanho, posicoes, valores):
+    # Preenche para frente a partir de cada observação (e para trás antes da primeira)
+    posicoes = posicoes[posicoes >= 0]
+    if not len(posicoes):
+        return np.zeros(tamanho)
+    marcadores = np.full(tamanho, -1, dtype=np.int64)
+    marcadores[posicoes] = np.arange(len(posicoes))
+    ultimo = np.maximum.accumulate(marcadores)
+    ultimo[ultimo < 0] = 0
+    return np.asarray(valores, dtype=np.float64)[ultimo]
+
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def obter_indice(nome, calendario=calendario_b3):
+    """
+    IndiceAcumulado da série 'nome' do armazém de séries, ou None se a série
+    não foi carregada. O índice é recalculado só quando a série muda.
+    """
+    try:
+        serie = armazem_series.serie(nome)
+    except ErroSerie:
+        return None
+    if not len(serie):
+        return None
+
+    chave = (nome, id(calendario))
+    versao = (len(serie), serie.ultima_data())
+    with _lock:
+        guardado = _cache.get(chave)
+        if guardado is None or guardado[0] != versao:
+            if PERIODICIDADES.get(nome, 'diaria') == 'mensal':
+                indice = IndiceAcumulado.de_serie_mensal(serie.datas, serie.coluna(), calendario)
+            else:
+                indice = IndiceAcumulado.de_serie_diaria(serie.datas, serie.coluna(), calendario)
+            guardado = (versao, indice)
+            _cache[chave] = guardado
+        return guardado[1]
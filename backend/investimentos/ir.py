@@ -0,0 +1,189 @@
+"""
+Casamento FIFO de lotes e cálculo de IR regressivo + IOF em lote (NumPy).
+"""
+import numpy as np
+
+# Quantidades viram inteiros (milionésimos) para que os cortes entre lotes e
+# vendas sejam exatos.
+ESCALA = 10 ** 6
+
+# IR regressivo da renda fixa: (dias corridos até, alíquota)
+TABELA_IR = ((180, 0.225), (360, 0.20), (720, 0.175))
+ALIQUOTA_IR_MINIMA = 0.15
+
+# IOF regressivo sobre o rendimento, por dia corrido (0 a 29); a partir do 30º dia é zero
+TABELA_IOF = np.array([
+    1.00, 0.96, 0.93, 0.90, 0.86, 0.83, 0.80, 0.76, 0.73, 0.70,
+    0.66, 0.63, 0.60, 0.56, 0.53, 0.50, 0.46, 0.43, 0.40, 0.36,
+    0.33, 0.30, 0.26, 0.23, 0.20, 0.16, 0.13, 0.10, 0.06, 0.03,
+])
+
+
+def aliquota_ir(dias):
+    """
+    Alíquota do IR regressivo para um array de prazos em dias corridos.
+    """
+    dias = np.asarray(dias)
+    limites = np.array([limite for limite, _ in TABELA_IR])
+    aliquotas = np.array([aliquota for _, aliquota in TABELA_IR] + [ALIQUOTA_IR_MINIMA])
+    return aliquotas[np.searchsorted(limites, dias, side='left')]
+
+
+def aliquota_iof(dias):
+    dias = np.asarray(dias)
+    return np.where(dias < len(TABELA_IOF), TABELA_IOF[np.clip(dias, 0, len(TABELA_IOF) - 1)], 0.0)
+
+
+def casar_fifo(lote_grupo, lote_data, lote_quantidade, venda_grupo, venda_data, venda_quantidade):
+    """
+    Casa as vendas com os lotes de compra mais antigos do mesmo grupo
+    (posição), para todos os grupos de uma vez. Uma venda só consome lotes
+    com data igual ou anterior à dela.
+
+    Os lotes de todos os grupos são enfileirados em um único eixo de
+    quantidade (cada grupo ocupa um trecho contíguo, em ordem de data); cada
+    venda ocupa o trecho seguinte ao das vendas anteriores do grupo, limitado
+    ao fim dos lotes já comprados na data da venda. Os pedaços entre pontos
+    de corte consecutivos pertencem a exatamente um lote e uma venda, e são
+    encontrados com searchsorted.
+
+    Entradas são arrays alinhados (grupos inteiros, datas datetime64[D],
+    quantidades float). Retorna (lote, venda, quantidade) de cada pedaço
+    casado, com índices nos arrays de entrada, e a quantidade vendida sem
+    lote disponível na data (vendas a descoberto) por venda.
+    """
+    lote_grupo = np.asarray(lote_grupo, dtype=np.int64)
+    venda_grupo = np.asarray(venda_grupo, dtype=np.int64)
+    lote_dias = _dias(lote_data)
+    venda_dias = _dias(venda_data)
+    ordem_lotes = np.lexsort((lote_dias, lote_grupo))
+    ordem_vendas = np.lexsort((venda_dias, venda_grupo))
+
+    grupo_l = lote_grupo[ordem_lotes]
+    q_l = np.rint(np.asarray(lote_quantidade, dtype=np.float64)[ordem_lotes] * ESCALA).astype(np.int64)
+    fim_l = np.cumsum(q_l)
+    # Posição no eixo depois dos k primeiros lotes: 0, fim do 1º, fim do 2º...
+    eixo = np.concatenate(([0], fim_l))
+
+    grupo_s = venda_grupo[ordem_vendas]
+    q_s = np.rint(np.asarray(venda_quantidade, dtype=np.float64)[ordem_vendas] * ESCALA).astype(np.int64)
+
+    # Início do trecho do grupo de cada venda (ou onde ele estaria, se o
+    # grupo não tem lotes) e fim dos lotes do grupo comprados até a data dela
+    base = eixo[np.searchsorted(grupo_l, grupo_s, side='left')]
+    disponivel = eixo[_lotes_ate(grupo_l, lote_dias[ordem_lotes], grupo_s, venda_dias[ordem_vendas])]
+
+    # fim_k = min(fim_{k-1} + q_k, disponivel_k), com fim_0 = base. Com S a
+    # soma acumulada das vendas, fim_k = S_k + min(base - S_0, min_{j<=k}(disponivel_j - S_j)).
+    acumulado = np.cumsum(q_s)
+    primeira = np.ones(len(q_s), dtype=bool)
+    primeira[1:] = grupo_s[1:] != grupo_s[:-1]
+    antes_do_grupo = np.maximum.accumulate(np.where(primeira, np.arange(len(q_s)), 0))
+    anterior = acumulado[antes_do_grupo] - q_s[antes_do_grupo]
+    fim_s = acumulado + np.minimum(
+        base - anterior, _minimo_acumulado_por_grupo(disponivel - acumulado, primeira)
+    )
+    inicio_s = np.where(primeira, base, np.roll(fim_s, 1))
+    descoberto = np.empty(len(q_s), dtype=np.float64)
+    descoberto[ordem_vendas] = (q_s - (fim_s - inicio_s)) / ESCALA
+
+    vendidas = fim_s > inicio_s
+    if not vendidas.any():
+        vazio = np.empty(0, dtype=np.int64)
+        return vazio, vazio, np.empty(0), descoberto
+
+    pontos = np.unique(np.concatenate((inicio_s[vendidas], fim_s[vendidas], fim_l)))
+    esquerda, tamanho = pontos[:-1], np.diff(pontos)
+    venda = np.searchsorted(fim_s, esquerda, side='right')
+    valido = venda < len(fim_s)
+    venda = np.minimum(venda, len(fim_s) - 1)
+    valido &= inicio_s[venda] <= esquerda
+    lote = np.minimum(np.searchsorted(fim_l, esquerda, side='right'), len(fim_l) - 1)
+
+    return (
+        ordem_lotes[lote[valido]],
+        ordem_vendas[venda[valido]],
+        tamanho[valido] / ESCALA,
+        descoberto,
+    )
+
+
+def _dias(data):
+    return np.asarray(data, dtype='datetime64[D]').astype(np.int64)
+
+
+def _lotes_ate(grupo_l, dias_l, grupo_s, dias_s):
+    """
+    Para cada venda, quantos lotes (na ordem grupo, data) vêm até o grupo e
+    a data dela, inclusive os comprados no mesmo dia.
+    """
+    # Lotes e vendas em uma só ordenação; no mesmo dia o lote vem antes
+    grupos = np.concatenate((grupo_l, grupo_s))
+    dias = np.concatenate((dias_l, dias_s))
+    venda = np.concatenate((np.zeros(len(grupo_l), dtype=bool), np.ones(len(grupo_s), dtype=bool)))
+    ordem = np.lexsort((venda, dias, grupos))
+    lotes_antes = np.cumsum(~venda[ordem])
+    # lexsort é estável: as vendas saem na ordem em que já estavam
+    return lotes_antes[venda[ordem]]
+
+
+def _minimo_acumulado_por_grupo(valores, primeira):
+    """
+    Mínimo acumulado que recomeça a cada grupo ('primeira' marca o início).
+    """
+    if not len(valores):
+        return valores
+    indice_grupo = np.cumsum(primeira) - 1
+    amplitude = int(valores.max()) - int(valores.min()) + 1
+    if amplitude * (int(indice_grupo[-1]) + 1) < 2 ** 62:
+        # Cada grupo fica inteiro abaixo dos anteriores, então o mínimo
+        # acumulado não atravessa a fronteira entre grupos
+        deslocamento = indice_grupo * amplitude
+        return np.minimum.accumulate(valores - deslocamento) + deslocamento
+    inicios = np.flatnonzero(primeira)
+    return np.concatenate([
+        np.minimum.accumulate(trecho) for trecho in np.split(valores, inicios[1:])
+    ])
+
+
+def calcular_impostos(lotes, vendas):
+    """
+    FIFO + IR regressivo + IOF para todas as vendas de uma vez.
+
+    'lotes' e 'vendas' são dicts de arrays alinhados com as chaves grupo,
+    data, quantidade e preco (preço unitário). Para cada venda retorna
+    arrays com custo, receita, ganho, iof, ir e quantidade_descoberta.
+
+    O IOF incide sobre o rendimento de cada pedaço resgatado em menos de 30
+    dias; o IR incide sobre o rendimento menos o IOF, com a alíquota do prazo
+    de cada lote. Pedaços com prejuízo não pagam imposto.
+    """
+    lote, venda, quantidade, descoberto = casar_fifo(
+        lotes['grupo'], lotes['data'], lotes['quantidade'],
+        vendas['grupo'], vendas['data'], vendas['quantidade'],
+    )
+    preco_lote = np.asarray(lotes['preco'], dtype=np.float64)
+    preco_venda = np.asarray(vendas['preco'], dtype=np.float64)
+    data_lote = np.asarray(lotes['data'], dtype='datetime64[D]')
+    data_venda = np.asarray(vendas['data'], dtype='datetime64[D]')
+
+    custo = quantidade * preco_lote[lote]
+    receita = quantidade * preco_venda[venda]
+    ganho = receita - custo
+    dias = (data_venda[venda] - data_lote[lote]).astype(np.int64)
+    iof = np.where(ganho > 0, ganho * aliquota_iof(dias), 0.0)
+    ir = np.where(ganho > 0, (ganho - iof) * aliquota_ir(dias), 0.0)
+
+    total = len(preco_venda)
+
+    def por_venda(valores):
+        return np.bincount(venda, weights=valores, minlength=total)
+
+    return {
+        'custo': por_venda(custo),
+        'receita': por_venda(receita),
+        'ganho': por_venda(ganho),
+        'iof': por_venda(iof),
+        'ir': por_venda(ir),
+        'quantidade_descoberta': descoberto,
+    }
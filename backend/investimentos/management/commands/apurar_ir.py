@@ -0,0 +1,18 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investimentos.services import preaquecer_ir
+
+
+class Command(BaseCommand):
+    help = "Apura o IR dos resgates do ano para todos os usuários e grava os relatórios no cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, default=date.today().year)
+
+    def handle(self, *args, **options):
+        usuarios, duracao = preaquecer_ir(options['ano'])
+        self.stdout.write(self.style.SUCCESS(
+            f"IR {options['ano']}: {usuarios} usuários com resgates apurados em {duracao:.2f}s."
+        ))
@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from investimentos.services import avaliar_todas, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Reavalia as posições de todos os usuários (rodar após o fechamento do mercado)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', type=date.fromisoformat, help="Data-base AAAA-MM-DD; padrão: hoje")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+
+    def handle(self, *args, **options):
+        resultado = avaliar_todas(options['data'], tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.posicoes} posições avaliadas em {resultado.duracao:.2f}s "
+            f"({resultado.por_segundo:.0f} posições/s; cálculo: {resultado.duracao_calculo:.2f}s)."
+        ))
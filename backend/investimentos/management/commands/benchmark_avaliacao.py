@@ -0,0 +1,111 @@
+import time
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from investimentos.avaliacao import INDEXADORES, TIPOS, Colunas, avaliar
+from investimentos.calendario import calendario_b3
+from investimentos.indices import IndiceAcumulado
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o motor de avaliação colunar (NumPy) com posições sintéticas e compara "
+        "com um loop Decimal por posição executado em uma amostra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posicoes', type=int, default=1_000_000)
+        parser.add_argument('--amostra', type=int, default=20_000, help="Posições avaliadas no loop Decimal")
+        parser.add_argument('--repeticoes', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        data_base = date(2025, 6, 30)
+        cdi_anual, ipca_anual = 0.149, 0.045
+        colunas = self._gerar(options['posicoes'], data_base, np.random.default_rng(options['seed']))
+
+        melhor = min(self._medir(lambda: avaliar(colunas, data_base, cdi_anual, ipca_anual))
+                     for _ in range(options['repeticoes']))
+        self.stdout.write(
+            f"NumPy:   {len(colunas)} posições em {melhor * 1000:.1f} ms "
+            f"({len(colunas) / melhor:,.0f} posições/s)"
+        )
+
+        # Mesmo cálculo com calendário B3 e índices acumulados de CDI/IPCA
+        rng = np.random.default_rng(options['seed'])
+        uteis = calendario_b3.dias[calendario_b3.util & (calendario_b3.dias <= np.datetime64(data_base))]
+        meses = np.unique(uteis.astype('datetime64[M]')).astype('datetime64[D]')
+        indices = {
+            'cdi': IndiceAcumulado.de_serie_diaria(uteis, rng.uniform(0.03, 0.06, len(uteis))),
+            'ipca': IndiceAcumulado.de_serie_mensal(meses, rng.uniform(0.1, 0.8, len(meses))),
+        }
+        com_indices = min(
+            self._medir(lambda: avaliar(colunas, data_base, cdi_anual, ipca_anual, calendario_b3, indices))
+            for _ in range(options['repeticoes'])
+        )
+        self.stdout.write(
+            f"NumPy + calendário/índices: {com_indices * 1000:.1f} ms "
+            f"({len(colunas) / com_indices:,.0f} posições/s)"
+        )
+
+        amostra = min(options['amostra'], len(colunas))
+        duracao = self._medir(lambda: self._loop_decimal(colunas, amostra, data_base, cdi_anual, ipca_anual))
+        self.stdout.write(
+            f"Decimal: {amostra} posições em {duracao * 1000:.1f} ms "
+            f"({amostra / duracao:,.0f} posições/s; ~{len(colunas) / amostra * duracao:.1f}s para {len(colunas)})"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Ganho: {(duracao / amostra) / (melhor / len(colunas)):.0f}x"))
+
+    def _gerar(self, quantidade, data_base, rng):
+        inicio = np.datetime64(data_base, 'D') - rng.integers(1, 3650, quantidade).astype('timedelta64[D]')
+        vencimento = inicio + rng.integers(180, 3650, quantidade).astype('timedelta64[D]')
+        vencimento[rng.random(quantidade) < 0.3] = np.datetime64('NaT')
+        tipo = np.where(rng.random(quantidade) < 0.3, TIPOS['acao'], TIPOS['renda_fixa']).astype(np.int8)
+        indexador = rng.integers(1, 4, quantidade).astype(np.int8)
+        indexador[tipo == TIPOS['acao']] = INDEXADORES['']
+        taxa = np.where(indexador == INDEXADORES['cdi'], rng.uniform(90, 130, quantidade), rng.uniform(4, 14, quantidade))
+        return Colunas(
+            ids=np.arange(1, quantidade + 1, dtype=np.int64),
+            tipo=tipo,
+            indexador=indexador,
+            quantidade=rng.integers(1, 1000, quantidade).astype(np.float64),
+            valor_aplicado=np.round(rng.uniform(100, 100_000, quantidade), 2),
+            taxa=np.round(taxa, 4),
+            inicio=inicio,
+            vencimento=vencimento,
+            preco=np.where(tipo == TIPOS['acao'], np.round(rng.uniform(5, 200, quantidade), 2), np.nan),
+        )
+
+    def _loop_decimal(self, colunas, quantidade, data_base, cdi_anual, ipca_anual):
+        # Referência: como seria avaliar posição a posição com Decimal
+        cdi_diario = (1 + Decimal(str(cdi_anual))) ** (Decimal(1) / 252) - 1
+        ipca = 1 + Decimal(str(ipca_anual))
+        valores = []
+        for i in range(quantidade):
+            if colunas.tipo[i] == TIPOS['acao']:
+                valores.append(Decimal(str(colunas.quantidade[i])) * Decimal(str(colunas.preco[i])))
+                continue
+            inicio = colunas.inicio[i].astype(date)
+            fim = data_base
+            if not np.isnat(colunas.vencimento[i]):
+                fim = min(fim, colunas.vencimento[i].astype(date))
+            du = int(np.busday_count(inicio, fim))
+            dc = (fim - inicio).days
+            taxa = Decimal(str(colunas.taxa[i])) / 100
+            aplicado = Decimal(str(colunas.valor_aplicado[i]))
+            if colunas.indexador[i] == INDEXADORES['prefixado']:
+                fator = (1 + taxa) ** (Decimal(du) / 252)
+            elif colunas.indexador[i] == INDEXADORES['cdi']:
+                fator = (1 + cdi_diario * taxa) ** du
+            else:
+                fator = ipca ** (Decimal(dc) / 365) * (1 + taxa) ** (Decimal(du) / 252)
+            valores.append((aplicado * fator).quantize(Decimal('0.01')))
+        return valores
+
+    def _medir(self, funcao):
+        inicio = time.perf_counter()
+        funcao()
+        return time.perf_counter() - inicio
@@ -0,0 +1,88 @@
+import time
+from collections import deque
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from investimentos.ir import ALIQUOTA_IR_MINIMA, TABELA_IOF, TABELA_IR, calcular_impostos
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o motor de IR (FIFO + IR regressivo + IOF em arrays) com lotes e resgates "
+        "sintéticos e compara com um loop FIFO por posição (deque) em uma amostra."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lotes', type=int, default=1_000_000)
+        parser.add_argument('--vendas', type=int, default=500_000)
+        parser.add_argument('--posicoes', type=int, default=100_000)
+        parser.add_argument('--amostra', type=int, default=20_000, help="Vendas processadas pelo loop")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        lotes = self._gerar(rng, options['lotes'], options['posicoes'], 90, 110)
+        vendas = self._gerar(rng, options['vendas'], options['posicoes'], 95, 130)
+
+        inicio = time.perf_counter()
+        resultado = calcular_impostos(lotes, vendas)
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(
+            f"NumPy: {options['lotes']} lotes x {options['vendas']} vendas em {duracao * 1000:.0f} ms "
+            f"({options['vendas'] / duracao:,.0f} vendas/s); IR total {resultado['ir'].sum():,.2f}"
+        )
+
+        # A amostra são as vendas das primeiras posições, com todos os lotes delas
+        limite = max(1, int(options['posicoes'] * options['amostra'] / max(options['vendas'], 1)))
+        amostra_lotes = {chave: valores[lotes['grupo'] < limite] for chave, valores in lotes.items()}
+        amostra_vendas = {chave: valores[vendas['grupo'] < limite] for chave, valores in vendas.items()}
+        inicio = time.perf_counter()
+        self._loop(amostra_lotes, amostra_vendas)
+        duracao_loop = time.perf_counter() - inicio
+        quantidade = len(amostra_vendas['grupo'])
+        self.stdout.write(
+            f"Loop:  {quantidade} vendas em {duracao_loop * 1000:.0f} ms "
+            f"({quantidade / duracao_loop:,.0f} vendas/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Ganho: {(duracao_loop / quantidade) / (duracao / options['vendas']):.0f}x"
+        ))
+
+    def _gerar(self, rng, quantidade, posicoes, preco_minimo, preco_maximo):
+        return {
+            'grupo': rng.integers(0, posicoes, quantidade),
+            'data': np.datetime64('2020-01-01') + rng.integers(0, 1800, quantidade).astype('timedelta64[D]'),
+            'quantidade': np.round(rng.uniform(1, 100, quantidade), 6),
+            'preco': rng.uniform(preco_minimo, preco_maximo, quantidade),
+        }
+
+    def _loop(self, lotes, vendas):
+        # Referência: uma fila por posição e um loop por venda/lote
+        tabela_iof = TABELA_IOF.tolist()
+        filas = {}
+        ordem = np.lexsort((lotes['data'], lotes['grupo']))
+        for i in ordem.tolist():
+            filas.setdefault(int(lotes['grupo'][i]), deque()).append(
+                [lotes['data'][i], float(lotes['quantidade'][i]), float(lotes['preco'][i])]
+            )
+        resultado = []
+        for j in np.lexsort((vendas['data'], vendas['grupo'])).tolist():
+            fila = filas.get(int(vendas['grupo'][j]), deque())
+            restante, preco, data = float(vendas['quantidade'][j]), float(vendas['preco'][j]), vendas['data'][j]
+            ir = 0.0
+            while restante > 1e-9 and fila:
+                lote = fila[0]
+                parte = min(restante, lote[1])
+                ganho = parte * (preco - lote[2])
+                dias = int((data - lote[0]).astype(int))
+                if ganho > 0:
+                    iof = ganho * (tabela_iof[max(dias, 0)] if dias < len(tabela_iof) else 0.0)
+                    aliquota = next((a for limite, a in TABELA_IR if dias <= limite), ALIQUOTA_IR_MINIMA)
+                    ir += (ganho - iof) * aliquota
+                lote[1] -= parte
+                restante -= parte
+                if lote[1] <= 1e-9:
+                    fila.popleft()
+            resultado.append(ir)
+        return resultado
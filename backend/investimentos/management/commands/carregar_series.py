@@ -0,0 +1,85 @@
+import csv
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from investimentos.series import ErroSerie, armazem_series
+from transacoes.extratos import converter_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega uma série diária (CDI, SELIC, IPCA...) de um CSV local para o armazém "
+        "de séries mapeadas em memória. Aceita o formato do SGS/Banco Central: "
+        "'data;valor' com datas dd/mm/aaaa e vírgula decimal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('nome', help="Nome da série, ex.: cdi")
+        parser.add_argument('arquivo', help="Caminho do CSV")
+        parser.add_argument('--coluna-data', default='data')
+        parser.add_argument('--colunas', nargs='+', help="Colunas de valores; padrão: todas exceto a data")
+        parser.add_argument('--encoding', default='utf-8-sig')
+
+    def handle(self, *args, **options):
+        try:
+            datas, valores = self._ler(options)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        ordem = np.argsort(datas, kind='stable')
+        datas = datas[ordem]
+        valores = {coluna: v[ordem] for coluna, v in valores.items()}
+        # Mantém a última ocorrência de datas repetidas
+        unicas = np.append(datas[1:] != datas[:-1], True) if len(datas) else np.empty(0, bool)
+
+        try:
+            gravadas = armazem_series.acrescentar(
+                options['nome'], datas[unicas], {coluna: v[unicas] for coluna, v in valores.items()}
+            )
+        except ErroSerie as e:
+            raise CommandError(str(e))
+
+        serie = armazem_series.serie(options['nome'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(datas)} linhas lidas, {gravadas} novas. Série '{serie.nome}': "
+            f"{len(serie)} linhas até {serie.ultima_data()}."
+        ))
+
+    def _ler(self, options):
+        with open(options['arquivo'], newline='', encoding=options['encoding']) as arquivo:
+            cabecalho = arquivo.readline()
+            delimitador = ';' if cabecalho.count(';') >= cabecalho.count(',') else ','
+            nomes = [nome.strip().lower() for nome in next(csv.reader([cabecalho], delimiter=delimitador))]
+            if options['coluna_data'] not in nomes:
+                raise CommandError(f"Coluna de data '{options['coluna_data']}' não encontrada.")
+            colunas = options['colunas'] or [nome for nome in nomes if nome != options['coluna_data']]
+            faltando = set(colunas) - set(nomes)
+            if faltando:
+                raise CommandError(f"Colunas não encontradas: {', '.join(sorted(faltando))}.")
+
+            indice_data = nomes.index(options['coluna_data'])
+            indices = [nomes.index(coluna) for coluna in colunas]
+            datas = []
+            valores = [[] for _ in colunas]
+            for numero, linha in enumerate(csv.reader(arquivo, delimiter=delimitador), start=2):
+                if not any(campo.strip() for campo in linha):
+                    continue
+                try:
+                    datas.append(converter_data(linha[indice_data].strip()))
+                    for lista, indice in zip(valores, indices):
+                        lista.append(_numero(linha[indice]))
+                except (IndexError, ValueError):
+                    raise CommandError(f"Linha {numero} inválida: {delimitador.join(linha)}")
+
+        return (
+            np.array(datas, dtype='datetime64[D]'),
+            {coluna: np.array(lista, dtype=np.float64) for coluna, lista in zip(colunas, valores)},
+        )
+
+
+def _numero(texto):
+    texto = texto.strip()
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return float(texto)
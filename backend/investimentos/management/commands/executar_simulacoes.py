@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from investimentos.models import Simulacao
+from investimentos.services import (
+    executar_proxima_simulacao, executor_simulacao, expurgar_simulacoes, marcar_abandonadas,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Executa as simulações de Monte Carlo agendadas por POST /api/investimentos/simulacao/, "
+        "no pool de processos deste comando e fora dos workers web. Use --intervalo para rodar "
+        "como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help="Verifica a fila a cada N segundos (0 = esvazia a fila e sai)")
+        parser.add_argument('--sem-processos', action='store_true',
+                            help="Executa no próprio processo, sem o pool (depuração)")
+        parser.add_argument('--status', action='store_true', help="Apenas mostra a fila de simulações")
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self._mostrar_fila()
+            return
+
+        executor = None if options['sem_processos'] else executor_simulacao()
+        try:
+            while True:
+                self._executar_fila(executor)
+                if not options['intervalo']:
+                    break
+                time.sleep(options['intervalo'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        self._mostrar_fila()
+
+    def _executar_fila(self, executor):
+        abandonadas = marcar_abandonadas()
+        if abandonadas:
+            self.stdout.write(self.style.WARNING(f"{abandonadas} simulações abandonadas marcadas como erro."))
+        expurgar_simulacoes()
+        while (item := executar_proxima_simulacao(executor)) is not None:
+            if item.status == 'concluida':
+                self.stdout.write(f"Simulação {item.pk.hex} concluída em {item.resultado['duracao']:.2f}s.")
+            else:
+                self.stdout.write(self.style.ERROR(f"Simulação {item.pk.hex} falhou: {item.erro}"))
+
+    def _mostrar_fila(self):
+        contagem = dict(Simulacao.objects.values_list('status').annotate(total=Count('id')).order_by())
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulações: {contagem.get('pendente', 0)} pendentes, {contagem.get('executando', 0)} executando, "
+            f"{contagem.get('concluida', 0)} concluídas, {contagem.get('erro', 0)} com erro."
+        ))
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bancos', '0006_metadadosbanco'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ativo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=12, unique=True)),
+                ('nome', models.CharField(blank=True, default='', max_length=255)),
+                ('preco', models.DecimalField(blank=True, decimal_places=4, max_digits=14, null=True)),
+                ('atualizado_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ativo',
+                'verbose_name_plural': 'Ativos',
+                'ordering': ['ticker'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Posicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('renda_fixa', 'Renda Fixa'), ('acao', 'Renda Variável')], max_length=20)),
+                ('nome', models.CharField(help_text='Ex.: CDB Banco X 110% CDI', max_length=255)),
+                ('quantidade', models.DecimalField(decimal_places=8, default=0, max_digits=20)),
+                ('valor_aplicado', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('data_aplicacao', models.DateField()),
+                ('vencimento', models.DateField(blank=True, null=True)),
+                ('indexador', models.CharField(blank=True, choices=[('prefixado', 'Prefixado'), ('cdi', 'CDI'), ('ipca', 'IPCA+')], default='', max_length=20)),
+                ('taxa', models.DecimalField(decimal_places=4, default=0, help_text='% do CDI (ex.: 110), taxa prefixada ou spread do IPCA+ ao ano (ex.: 6.5)', max_digits=9)),
+                ('valor_atual', models.DecimalField(blank=True, decimal_places=2, max_digits=16, null=True)),
+                ('avaliado_em', models.DateTimeField(blank=True, null=True)),
+                ('ativo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='posicoes', to='investimentos.ativo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posicoes', to=settings.AUTH_USER_MODEL)),
+                ('usuario_banco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='posicoes', to='bancos.usuariobanco')),
+            ],
+            options={
+                'verbose_name': 'Posição',
+                'verbose_name_plural': 'Posições',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['user', 'tipo'], name='posicao_user_tipo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Movimentacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('aplicacao', 'Aplicação/Compra'), ('resgate', 'Resgate/Venda')], max_length=10)),
+                ('data', models.DateField()),
+                ('quantidade', models.DecimalField(decimal_places=8, max_digits=20)),
+                ('valor', models.DecimalField(decimal_places=2, help_text='Valor total da operação', max_digits=16)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('posicao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimentacoes', to='investimentos.posicao')),
+            ],
+            options={
+                'verbose_name': 'Movimentação',
+                'verbose_name_plural': 'Movimentações',
+                'ordering': ['data', 'id'],
+                'indexes': [models.Index(fields=['posicao', 'data'], name='movimentacao_posicao_data_idx')],
+            },
+        ),
+    ]
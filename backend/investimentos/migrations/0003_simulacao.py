@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:44
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('investimentos', '0002_movimentacao'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Simulacao',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('executando', 'Executando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=10)),
+                ('progresso', models.FloatField(default=0.0)),
+                ('premissas', models.JSONField(help_text='Entradas de simulacao.preparar(), fixadas no pedido')),
+                ('caminhos', models.PositiveIntegerField()),
+                ('seed', models.BigIntegerField()),
+                ('percentis', models.JSONField()),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('erro', models.CharField(blank=True, default='', max_length=255)),
+                ('criada_em', models.DateTimeField(auto_now_add=True)),
+                ('atualizada_em', models.DateTimeField(default=django.utils.timezone.now, help_text='Último sinal do worker')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simulacoes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Simulação',
+                'verbose_name_plural': 'Simulações',
+                'indexes': [models.Index(fields=['status', 'criada_em'], name='simulacao_status_idx')],
+            },
+        ),
+    ]
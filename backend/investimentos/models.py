@@ -0,0 +1,128 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+from bancos.models import UsuarioBanco
+
+
+class Ativo(models.Model):
+    """
+    Ação/FII/ETF negociado em bolsa, com o último preço conhecido.
+    """
+    ticker = models.CharField(max_length=12, unique=True)
+    nome = models.CharField(max_length=255, blank=True, default='')
+    preco = models.DecimalField(max_digits=14, decimal_places=4, null=True, blank=True)
+    atualizado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Ativo"
+        verbose_name_plural = "Ativos"
+        ordering = ['ticker']
+
+    def __str__(self):
+        return self.ticker
+
+
+class Posicao(models.Model):
+    TIPO_CHOICES = [
+        ('renda_fixa', 'Renda Fixa'),
+        ('acao', 'Renda Variável'),
+    ]
+    INDEXADOR_CHOICES = [
+        ('prefixado', 'Prefixado'),
+        ('cdi', 'CDI'),
+        ('ipca', 'IPCA+'),
+    ]
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="posicoes")
+    usuario_banco = models.ForeignKey(UsuarioBanco, on_delete=models.CASCADE, related_name="posicoes")
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    nome = models.CharField(max_length=255, help_text="Ex.: CDB Banco X 110% CDI")
+    ativo = models.ForeignKey(Ativo, on_delete=models.PROTECT, null=True, blank=True, related_name="posicoes")
+    quantidade = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    valor_aplicado = models.DecimalField(max_digits=16, decimal_places=2)
+    data_aplicacao = models.DateField()
+    vencimento = models.DateField(null=True, blank=True)
+    indexador = models.CharField(max_length=20, choices=INDEXADOR_CHOICES, blank=True, default='')
+    taxa = models.DecimalField(
+        max_digits=9, decimal_places=4, default=0,
+        help_text="% do CDI (ex.: 110), taxa prefixada ou spread do IPCA+ ao ano (ex.: 6.5)"
+    )
+    valor_atual = models.DecimalField(max_digits=16, decimal_places=2, null=True, blank=True)
+    avaliado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Posição"
+        verbose_name_plural = "Posições"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['user', 'tipo'], name='posicao_user_tipo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome} ({self.user_id})"
+
+
+class Movimentacao(models.Model):
+    """
+    Aplicação (lote de compra) ou resgate/venda de uma posição; base do
+    casamento FIFO e da apuração de IR.
+    """
+    TIPO_CHOICES = [
+        ('aplicacao', 'Aplicação/Compra'),
+        ('resgate', 'Resgate/Venda'),
+    ]
+    posicao = models.ForeignKey(Posicao, on_delete=models.CASCADE, related_name="movimentacoes")
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    data = models.DateField()
+    quantidade = models.DecimalField(max_digits=20, decimal_places=8)
+    valor = models.DecimalField(max_digits=16, decimal_places=2, help_text="Valor total da operação")
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Movimentação"
+        verbose_name_plural = "Movimentações"
+        ordering = ['data', 'id']
+        indexes = [
+            models.Index(fields=['posicao', 'data'], name='movimentacao_posicao_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} {self.data} {self.valor}"
+
+
+class Simulacao(models.Model):
+    """
+    Simulação de Monte Carlo grande demais para a requisição. Gravada pela
+    SimulacaoView e executada pelo comando executar_simulacoes, fora dos
+    processos web; o progresso fica aqui, visível de qualquer worker.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('executando', 'Executando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    ]
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="simulacoes")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    progresso = models.FloatField(default=0.0)
+    premissas = models.JSONField(help_text="Entradas de simulacao.preparar(), fixadas no pedido")
+    caminhos = models.PositiveIntegerField()
+    seed = models.BigIntegerField()
+    percentis = models.JSONField()
+    resultado = models.JSONField(null=True, blank=True)
+    erro = models.CharField(max_length=255, blank=True, default='')
+    criada_em = models.DateTimeField(auto_now_add=True)
+    atualizada_em = models.DateTimeField(default=timezone.now, help_text="Último sinal do worker")
+
+    class Meta:
+        verbose_name = "Simulação"
+        verbose_name_plural = "Simulações"
+        indexes = [
+            # Próxima simulação do worker e busca das abandonadas
+            models.Index(fields=['status', 'criada_em'], name='simulacao_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.id} ({self.status})"
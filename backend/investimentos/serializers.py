@@ -0,0 +1,136 @@
+from decimal import Decimal
+
+import numpy as np
+from rest_framework import serializers
+from bancos.models import UsuarioBanco
+from .calendario import calendario_b3
+from .models import Ativo, Movimentacao, Posicao
+from .services import saldo_disponivel
+
+
+class PosicaoSerializer(serializers.ModelSerializer):
+    usuario_banco = serializers.PrimaryKeyRelatedField(queryset=UsuarioBanco.objects.select_related('banco'))
+    ativo = serializers.SlugRelatedField(
+        slug_field='ticker', queryset=Ativo.objects.all(), required=False, allow_null=True
+    )
+
+    class Meta:
+        model = Posicao
+        fields = [
+            'id', 'usuario_banco', 'tipo', 'nome', 'ativo', 'quantidade', 'valor_aplicado',
+            'data_aplicacao', 'vencimento', 'indexador', 'taxa',
+        ]
+        read_only_fields = ['id']
+
+    def validate_usuario_banco(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Banco não encontrado.")
+        if value.banco.tipo != 'conta_investimentos':
+            raise serializers.ValidationError("O banco precisa ser uma conta de investimentos.")
+        return value
+
+    def validate_data_aplicacao(self, value):
+        return _validar_no_calendario(value)
+
+    def validate_vencimento(self, value):
+        return _validar_no_calendario(value)
+
+    def validate(self, attrs):
+        if attrs.get('tipo') == 'acao':
+            if not attrs.get('ativo'):
+                raise serializers.ValidationError({'ativo': "Informe o ticker do ativo."})
+        elif not attrs.get('indexador'):
+            raise serializers.ValidationError({'indexador': "Informe o indexador da renda fixa."})
+        return attrs
+
+
+def _validar_no_calendario(value):
+    # A avaliação conta dias úteis pelo calendário da B3, que tem um intervalo fixo
+    if value is not None and not calendario_b3.contem(value):
+        primeiro = calendario_b3.base.astype(object)
+        ultimo = (calendario_b3.fim - 1).astype(object)
+        raise serializers.ValidationError(f"Informe uma data entre {primeiro:%d/%m/%Y} e {ultimo:%d/%m/%Y}.")
+    return value
+
+
+class MovimentacaoSerializer(serializers.ModelSerializer):
+    posicao = serializers.PrimaryKeyRelatedField(queryset=Posicao.objects.all())
+
+    class Meta:
+        model = Movimentacao
+        fields = ['id', 'posicao', 'tipo', 'data', 'quantidade', 'valor']
+        read_only_fields = ['id']
+        extra_kwargs = {
+            'quantidade': {'min_value': Decimal('0.00000001')},
+            'valor': {'min_value': Decimal('0')},
+        }
+
+    def validate_posicao(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Posição não encontrada.")
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('tipo') == 'resgate':
+            disponivel = saldo_disponivel(attrs['posicao'], attrs['data'])
+            if attrs['quantidade'] > disponivel:
+                raise serializers.ValidationError(
+                    {'quantidade': f"Quantidade maior que o saldo da posição na data ({disponivel.normalize()})."}
+                )
+        return attrs
+
+
+class ClasseAtivoSerializer(serializers.Serializer):
+    nome = serializers.CharField(max_length=50)
+    peso = serializers.FloatField(min_value=0)
+    retorno_anual = serializers.FloatField(min_value=-0.9, max_value=2, help_text="Ex.: 0.12 para 12% a.a.")
+    volatilidade_anual = serializers.FloatField(min_value=0, max_value=2, help_text="Ex.: 0.25 para 25% a.a.")
+
+
+class AporteSerializer(serializers.Serializer):
+    inicio = serializers.IntegerField(min_value=1, help_text="Mês do primeiro aporte (1 = próximo mês)")
+    fim = serializers.IntegerField(min_value=1, required=False, help_text="Último mês; padrão: aporte único")
+    valor = serializers.FloatField(min_value=0)
+
+    def validate(self, attrs):
+        if attrs.get('fim') and attrs['fim'] < attrs['inicio']:
+            raise serializers.ValidationError({'fim': "O fim precisa ser maior ou igual ao início."})
+        return attrs
+
+
+class SimulacaoSerializer(serializers.Serializer):
+    valor_inicial = serializers.FloatField(min_value=0, default=0)
+    usar_carteira = serializers.BooleanField(default=False, help_text="Soma a carteira atual ao valor inicial")
+    aporte_mensal = serializers.FloatField(min_value=0, default=0)
+    aportes = AporteSerializer(many=True, required=False)
+    horizonte_meses = serializers.IntegerField(min_value=1, max_value=600, default=120)
+    classes = ClasseAtivoSerializer(many=True, required=False, max_length=10)
+    correlacoes = serializers.ListField(
+        child=serializers.ListField(child=serializers.FloatField(min_value=-1, max_value=1)),
+        required=False,
+    )
+    caminhos = serializers.IntegerField(min_value=100, max_value=200_000, default=10_000)
+    seed = serializers.IntegerField(min_value=0, max_value=2 ** 63 - 1, required=False)
+    percentis = serializers.ListField(
+        child=serializers.FloatField(min_value=1, max_value=99),
+        default=[5, 25, 50, 75, 95], max_length=9,
+    )
+
+    def validate(self, attrs):
+        classes = attrs.get('classes')
+        if classes is not None and not sum(classe['peso'] for classe in classes):
+            raise serializers.ValidationError({'classes': "Informe ao menos uma classe com peso."})
+
+        correlacoes = attrs.get('correlacoes')
+        if correlacoes is not None:
+            if not classes:
+                raise serializers.ValidationError({'correlacoes': "Informe as classes junto com as correlações."})
+            matriz = np.array(correlacoes, dtype=object)
+            if matriz.shape != (len(classes), len(classes)):
+                raise serializers.ValidationError({'correlacoes': "A matriz precisa ser N x N (N = classes)."})
+            matriz = matriz.astype(np.float64)
+            if not np.allclose(matriz, matriz.T) or not np.allclose(np.diag(matriz), 1.0):
+                raise serializers.ValidationError({'correlacoes': "A matriz precisa ser simétrica com diagonal 1."})
+            if np.linalg.eigvalsh(matriz).min() < -1e-10:
+                raise serializers.ValidationError({'correlacoes': "A matriz de correlação é inconsistente."})
+        return attrs
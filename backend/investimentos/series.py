@@ -0,0 +1,172 @@
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+TIPO_DATA = np.dtype('<M8[D]')
+TIPO_VALOR = np.dtype('<f8')
+ARQUIVO_META = 'meta.json'
+ARQUIVO_DATAS = 'datas.M8'
+
+
+class ErroSerie(Exception):
+    pass
+
+
+class SerieTemporal:
+    """
+    Série diária somente leitura: datas (datetime64[D], crescentes) e colunas
+    float64 mapeadas em memória (np.memmap).
+
+    Os arrays retornados são views do arquivo, sem cópia; processos que abrem a
+    mesma série compartilham as páginas pelo cache do sistema operacional.
+    """
+
+    def __init__(self, diretorio, meta):
+        self.diretorio = Path(diretorio)
+        self.nome = self.diretorio.name
+        self.linhas = meta['linhas']
+        self.colunas = list(meta['colunas'])
+        self.datas = _mapear(self.diretorio / ARQUIVO_DATAS, TIPO_DATA, self.linhas)
+        self._valores = {
+            coluna: _mapear(self.diretorio / f"{coluna}.f8", TIPO_VALOR, self.linhas)
+            for coluna in self.colunas
+        }
+
+    def __len__(self):
+        return self.linhas
+
+    def coluna(self, nome='valor'):
+        try:
+            return self._valores[nome]
+        except KeyError:
+            raise ErroSerie(f"Coluna '{nome}' não existe na série '{self.nome}'.")
+
+    def posicoes(self, inicio=None, fim=None):
+        """
+        Índices [i, j) das linhas com inicio <= data <= fim (busca binária).
+        """
+        i = 0 if inicio is None else int(np.searchsorted(self.datas, np.datetime64(inicio, 'D'), 'left'))
+        j = self.linhas if fim is None else int(np.searchsorted(self.datas, np.datetime64(fim, 'D'), 'right'))
+        return i, j
+
+    def intervalo(self, inicio=None, fim=None, colunas=None):
+        """
+        Retorna (datas, {coluna: valores}) entre inicio e fim (inclusivos),
+        como fatias sem cópia dos arquivos mapeados.
+        """
+        i, j = self.posicoes(inicio, fim)
+        colunas = self.colunas if colunas is None else colunas
+        return self.datas[i:j], {coluna: self.coluna(coluna)[i:j] for coluna in colunas}
+
+    def ultima_data(self):
+        return self.datas[-1] if self.linhas else None
+
+
+def _mapear(caminho, tipo, linhas):
+    if linhas == 0:
+        return np.empty(0, dtype=tipo)
+    return np.memmap(caminho, dtype=tipo, mode='r', shape=(linhas,))
+
+
+class ArmazemSeries:
+    """
+    Diretório com uma subpasta por série (cdi, selic, ipca...). Cada subpasta
+    guarda meta.json, datas.M8 e um arquivo .f8 por coluna, todos com
+    'linhas' registros de tamanho fixo.
+
+    Escritas só acrescentam ao fim dos arquivos; meta.json é trocado por último
+    (os.replace), então leitores nunca enxergam linhas pela metade.
+    """
+
+    def __init__(self, diretorio=None):
+        self._diretorio = Path(diretorio) if diretorio else None
+        self._abertas = {}
+        self._lock = threading.Lock()
+
+    @property
+    def diretorio(self):
+        if self._diretorio is None:
+            return Path(getattr(settings, 'INVESTIMENTOS_SERIES_DIR', settings.BASE_DIR / 'dados' / 'series'))
+        return self._diretorio
+
+    def nomes(self):
+        if not self.diretorio.is_dir():
+            return []
+        return sorted(p.name for p in self.diretorio.iterdir() if (p / ARQUIVO_META).is_file())
+
+    def serie(self, nome):
+        """
+        Abre a série (com cache por processo). Reabre sozinho se outro
+        processo acrescentou linhas desde a última abertura.
+        """
+        caminho = self.diretorio / nome / ARQUIVO_META
+        try:
+            versao = caminho.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise ErroSerie(f"Série '{nome}' não encontrada em {self.diretorio}.")
+
+        with self._lock:
+            aberta = self._abertas.get(nome)
+            if aberta is None or aberta[0] != versao:
+                aberta = (versao, SerieTemporal(caminho.parent, self._ler_meta(nome)))
+                self._abertas[nome] = aberta
+            return aberta[1]
+
+    def acrescentar(self, nome, datas, colunas):
+        """
+        Acrescenta linhas ao fim da série, criando-a se necessário. As datas
+        devem ser estritamente crescentes e posteriores à última gravada;
+        linhas com data já existente são ignoradas. Retorna quantas linhas
+        foram gravadas.
+        """
+        datas = np.asarray(datas, dtype=TIPO_DATA)
+        valores = {coluna: np.asarray(v, dtype=TIPO_VALOR) for coluna, v in colunas.items()}
+        if any(len(v) != len(datas) for v in valores.values()):
+            raise ErroSerie("Todas as colunas precisam ter o mesmo tamanho das datas.")
+        if len(datas) > 1 and not np.all(datas[1:] > datas[:-1]):
+            raise ErroSerie("As datas precisam estar em ordem crescente e sem repetição.")
+
+        pasta = self.diretorio / nome
+        with self._lock:
+            meta = self._ler_meta(nome) if (pasta / ARQUIVO_META).is_file() else None
+            if meta is None:
+                pasta.mkdir(parents=True, exist_ok=True)
+                meta = {'linhas': 0, 'colunas': sorted(valores)}
+            elif set(valores) != set(meta['colunas']):
+                raise ErroSerie(f"Colunas da série '{nome}': {', '.join(meta['colunas'])}.")
+
+            if meta['linhas']:
+                ultima = _mapear(pasta / ARQUIVO_DATAS, TIPO_DATA, meta['linhas'])[-1]
+                novas = datas > ultima
+                datas = datas[novas]
+                valores = {coluna: v[novas] for coluna, v in valores.items()}
+            if not len(datas):
+                return 0
+
+            # Trunca restos de uma escrita interrompida antes de acrescentar
+            _acrescentar(pasta / ARQUIVO_DATAS, datas, meta['linhas'])
+            for coluna in meta['colunas']:
+                _acrescentar(pasta / f"{coluna}.f8", valores[coluna], meta['linhas'])
+
+            meta['linhas'] += len(datas)
+            temporario = pasta / f"{ARQUIVO_META}.tmp"
+            temporario.write_text(json.dumps(meta))
+            os.replace(temporario, pasta / ARQUIVO_META)
+            self._abertas.pop(nome, None)
+            return len(datas)
+
+    def _ler_meta(self, nome):
+        return json.loads((self.diretorio / nome / ARQUIVO_META).read_text())
+
+
+def _acrescentar(caminho, valores, linhas):
+    with open(caminho, 'ab') as arquivo:
+        arquivo.truncate(linhas * valores.dtype.itemsize)
+        arquivo.write(np.ascontiguousarray(valores).tobytes())
+
+
+armazem_series = ArmazemSeries()
@@ -0,0 +1,445 @@
+import logging
+import multiprocessing
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.utils import timezone
+from users.cache import cache_compartilhado
+
+from . import cache as cache_investimentos, simulacao
+from .ir import calcular_impostos
+from .avaliacao import CAMPOS, Colunas, avaliar
+from .calendario import calendario_b3
+from .indices import obter_indice
+from .models import Movimentacao, Posicao, Simulacao
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 100_000
+
+
+def parametros_avaliacao():
+    """
+    Calendário B3 e índices das séries carregadas (CDI/IPCA); as taxas anuais
+    das settings só são usadas para séries que ainda não foram carregadas.
+    """
+    return {
+        'cdi_anual': getattr(settings, 'INVESTIMENTOS_CDI_ANUAL', 0.149),
+        'ipca_anual': getattr(settings, 'INVESTIMENTOS_IPCA_ANUAL', 0.045),
+        'calendario': calendario_b3,
+        'indices': {'cdi': obter_indice('cdi'), 'ipca': obter_indice('ipca')},
+    }
+
+
+def avaliar_posicoes(posicoes, *extras, data_base=None):
+    """
+    Avalia um queryset de Posicao. Retorna (linhas, valores), onde linhas são
+    as tuplas CAMPOS + extras de cada posição e valores o array alinhado a elas.
+    """
+    data_base = data_base or timezone.localdate()
+    linhas = list(posicoes.order_by('id').values_list(*CAMPOS, *extras))
+    return linhas, avaliar(Colunas.de_linhas(linhas), data_base, **parametros_avaliacao())
+
+
+@dataclass
+class ResultadoAvaliacao:
+    posicoes: int = 0
+    duracao: float = 0.0
+    duracao_calculo: float = 0.0
+
+    @property
+    def por_segundo(self):
+        return self.posicoes / self.duracao if self.duracao else 0.0
+
+
+def avaliar_todas(data_base=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Reavalia as posições de todos os usuários em lotes colunares e grava
+    valor_atual/avaliado_em. Os lotes são lidos por faixa de id (keyset) e
+    gravados com um único executemany por lote.
+    """
+    data_base = data_base or timezone.localdate()
+    parametros = parametros_avaliacao()
+    agora = connection.ops.adapt_datetimefield_value(timezone.now())
+    tabela = connection.ops.quote_name(Posicao._meta.db_table)
+    sql = f"UPDATE {tabela} SET valor_atual = %s, avaliado_em = %s WHERE id = %s"
+
+    resultado = ResultadoAvaliacao()
+    inicio = time.perf_counter()
+    ultimo_id = 0
+    while True:
+        linhas = list(
+            Posicao.objects.filter(id__gt=ultimo_id).order_by('id').values_list(*CAMPOS)[:tamanho_lote]
+        )
+        if not linhas:
+            break
+        colunas = Colunas.de_linhas(linhas)
+        inicio_calculo = time.perf_counter()
+        valores = avaliar(colunas, data_base, **parametros)
+        resultado.duracao_calculo += time.perf_counter() - inicio_calculo
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, [
+                (f"{valor:.2f}", agora, int(pk)) for valor, pk in zip(valores.tolist(), colunas.ids.tolist())
+            ])
+        resultado.posicoes += len(colunas)
+        ultimo_id = int(colunas.ids[-1])
+
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
+
+
+# Premissas usadas quando a simulação não informa as classes de ativos
+PREMISSAS_PADRAO = {
+    'renda_fixa': {'retorno_anual': None, 'volatilidade_anual': 0.01},  # None: CDI das settings
+    'acao': {'retorno_anual': 0.12, 'volatilidade_anual': 0.25},
+}
+PESOS_PADRAO = {'renda_fixa': 0.7, 'acao': 0.3}
+
+# Caminhos x meses executados direto na requisição; acima disso a simulação
+# é gravada para o comando executar_simulacoes e a resposta é 202 com o id.
+LIMITE_INTERATIVO = 10_000 * 360
+# Pendente por mais que isso (nenhum worker rodando) ou executando sem
+# progresso por mais que isso (worker morto): a simulação vira erro
+ESPERA_MAXIMA_SIMULACAO = timedelta(hours=1)
+SEM_SINAL_SIMULACAO = timedelta(minutes=10)
+RETENCAO_SIMULACAO = timedelta(days=1)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def processos_simulacao():
+    return getattr(settings, 'INVESTIMENTOS_SIMULACAO_PROCESSOS', 0) or os.cpu_count() or 1
+
+
+def executor_simulacao():
+    """
+    ProcessPoolExecutor do worker de simulações, criado sob demanda. Usa
+    forkserver (quando disponível) para não herdar threads e locks do
+    processo; os processos filhos só importam investimentos.simulacao.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            contexto = None
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                contexto = multiprocessing.get_context('forkserver')
+            _executor = ProcessPoolExecutor(max_workers=processos_simulacao(), mp_context=contexto)
+        return _executor
+
+
+def _descartar_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def premissas_simulacao(user, dados):
+    """
+    Converte os dados validados de SimulacaoSerializer nas entradas (JSON)
+    de simulacao.preparar(). Com usar_carteira, o valor inicial e os pesos
+    vêm da carteira atual.
+    """
+    horizonte = dados['horizonte_meses']
+    aportes = np.full(horizonte, float(dados.get('aporte_mensal', 0.0)))
+    for aporte in dados.get('aportes', []):
+        fim = min(aporte.get('fim') or aporte['inicio'], horizonte)
+        aportes[aporte['inicio'] - 1:fim] += aporte['valor']
+
+    valor_inicial = float(dados.get('valor_inicial', 0.0))
+    classes = dados.get('classes')
+    if dados.get('usar_carteira'):
+        linhas, valores = avaliar_posicoes(Posicao.objects.filter(user=user))
+        por_tipo = {}
+        for linha, valor in zip(linhas, valores.tolist()):
+            por_tipo[linha[1]] = por_tipo.get(linha[1], 0.0) + valor
+        valor_inicial += sum(por_tipo.values())
+        if not classes and por_tipo:
+            classes = [_classe_padrao(tipo, peso) for tipo, peso in por_tipo.items() if peso > 0]
+    if not classes:
+        classes = [_classe_padrao(tipo, peso) for tipo, peso in PESOS_PADRAO.items()]
+
+    return {
+        'valor_inicial': valor_inicial,
+        'aportes': aportes.tolist(),
+        'retornos_anuais': [classe['retorno_anual'] for classe in classes],
+        'volatilidades_anuais': [classe['volatilidade_anual'] for classe in classes],
+        'pesos': [classe['peso'] for classe in classes],
+        'correlacoes': dados.get('correlacoes'),
+        'classes': [classe['nome'] for classe in classes],
+    }
+
+
+def preparar_simulacao(premissas):
+    """
+    ParametrosSimulacao e nomes das classes a partir de premissas_simulacao().
+    """
+    entradas = {chave: valor for chave, valor in premissas.items() if chave != 'classes'}
+    return simulacao.preparar(**entradas), premissas['classes']
+
+
+def _classe_padrao(tipo, peso):
+    premissas = PREMISSAS_PADRAO[tipo]
+    retorno = premissas['retorno_anual']
+    if retorno is None:
+        retorno = getattr(settings, 'INVESTIMENTOS_CDI_ANUAL', 0.149)
+    return {'nome': tipo, 'peso': peso, 'retorno_anual': retorno, 'volatilidade_anual': premissas['volatilidade_anual']}
+
+
+def executar_simulacao(parametros, caminhos, seed, percentuais, executor=None, progresso=None):
+    inicio = time.perf_counter()
+    grupos = processos_simulacao() * 2 if executor is not None else 1
+    resultado = simulacao.simular(
+        parametros, caminhos, seed, percentuais, executor=executor, grupos=grupos, progresso=progresso
+    )
+    return {
+        'meses': list(range(parametros.horizonte + 1)),
+        'percentis': {
+            f"p{percentual:g}": np.round(valores, 2).tolist()
+            for percentual, valores in resultado['percentis'].items()
+        },
+        'media': np.round(resultado['media'], 2).tolist(),
+        'aportado': np.round(resultado['aportado'], 2).tolist(),
+        'caminhos': caminhos,
+        'seed': seed,
+        'duracao': round(time.perf_counter() - inicio, 3),
+    }
+
+
+def nova_seed():
+    return secrets.randbelow(2 ** 31)
+
+
+def agendar_simulacao(user, premissas, caminhos, seed, percentuais):
+    """
+    Grava a simulação para o comando executar_simulacoes e retorna o id.
+    """
+    return Simulacao.objects.create(
+        user=user, premissas=premissas, caminhos=caminhos, seed=seed, percentis=list(percentuais),
+    ).id
+
+
+def estado_simulacao(tarefa, user_id):
+    """
+    Status, progresso e (quando concluída) resultado de uma simulação do
+    usuário, ou None se não existir.
+    """
+    try:
+        item = Simulacao.objects.filter(pk=tarefa, user_id=user_id).first()
+    except ValidationError:
+        return None
+    if item is None:
+        return None
+    if item.status in ('pendente', 'executando') and _abandonada(item.status, item.criada_em, item.atualizada_em):
+        marcar_abandonadas()
+        item.refresh_from_db()
+    estado = {'status': item.status, 'progresso': item.progresso}
+    if item.status == 'concluida':
+        estado['resultado'] = item.resultado
+    elif item.status == 'erro':
+        estado['erro'] = item.erro
+    return estado
+
+
+def _abandonada(status, criada_em, atualizada_em):
+    agora = timezone.now()
+    if status == 'pendente':
+        return criada_em < agora - ESPERA_MAXIMA_SIMULACAO
+    return atualizada_em < agora - SEM_SINAL_SIMULACAO
+
+
+def marcar_abandonadas():
+    """
+    Marca como erro as simulações que nenhum worker pegou a tempo e as que
+    pararam de dar sinal (worker reiniciado ou morto no meio da execução).
+    """
+    agora = timezone.now()
+    esquecidas = Simulacao.objects.filter(status='pendente', criada_em__lt=agora - ESPERA_MAXIMA_SIMULACAO).update(
+        status='erro', erro="Nenhum worker executou a simulação a tempo.", atualizada_em=agora,
+    )
+    interrompidas = Simulacao.objects.filter(
+        status='executando', atualizada_em__lt=agora - SEM_SINAL_SIMULACAO,
+    ).update(status='erro', erro="A execução da simulação foi interrompida.", atualizada_em=agora)
+    return esquecidas + interrompidas
+
+
+def executar_proxima_simulacao(executor=None):
+    """
+    Reserva a simulação pendente mais antiga e a executa (no 'executor',
+    quando informado). Retorna a Simulacao executada ou None se a fila
+    estiver vazia.
+    """
+    while True:
+        pk = (
+            Simulacao.objects.filter(status='pendente').order_by('criada_em')
+            .values_list('pk', flat=True).first()
+        )
+        if pk is None:
+            return None
+        # UPDATE condicional: com vários workers, só um muda o status
+        if Simulacao.objects.filter(pk=pk, status='pendente').update(
+            status='executando', atualizada_em=timezone.now(),
+        ):
+            break
+
+    item = Simulacao.objects.get(pk=pk)
+
+    def progresso(feitos, total):
+        Simulacao.objects.filter(pk=pk).update(progresso=round(feitos / total, 3), atualizada_em=timezone.now())
+
+    try:
+        parametros, classes = preparar_simulacao(item.premissas)
+        resultado = executar_simulacao(
+            parametros, item.caminhos, item.seed, item.percentis, executor=executor, progresso=progresso,
+        )
+    except Exception as e:
+        logger.exception("Falha na simulação %s", pk)
+        if executor is not None:
+            _descartar_executor()
+        item.status, item.erro = 'erro', f"{type(e).__name__}: {e}"[:255]
+    else:
+        resultado['classes'] = classes
+        item.status, item.progresso, item.resultado = 'concluida', 1.0, resultado
+    item.atualizada_em = timezone.now()
+    item.save(update_fields=['status', 'progresso', 'resultado', 'erro', 'atualizada_em'])
+    return item
+
+
+def expurgar_simulacoes():
+    """
+    Remove as simulações encerradas há mais de RETENCAO_SIMULACAO.
+    """
+    limite = timezone.now() - RETENCAO_SIMULACAO
+    return Simulacao.objects.filter(status__in=['concluida', 'erro'], atualizada_em__lt=limite).delete()[0]
+
+
+CAMPOS_IR = (
+    'id', 'posicao_id', 'posicao__user_id', 'posicao__tipo', 'posicao__nome',
+    'tipo', 'data', 'quantidade', 'valor',
+)
+
+
+def saldo_disponivel(posicao, data):
+    """
+    Quanto da posição pode ser resgatado em 'data' sem deixar a descoberto
+    este resgate nem os já lançados depois dele: o menor saldo de 'data' em
+    diante.
+    """
+    saldo = Decimal('0')
+    menor = None
+    movimentacoes = posicao.movimentacoes.order_by('data', 'id').values_list('tipo', 'data', 'quantidade')
+    for tipo, dia, quantidade in movimentacoes:
+        if dia > data and menor is None:
+            menor = saldo
+        saldo += quantidade if tipo == 'aplicacao' else -quantidade
+        if dia > data:
+            menor = min(menor, saldo)
+    return max(saldo if menor is None else menor, Decimal('0'))
+
+
+def apurar_ir(ano, usuarios=None):
+    """
+    Apura o IR dos resgates de 'ano' para todos os usuários (ou só os
+    informados) em uma única passada do motor FIFO. Retorna {user_id: relatório}.
+
+    Todas as movimentações até 31/12 do ano entram no casamento, porque
+    resgates de anos anteriores já consumiram parte dos lotes. O IR regressivo
+    e o IOF valem para renda fixa; para renda variável é informado apenas o
+    ganho apurado (a tributação de ações segue regras mensais próprias).
+    """
+    movimentacoes = Movimentacao.objects.filter(data__lte=date(ano, 12, 31))
+    if usuarios is not None:
+        movimentacoes = movimentacoes.filter(posicao__user__in=usuarios)
+    linhas = list(movimentacoes.order_by('posicao_id', 'data', 'id').values_list(*CAMPOS_IR))
+    if not linhas:
+        return {}
+
+    ids, posicoes, users, tipos_posicao, nomes, tipos, datas, quantidades, valores = zip(*linhas)
+    posicoes = np.array(posicoes, dtype=np.int64)
+    datas = np.array(datas, dtype='datetime64[D]')
+    quantidades = np.array(quantidades, dtype=np.float64)
+    precos = np.array(valores, dtype=np.float64) / np.where(quantidades > 0, quantidades, 1.0)
+    resgate = np.array(tipos) == 'resgate'
+    aplicacao = ~resgate
+
+    impostos = calcular_impostos(
+        {'grupo': posicoes[aplicacao], 'data': datas[aplicacao],
+         'quantidade': quantidades[aplicacao], 'preco': precos[aplicacao]},
+        {'grupo': posicoes[resgate], 'data': datas[resgate],
+         'quantidade': quantidades[resgate], 'preco': precos[resgate]},
+    )
+
+    inicio_ano = np.datetime64(f"{ano:04d}-01-01")
+    relatorios = {}
+    indices_resgate = np.flatnonzero(resgate)
+    no_ano = datas[indices_resgate] >= inicio_ano
+    for posicao_venda in np.flatnonzero(no_ano).tolist():
+        i = int(indices_resgate[posicao_venda])
+        renda_fixa = tipos_posicao[i] == 'renda_fixa'
+        item = {
+            'id': ids[i],
+            'posicao': int(posicoes[i]),
+            'nome': nomes[i],
+            'tipo': tipos_posicao[i],
+            'data': str(datas[i]),
+            'quantidade': float(quantidades[i]),
+            'receita': round(float(impostos['receita'][posicao_venda]), 2),
+            'custo': round(float(impostos['custo'][posicao_venda]), 2),
+            'ganho': round(float(impostos['ganho'][posicao_venda]), 2),
+            'iof': round(float(impostos['iof'][posicao_venda]), 2) if renda_fixa else 0.0,
+            'ir': round(float(impostos['ir'][posicao_venda]), 2) if renda_fixa else 0.0,
+            'quantidade_descoberta': float(impostos['quantidade_descoberta'][posicao_venda]),
+        }
+        relatorio = relatorios.setdefault(users[i], _relatorio_vazio(ano))
+        relatorio['resgates'].append(item)
+        for chave in ('receita', 'custo', 'ganho', 'iof', 'ir'):
+            relatorio['totais'][chave] = round(relatorio['totais'][chave] + item[chave], 2)
+    return relatorios
+
+
+def _relatorio_vazio(ano):
+    return {'ano': ano, 'resgates': [], 'totais': {'receita': 0.0, 'custo': 0.0, 'ganho': 0.0, 'iof': 0.0, 'ir': 0.0}}
+
+
+def relatorio_ir(user, ano):
+    """
+    Relatório de IR do usuário no ano, servido do cache enquanto as
+    movimentações dele não mudarem. Sem cache compartilhado é sempre
+    apurado: a invalidação só alcançaria o worker que gravou.
+    """
+    if not cache_compartilhado():
+        return apurar_ir(ano, [user.id]).get(user.id) or _relatorio_vazio(ano)
+    versao = cache_investimentos.versao_ir(user.id)
+    relatorio = cache_investimentos.obter_ir(user.id, ano, versao)
+    if relatorio is None:
+        relatorio = apurar_ir(ano, [user.id]).get(user.id) or _relatorio_vazio(ano)
+        cache_investimentos.salvar_ir(user.id, ano, versao, relatorio)
+    return relatorio
+
+
+def preaquecer_ir(ano):
+    """
+    Apura o IR de todos os usuários de uma vez e grava no cache (fechamento
+    do ano). Sem cache compartilhado só apura: o cache deste processo se
+    perde quando o comando termina.
+    """
+    inicio = time.perf_counter()
+    relatorios = apurar_ir(ano)
+    if not cache_compartilhado():
+        return len(relatorios), time.perf_counter() - inicio
+    versoes = cache_investimentos.versoes_ir(list(relatorios))
+    cache_investimentos.salvar_ir_varios(ano, relatorios, versoes)
+    return len(relatorios), time.perf_counter() - inicio
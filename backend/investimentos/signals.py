@@ -0,0 +1,34 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Movimentacao, Posicao
+from .cache import invalidar_ir
+
+
+@receiver(post_save, sender=Movimentacao)
+@receiver(post_delete, sender=Movimentacao)
+def invalidar_ir_movimentacao(sender, instance, origin=None, **kwargs):
+    # Na exclusão em cascata de uma posição, o sinal da Posicao já invalida
+    if origin is not None and not _originada_em(origin, Movimentacao):
+        return
+    user_id = Posicao.objects.filter(pk=instance.posicao_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        _invalidar_no_commit(user_id)
+
+
+@receiver(post_save, sender=Posicao)
+@receiver(post_delete, sender=Posicao)
+def invalidar_ir_posicao(sender, instance, **kwargs):
+    _invalidar_no_commit(instance.user_id)
+
+
+def _invalidar_no_commit(user_id):
+    # Depois do commit: com rollback nada muda e um leitor concorrente não
+    # regrava no cache, sob a versão nova, o relatório de antes da escrita
+    transaction.on_commit(partial(invalidar_ir, user_id))
+
+
+def _originada_em(origin, model):
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
@@ -0,0 +1,201 @@
+"""
+Simulação de Monte Carlo de patrimônio (carteira ou plano de aportes).
+
+Este módulo só depende de NumPy para que os processos do ProcessPoolExecutor
+não precisem carregar o Django.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# Caminhos por sub-bloco. Cada sub-bloco tem sua própria semente derivada de
+# SeedSequence(seed).spawn(), então o resultado não depende de quantos
+# processos participaram nem de como os sub-blocos foram agrupados.
+TAMANHO_BLOCO = 5000
+# Faixas do histograma por mês (em log do patrimônio, relativo à trajetória
+# determinística). Histogramas somam entre blocos, ao contrário de percentis.
+FAIXAS = 2048
+DESVIOS = 6.0
+
+
+@dataclass(frozen=True)
+class ParametrosSimulacao:
+    valor_inicial: float
+    aportes: np.ndarray      # aporte no início de cada mês 1..H
+    pesos: np.ndarray        # peso de cada classe (soma 1)
+    drift: np.ndarray        # média mensal do log-retorno de cada classe
+    cholesky: np.ndarray     # fator A da covariância mensal (A·Aᵀ = Σ)
+    referencia: np.ndarray   # log1p da trajetória determinística, meses 0..H
+    meia_largura: np.ndarray # meia largura do histograma em log, meses 0..H
+
+    @property
+    def horizonte(self):
+        return len(self.aportes)
+
+
+def preparar(valor_inicial, aportes, retornos_anuais, volatilidades_anuais, pesos, correlacoes=None):
+    """
+    Converte premissas anuais em parâmetros mensais. Os log-retornos mensais
+    de cada classe são normais com volatilidade vol/√12 e média ajustada para
+    que o retorno esperado composto seja o informado; a carteira é
+    rebalanceada todo mês.
+    """
+    aportes = np.asarray(aportes, dtype=np.float64)
+    retornos = np.asarray(retornos_anuais, dtype=np.float64)
+    volatilidades = np.asarray(volatilidades_anuais, dtype=np.float64)
+    pesos = np.asarray(pesos, dtype=np.float64)
+    pesos = pesos / pesos.sum()
+    classes = len(pesos)
+
+    correlacoes = np.eye(classes) if correlacoes is None else np.asarray(correlacoes, dtype=np.float64)
+    sigma = volatilidades / np.sqrt(12.0)
+    covariancia = correlacoes * np.outer(sigma, sigma)
+    try:
+        cholesky = np.linalg.cholesky(covariancia)
+    except np.linalg.LinAlgError:
+        # Semidefinida (ex.: correlação 1): qualquer A com A·Aᵀ = Σ serve
+        autovalores, autovetores = np.linalg.eigh(covariancia)
+        cholesky = autovetores * np.sqrt(np.maximum(autovalores, 0.0))
+    drift = np.log1p(retornos) / 12.0 - sigma ** 2 / 2.0
+
+    crescimento = float(np.dot(pesos, np.power(1.0 + retornos, 1.0 / 12.0)))
+    deterministico = np.empty(len(aportes) + 1)
+    deterministico[0] = valor_inicial
+    for mes, aporte in enumerate(aportes, start=1):
+        deterministico[mes] = (deterministico[mes - 1] + aporte) * crescimento
+
+    volatilidade_carteira = float(np.dot(pesos, volatilidades))
+    meses = np.arange(len(aportes) + 1)
+    meia_largura = np.maximum(DESVIOS * volatilidade_carteira * np.sqrt(meses / 12.0), 0.01)
+    return ParametrosSimulacao(
+        valor_inicial=float(valor_inicial),
+        aportes=aportes,
+        pesos=pesos,
+        drift=drift,
+        cholesky=cholesky,
+        referencia=np.log1p(deterministico),
+        meia_largura=meia_largura,
+    )
+
+
+def sementes(seed, caminhos):
+    """
+    Sementes e tamanhos dos sub-blocos para 'caminhos' caminhos.
+    """
+    blocos = -(-caminhos // TAMANHO_BLOCO)
+    filhas = np.random.SeedSequence(seed).spawn(blocos)
+    return [
+        (filha, min(TAMANHO_BLOCO, caminhos - i * TAMANHO_BLOCO))
+        for i, filha in enumerate(filhas)
+    ]
+
+
+def simular_blocos(parametros, blocos):
+    """
+    Simula uma lista de sub-blocos (semente, caminhos) e devolve
+    (histograma[meses + 1, FAIXAS], soma[meses + 1]) somados entre eles.
+    Executado nos processos do pool.
+    """
+    meses = parametros.horizonte
+    histograma = np.zeros((meses + 1) * FAIXAS, dtype=np.int64)
+    soma = np.zeros(meses + 1)
+    for semente, caminhos in blocos:
+        patrimonio = _trajetorias(parametros, np.random.default_rng(semente), caminhos)
+        histograma += _contar(parametros, patrimonio)
+        soma += patrimonio.sum(axis=0)
+    return histograma.reshape(meses + 1, FAIXAS), soma
+
+
+def _trajetorias(parametros, rng, caminhos):
+    # Patrimônio [caminhos, meses + 1]. W_t = (W_{t-1} + a_t)·g_t, resolvido
+    # sem loop: W_t = G_t·(W_0 + Σ_{s<=t} a_s / G_{s-1}), com G_t = Π g.
+    meses = parametros.horizonte
+    # Layout [classe, caminho x mês]: correlação, exp e média ponderada viram
+    # uma multiplicação de matrizes, um exp in-place e um produto vetor-matriz.
+    choques = parametros.cholesky @ rng.standard_normal((len(parametros.pesos), caminhos * meses))
+    choques += parametros.drift[:, None]
+    np.exp(choques, out=choques)
+    crescimento = (parametros.pesos @ choques).reshape(caminhos, meses)
+    acumulado = np.cumprod(crescimento, axis=1)
+    anterior = np.empty_like(acumulado)
+    anterior[:, 0] = 1.0
+    anterior[:, 1:] = acumulado[:, :-1]
+    patrimonio = np.empty((caminhos, meses + 1))
+    patrimonio[:, 0] = parametros.valor_inicial
+    patrimonio[:, 1:] = acumulado * (parametros.valor_inicial + np.cumsum(parametros.aportes / anterior, axis=1))
+    return np.maximum(patrimonio, 0.0)
+
+
+def _contar(parametros, patrimonio):
+    relativo = np.log1p(patrimonio) - parametros.referencia
+    largura = parametros.meia_largura
+    faixa = ((relativo + largura) / (2.0 * largura) * FAIXAS).astype(np.int64)
+    np.clip(faixa, 0, FAIXAS - 1, out=faixa)
+    faixa += np.arange(patrimonio.shape[1]) * FAIXAS
+    return np.bincount(faixa.ravel(), minlength=patrimonio.shape[1] * FAIXAS)
+
+
+def percentis(parametros, histograma, percentuais):
+    """
+    Percentis de cada mês a partir do histograma, com interpolação linear
+    dentro da faixa. Retorna {percentual: array[meses + 1]}.
+    """
+    acumulado = np.cumsum(histograma, axis=1)
+    total = acumulado[:, -1]
+    largura = 2.0 * parametros.meia_largura / FAIXAS
+    resultado = {}
+    for percentual in percentuais:
+        alvo = total * percentual / 100.0
+        faixa = np.array([np.searchsorted(linha, a, side='left') for linha, a in zip(acumulado, alvo)])
+        faixa = np.minimum(faixa, FAIXAS - 1)
+        linhas = np.arange(len(faixa))
+        antes = np.where(faixa > 0, acumulado[linhas, faixa - 1], 0)
+        na_faixa = np.maximum(histograma[linhas, faixa], 1)
+        fracao = np.clip((alvo - antes) / na_faixa, 0.0, 1.0)
+        relativo = -parametros.meia_largura + (faixa + fracao) * largura
+        resultado[percentual] = np.maximum(np.expm1(parametros.referencia + relativo), 0.0)
+    return resultado
+
+
+def agrupar(blocos, grupos):
+    """
+    Divide os sub-blocos em até 'grupos' tarefas contíguas.
+    """
+    grupos = max(1, min(grupos, len(blocos)))
+    tamanho = -(-len(blocos) // grupos)
+    return [blocos[i:i + tamanho] for i in range(0, len(blocos), tamanho)]
+
+
+def simular(parametros, caminhos, seed, percentuais=(5, 25, 50, 75, 95), executor=None, grupos=1,
+            progresso=None):
+    """
+    Executa a simulação e devolve {'percentis', 'media', 'aportado'}.
+
+    Com 'executor' (ProcessPoolExecutor), as tarefas são distribuídas entre os
+    processos e 'progresso(feitos, total)' é chamado a cada tarefa concluída.
+    O resultado é idêntico com ou sem executor para a mesma seed.
+    """
+    tarefas = agrupar(sementes(seed, caminhos), grupos)
+    meses = parametros.horizonte
+    histograma = np.zeros((meses + 1, FAIXAS), dtype=np.int64)
+    soma = np.zeros(meses + 1)
+
+    if executor is None:
+        resultados = (simular_blocos(parametros, tarefa) for tarefa in tarefas)
+    else:
+        from concurrent.futures import as_completed
+        futuros = [executor.submit(simular_blocos, parametros, tarefa) for tarefa in tarefas]
+        resultados = (futuro.result() for futuro in as_completed(futuros))
+
+    for feitos, (parcial, parcial_soma) in enumerate(resultados, start=1):
+        histograma += parcial
+        soma += parcial_soma
+        if progresso is not None:
+            progresso(feitos, len(tarefas))
+
+    aportado = parametros.valor_inicial + np.concatenate(([0.0], np.cumsum(parametros.aportes)))
+    return {
+        'percentis': percentis(parametros, histograma, percentuais),
+        'media': soma / caminhos,
+        'aportado': aportado,
+    }
@@ -0,0 +1,334 @@
+import tempfile
+from datetime import date, timedelta
+from unittest import mock
+
+import numpy as np
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from bancos.models import Banco, UsuarioBanco
+from users.models import CustomUser
+from . import cache as cache_investimentos
+from .avaliacao import Colunas, avaliar
+from .calendario import calendario_b3
+from .indices import IndiceAcumulado
+from .ir import calcular_impostos, casar_fifo
+from .models import Movimentacao, Posicao, Simulacao
+from .series import ARQUIVO_DATAS, ArmazemSeries, ErroSerie
+from .services import avaliar_posicoes, avaliar_todas, executar_proxima_simulacao, relatorio_ir
+
+
+def datas(*valores):
+    return np.array(valores, dtype='datetime64[D]')
+
+
+class CasarFifoTests(TestCase):
+
+    def test_venda_nao_consome_lote_comprado_depois(self):
+        # Lotes fora de ordem na entrada: março antes de janeiro
+        lote, venda, quantidade, descoberto = casar_fifo(
+            [1, 1], datas('2024-03-10', '2024-01-10'), [10, 10],
+            [1], datas('2024-02-10'), [15],
+        )
+        self.assertEqual(lote.tolist(), [1])
+        self.assertEqual(venda.tolist(), [0])
+        self.assertEqual(quantidade.tolist(), [10.0])
+        self.assertEqual(descoberto.tolist(), [5.0])
+
+    def test_lote_posterior_fica_para_a_venda_seguinte(self):
+        lote, venda, quantidade, descoberto = casar_fifo(
+            [1, 1], datas('2024-03-10', '2024-01-10'), [10, 10],
+            [1, 1], datas('2024-04-10', '2024-02-10'), [8, 15],
+        )
+        pedacos = sorted(zip(lote.tolist(), venda.tolist(), quantidade.tolist()))
+        self.assertEqual(pedacos, [(0, 0, 8.0), (1, 1, 10.0)])
+        self.assertEqual(descoberto.tolist(), [0.0, 5.0])
+
+    def test_datas_anteriores_a_1970(self):
+        lote, venda, quantidade, descoberto = casar_fifo(
+            [2, 1, 1], datas('1965-06-01', '1969-12-01', '1960-01-01'), [5, 5, 5],
+            [1, 2], datas('1970-01-02', '1966-01-01'), [7, 5],
+        )
+        pedacos = sorted(zip(lote.tolist(), venda.tolist(), quantidade.tolist()))
+        self.assertEqual(pedacos, [(0, 1, 5.0), (1, 0, 2.0), (2, 0, 5.0)])
+        self.assertEqual(descoberto.tolist(), [0.0, 0.0])
+
+    def test_venda_sem_lote_do_grupo(self):
+        lote, venda, quantidade, descoberto = casar_fifo(
+            [1], datas('2024-01-10'), [10],
+            [2, 1], datas('2024-02-10', '2024-02-10'), [3, 4],
+        )
+        self.assertEqual(list(zip(lote.tolist(), venda.tolist(), quantidade.tolist())), [(0, 1, 4.0)])
+        self.assertEqual(descoberto.tolist(), [3.0, 0.0])
+
+
+class CalcularImpostosTests(TestCase):
+
+    def test_parte_descoberta_nao_paga_iof_de_prazo_negativo(self):
+        impostos = calcular_impostos(
+            {'grupo': [1, 1], 'data': datas('2024-03-10', '2024-01-10'),
+             'quantidade': [10, 10], 'preco': [10.0, 10.0]},
+            {'grupo': [1], 'data': datas('2024-09-10'), 'quantidade': [15], 'preco': [20.0]},
+        )
+        # Só o lote de janeiro (244 dias, sem IOF, 20% de IR) e 5 do de março
+        # (184 dias) entram; nenhum pedaço com prazo negativo
+        self.assertAlmostEqual(impostos['ganho'][0], 150.0)
+        self.assertAlmostEqual(impostos['iof'][0], 0.0)
+        self.assertAlmostEqual(impostos['ir'][0], 150.0 * 0.20)
+        self.assertEqual(impostos['quantidade_descoberta'].tolist(), [0.0])
+
+
+class AvaliarTests(TestCase):
+
+    def test_datas_fora_do_calendario_ficam_pelo_valor_aplicado(self):
+        colunas = Colunas.de_linhas([
+            (1, 'renda_fixa', 'prefixado', 0, 1000, 10, date(1985, 1, 2), None, None),
+            (2, 'renda_fixa', 'cdi', 0, 1000, 100, date(1989, 6, 1), date(2150, 1, 2), None),
+            (3, 'renda_fixa', 'prefixado', 0, 1000, 10, date(2024, 1, 2), date(2025, 1, 2), None),
+        ])
+        cdi = IndiceAcumulado(np.full(len(calendario_b3), 0.0004))
+        valores = avaliar(colunas, date(2025, 6, 2), 0.1, 0.04, calendario_b3, {'cdi': cdi})
+        self.assertEqual(valores[:2].tolist(), [1000.0, 1000.0])
+        self.assertGreater(valores[2], 1000.0)
+
+    def test_formulas_sem_calendario_nem_indices(self):
+        base = date(2025, 6, 2)
+        colunas = Colunas.de_linhas([
+            (1, 'renda_fixa', 'prefixado', 0, 1000, 12, date(2024, 1, 2), None, None),
+            (2, 'renda_fixa', 'cdi', 0, 2000, 110, date(2024, 1, 2), None, None),
+            (3, 'renda_fixa', 'ipca', 0, 1500, 6, date(2024, 1, 2), None, None),
+            (4, 'renda_fixa', 'prefixado', 0, 1000, 12, date(2024, 1, 2), date(2024, 7, 1), None),
+            (5, 'acao', '', 30, 900, 0, date(2024, 1, 2), None, 35.5),
+            (6, 'acao', '', 30, 900, 0, date(2024, 1, 2), None, None),
+        ])
+        valores = avaliar(colunas, base, 0.1, 0.04)
+
+        du = int(np.busday_count('2024-01-02', '2025-06-02'))
+        dc = (base - date(2024, 1, 2)).days
+        cdi_diario = 1.1 ** (1 / 252) - 1
+        esperados = [
+            1000 * 1.12 ** (du / 252),
+            2000 * (1 + cdi_diario * 1.1) ** du,
+            1500 * 1.04 ** (dc / 365) * 1.06 ** (du / 252),
+            1000 * 1.12 ** (int(np.busday_count('2024-01-02', '2024-07-01')) / 252),
+            30 * 35.5,
+            900,
+        ]
+        np.testing.assert_allclose(valores, esperados, atol=0.01)
+
+    def test_avaliar_todas_grava_o_mesmo_valor_da_consulta(self):
+        user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco", tipo='conta_investimentos', recurso='api')
+        vinculo = UsuarioBanco.objects.create(user=user, banco=banco)
+        for indice, indexador in enumerate(['prefixado', 'cdi', 'ipca'] * 3):
+            Posicao.objects.create(
+                user=user, usuario_banco=vinculo, tipo='renda_fixa', nome=f"Título {indice}",
+                valor_aplicado=1000 + indice, data_aplicacao=date(2024, 1, 2), indexador=indexador, taxa=10,
+            )
+
+        resultado = avaliar_todas(date(2025, 1, 2), tamanho_lote=4)
+        self.assertEqual(resultado.posicoes, 9)
+        _, valores = avaliar_posicoes(Posicao.objects.all(), data_base=date(2025, 1, 2))
+        gravados = [float(v) for v in Posicao.objects.order_by('id').values_list('valor_atual', flat=True)]
+        self.assertEqual(gravados, valores.tolist())
+
+
+class ArmazemSeriesTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+
+    def test_acrescentar_e_reabrir_em_outro_processo(self):
+        escritor, leitor = ArmazemSeries(self.diretorio), ArmazemSeries(self.diretorio)
+        gravadas = escritor.acrescentar('cdi', datas('2024-01-02', '2024-01-03'), {'valor': [0.04, 0.05]})
+        self.assertEqual(gravadas, 2)
+        self.assertEqual(len(leitor.serie('cdi')), 2)
+
+        # Linha já gravada é ignorada; a do meio de uma escrita interrompida é truncada
+        with open(f"{self.diretorio}/cdi/{ARQUIVO_DATAS}", 'ab') as arquivo:
+            arquivo.write(b'lixo')
+        gravadas = escritor.acrescentar('cdi', datas('2024-01-03', '2024-01-04'), {'valor': [9.0, 0.06]})
+        self.assertEqual(gravadas, 1)
+
+        serie = leitor.serie('cdi')
+        self.assertEqual(len(serie), 3)
+        self.assertEqual(serie.coluna().tolist(), [0.04, 0.05, 0.06])
+        periodo, valores = serie.intervalo(date(2024, 1, 3), date(2024, 1, 10))
+        self.assertEqual(periodo.tolist(), [date(2024, 1, 3), date(2024, 1, 4)])
+        self.assertEqual(valores['valor'].tolist(), [0.05, 0.06])
+        self.assertEqual(leitor.nomes(), ['cdi'])
+
+    def test_entradas_invalidas(self):
+        armazem = ArmazemSeries(self.diretorio)
+        with self.assertRaises(ErroSerie):
+            armazem.acrescentar('ipca', datas('2024-02-01', '2024-01-01'), {'valor': [1.0, 2.0]})
+        with self.assertRaises(ErroSerie):
+            armazem.acrescentar('ipca', datas('2024-01-01'), {'valor': [1.0, 2.0]})
+        armazem.acrescentar('ipca', datas('2024-01-01'), {'valor': [1.0]})
+        with self.assertRaises(ErroSerie):
+            armazem.acrescentar('ipca', datas('2024-02-01'), {'outra': [1.0]})
+        with self.assertRaises(ErroSerie):
+            armazem.serie('selic')
+        with self.assertRaises(ErroSerie):
+            armazem.serie('ipca').coluna('outra')
+
+
+class MovimentacaoViewTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(
+            cnpj='00.000.000/0001-91', nome="Banco Teste", tipo='conta_investimentos', recurso='api',
+        )
+        self.posicao = Posicao.objects.create(
+            user=self.user, usuario_banco=UsuarioBanco.objects.create(user=self.user, banco=banco),
+            tipo='renda_fixa', nome="CDB Teste", valor_aplicado=1000, data_aplicacao=date(2024, 1, 10),
+            indexador='cdi', taxa=100,
+        )
+        for dia, quantidade in ((date(2024, 1, 10), 10), (date(2024, 3, 10), 10)):
+            Movimentacao.objects.create(
+                posicao=self.posicao, tipo='aplicacao', data=dia, quantidade=quantidade, valor=quantidade * 100,
+            )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def resgatar(self, dia, quantidade):
+        return self.client.post('/api/investimentos/movimentacoes/', {
+            'posicao': self.posicao.pk, 'tipo': 'resgate', 'data': dia, 'quantidade': quantidade, 'valor': 100,
+        }, format='json')
+
+    def test_resgate_maior_que_o_saldo_na_data(self):
+        resposta = self.resgatar('2024-02-10', '15')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn('quantidade', resposta.data)
+
+    def test_resgate_dentro_do_saldo(self):
+        self.assertEqual(self.resgatar('2024-02-10', '10').status_code, 201)
+        self.assertEqual(self.resgatar('2024-04-10', '10').status_code, 201)
+        self.assertEqual(self.resgatar('2024-04-10', '1').status_code, 400)
+
+    def test_posicao_com_data_fora_do_calendario(self):
+        resposta = self.client.post('/api/investimentos/posicoes/', {
+            'usuario_banco': self.posicao.usuario_banco_id, 'tipo': 'renda_fixa', 'nome': "CDB antigo",
+            'valor_aplicado': '1000', 'data_aplicacao': '1985-01-02', 'vencimento': '2150-01-02',
+            'indexador': 'cdi', 'taxa': '100',
+        }, format='json')
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(set(resposta.data), {'data_aplicacao', 'vencimento'})
+
+    def test_resgate_retroativo_nao_descobre_resgates_posteriores(self):
+        self.assertEqual(self.resgatar('2024-04-10', '15').status_code, 201)
+        # Em fevereiro havia 10, mas 15 dos 20 já saíram em abril
+        self.assertEqual(self.resgatar('2024-02-10', '6').status_code, 400)
+        self.assertEqual(self.resgatar('2024-02-10', '5').status_code, 201)
+
+
+class RelatorioIRCacheTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(
+            cnpj='00.000.000/0001-91', nome="Banco Teste", tipo='conta_investimentos', recurso='api',
+        )
+        self.posicao = Posicao.objects.create(
+            user=self.user, usuario_banco=UsuarioBanco.objects.create(user=self.user, banco=banco),
+            tipo='renda_fixa', nome="CDB Teste", valor_aplicado=1000, data_aplicacao=date(2024, 1, 10),
+            indexador='cdi', taxa=100,
+        )
+        Movimentacao.objects.create(
+            posicao=self.posicao, tipo='aplicacao', data=date(2024, 1, 10), quantidade=10, valor=1000,
+        )
+
+    def resgatar(self):
+        Movimentacao.objects.create(
+            posicao=self.posicao, tipo='resgate', data=date(2024, 9, 10), quantidade=5, valor=600,
+        )
+
+    def test_sem_cache_compartilhado_sempre_apura(self):
+        self.assertEqual(relatorio_ir(self.user, 2024)['resgates'], [])
+        # Invalidação que nunca chegaria aos outros workers
+        with mock.patch('investimentos.signals.invalidar_ir'):
+            self.resgatar()
+        self.assertEqual(len(relatorio_ir(self.user, 2024)['resgates']), 1)
+
+    def test_invalidacao_so_depois_do_commit(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        caches = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': diretorio.name}}
+        with override_settings(CACHES=caches):
+            self.assertEqual(relatorio_ir(self.user, 2024)['resgates'], [])
+            versao = cache_investimentos.versao_ir(self.user.id)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError), transaction.atomic():
+                    self.resgatar()
+                    raise RuntimeError
+            self.assertEqual(cache_investimentos.versao_ir(self.user.id), versao)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.resgatar()
+            self.assertEqual(len(relatorio_ir(self.user, 2024)['resgates']), 1)
+
+
+class SimulacaoAgendadaTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def agendar(self):
+        with mock.patch('investimentos.views.LIMITE_INTERATIVO', 0):
+            resposta = self.client.post('/api/investimentos/simulacao/', {
+                'valor_inicial': 1000, 'horizonte_meses': 12, 'caminhos': 200, 'seed': 7,
+            }, format='json')
+        self.assertEqual(resposta.status_code, 202)
+        return resposta.data['data']
+
+    def test_worker_executa_fora_da_requisicao(self):
+        dados = self.agendar()
+        resposta = self.client.get(dados['url'])
+        self.assertEqual(resposta.data['data']['status'], 'pendente')
+        self.assertEqual(resposta['Retry-After'], '1')
+
+        executar_proxima_simulacao()
+        resposta = self.client.get(dados['url'])
+        self.assertNotIn('Retry-After', resposta)
+        estado = resposta.data['data']
+        self.assertEqual((estado['status'], estado['progresso']), ('concluida', 1.0))
+        self.assertEqual(len(estado['resultado']['percentis']['p50']), 13)
+        self.assertIsNone(executar_proxima_simulacao())
+
+    def test_simulacao_abandonada_vira_erro(self):
+        dados = self.agendar()
+        Simulacao.objects.update(status='executando', atualizada_em=timezone.now() - timedelta(hours=1))
+        estado = self.client.get(dados['url']).data['data']
+        self.assertEqual(estado['status'], 'erro')
+        self.assertTrue(estado['erro'])
+
+    def test_simulacao_de_outro_usuario(self):
+        dados = self.agendar()
+        outro = CustomUser.objects.create_user(
+            nome_completo="João Lima", cpf='11144477735', email='joao@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.client.force_authenticate(outro)
+        self.assertEqual(self.client.get(dados['url']).status_code, 404)
+        self.assertEqual(self.client.get('/api/investimentos/simulacao/nao-e-um-id/').status_code, 404)
@@ -0,0 +1,13 @@
+from django.urls import path
+from .views import (
+    CarteiraView, IRView, MovimentacaoView, PosicaoView, SimulacaoView, SimulacaoDetalheView,
+)
+
+urlpatterns = [
+    path('posicoes/', PosicaoView.as_view(), name='investimentos-posicoes'),
+    path('movimentacoes/', MovimentacaoView.as_view(), name='investimentos-movimentacoes'),
+    path('carteira/', CarteiraView.as_view(), name='investimentos-carteira'),
+    path('simulacao/', SimulacaoView.as_view(), name='investimentos-simulacao'),
+    path('ir/', IRView.as_view(), name='investimentos-ir'),
+    path('simulacao/<str:tarefa>/', SimulacaoDetalheView.as_view(), name='investimentos-simulacao-detalhe'),
+]
@@ -0,0 +1,156 @@
+from datetime import date
+
+from django.urls import reverse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Movimentacao, Posicao
+from .serializers import MovimentacaoSerializer, PosicaoSerializer, SimulacaoSerializer
+from .services import (
+    LIMITE_INTERATIVO, agendar_simulacao, avaliar_posicoes, estado_simulacao, executar_simulacao,
+    nova_seed, premissas_simulacao, preparar_simulacao, relatorio_ir,
+)
+
+
+class PosicaoView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        posicoes = Posicao.objects.filter(user=request.user).select_related('ativo')
+        return Response(PosicaoSerializer(posicoes, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        serializer = PosicaoSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class MovimentacaoView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        movimentacoes = Movimentacao.objects.filter(posicao__user=request.user)
+        posicao = request.query_params.get('posicao')
+        if posicao:
+            movimentacoes = movimentacoes.filter(posicao_id=posicao)
+        return Response(MovimentacaoSerializer(movimentacoes, many=True, context={'request': request}).data)
+
+    def post(self, request):
+        serializer = MovimentacaoSerializer(data=request.data, context={'request': request})
+        if serializer.is_valid():
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class CarteiraView(APIView):
+    """
+    Posições do usuário avaliadas na data de hoje, com totais por tipo.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        linhas, valores = avaliar_posicoes(Posicao.objects.filter(user=request.user), 'nome')
+
+        itens = []
+        totais = {}
+        for linha, atual in zip(linhas, valores.tolist()):
+            pk, tipo, aplicado, nome = linha[0], linha[1], float(linha[4]), linha[-1]
+            itens.append({
+                'id': pk,
+                'nome': nome,
+                'tipo': tipo,
+                'valor_aplicado': round(aplicado, 2),
+                'valor_atual': atual,
+                'rendimento': round(atual - aplicado, 2),
+            })
+            total = totais.setdefault(tipo, {'valor_aplicado': 0.0, 'valor_atual': 0.0})
+            total['valor_aplicado'] += aplicado
+            total['valor_atual'] += atual
+
+        return Response({
+            'success': True,
+            'data': {
+                'posicoes': itens,
+                'totais': {tipo: {k: round(v, 2) for k, v in total.items()} for tipo, total in totais.items()},
+                'valor_total': round(float(valores.sum()), 2),
+            },
+        })
+
+
+# Segundos sugeridos entre consultas ao estado de uma simulação agendada
+INTERVALO_CONSULTA = 1
+
+
+class SimulacaoView(APIView):
+    """
+    Projeção de Monte Carlo do patrimônio. Simulações pequenas respondem na
+    hora (200); as grandes são executadas pelo comando executar_simulacoes
+    e respondem 202 com o id para acompanhar em /simulacao/<id>/.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = SimulacaoSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        dados = serializer.validated_data
+        premissas = premissas_simulacao(request.user, dados)
+        caminhos = dados['caminhos']
+        seed = dados.get('seed', nova_seed())
+        percentis = dados['percentis']
+
+        if caminhos * dados['horizonte_meses'] <= LIMITE_INTERATIVO:
+            parametros, classes = preparar_simulacao(premissas)
+            resultado = executar_simulacao(parametros, caminhos, seed, percentis)
+            resultado['classes'] = classes
+            return Response({'success': True, 'data': resultado})
+
+        tarefa = agendar_simulacao(request.user, premissas, caminhos, seed, percentis)
+        url = reverse('investimentos-simulacao-detalhe', args=[tarefa.hex])
+        return Response(
+            {'success': True, 'data': {
+                'id': tarefa.hex, 'status': 'pendente', 'progresso': 0.0, 'url': url,
+            }},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Location': url, 'Retry-After': str(INTERVALO_CONSULTA)},
+        )
+
+
+class SimulacaoDetalheView(APIView):
+    """
+    Estado de uma simulação agendada, para consulta periódica (polling):
+    o progresso é gravado no banco pelo worker, então qualquer worker web
+    responde. Enquanto não termina, Retry-After sugere quando consultar de novo.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, tarefa):
+        estado = estado_simulacao(tarefa, request.user.id)
+        if estado is None:
+            return Response({'detail': 'Simulação não encontrada.'}, status=status.HTTP_404_NOT_FOUND)
+        headers = {}
+        if estado['status'] in ('pendente', 'executando'):
+            headers['Retry-After'] = str(INTERVALO_CONSULTA)
+        return Response({'success': True, 'data': estado}, headers=headers)
+
+
+class IRView(APIView):
+    """
+    Resgates do ano com casamento FIFO, IR regressivo e IOF (ver apurar_ir).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            ano = int(request.query_params.get('ano', date.today().year))
+        except ValueError:
+            return Response({'ano': ['Ano inválido.']}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1900 <= ano <= 2100:
+            return Response({'ano': ['Ano inválido.']}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, 'data': relatorio_ir(request.user, ano)})
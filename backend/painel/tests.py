@@ -0,0 +1,62 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from bancos.models import Banco, UsuarioBanco
+from transacoes.models import Transacao
+from users.models import CustomUser
+from .views import _voltar_meses
+
+
+class ResumoPainelTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        outro = CustomUser.objects.create_user(
+            nome_completo="João Lima", cpf='11144477735', email='joao@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco Teste", tipo='conta_corrente', recurso='api')
+        self.vinculo = UsuarioBanco.objects.create(user=self.user, banco=banco)
+        self.vinculo_outro = UsuarioBanco.objects.create(user=outro, banco=banco)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def criar(self, vinculo, data, valor, categoria):
+        Transacao.objects.create(
+            usuario_banco=vinculo, data=data, valor=Decimal(valor), categoria=categoria,
+            tipo='receita' if Decimal(valor) >= 0 else 'despesa', hash_conteudo=f"{data}|{valor}|{categoria}",
+        )
+
+    def test_resumo_por_mes(self):
+        atual = date.today().replace(day=1)
+        retrasado = _voltar_meses(atual, 2)
+        self.criar(self.vinculo, atual, '1000.00', 'salario')
+        self.criar(self.vinculo, atual, '-250.00', 'mercado')
+        self.criar(self.vinculo, retrasado, '-40.00', 'mercado')
+        self.criar(self.vinculo_outro, atual, '999.00', 'salario')
+
+        resposta = self.client.get('/api/painel/resumo/', {'meses': 3})
+        self.assertEqual(resposta.status_code, 200)
+        meses = resposta.data['data']
+        self.assertEqual([m['mes'] for m in meses], [
+            retrasado.strftime('%Y-%m'), _voltar_meses(atual, 1).strftime('%Y-%m'), atual.strftime('%Y-%m'),
+        ])
+        self.assertEqual((meses[0]['despesas'], meses[0]['lucro']), (Decimal('40.00'), Decimal('-40.00')))
+        self.assertEqual(meses[1]['quantidade'], 0)
+        self.assertEqual(
+            (meses[2]['receitas'], meses[2]['despesas'], meses[2]['lucro'], meses[2]['quantidade']),
+            (Decimal('1000.00'), Decimal('250.00'), Decimal('750.00'), 2),
+        )
+        self.assertEqual([c['categoria'] for c in meses[2]['categorias']], ['mercado', 'salario'])
+
+    def test_parametros(self):
+        self.assertEqual(self.client.get('/api/painel/resumo/', {'meses': 'x'}).status_code, 400)
+        self.assertEqual(len(self.client.get('/api/painel/resumo/', {'meses': 1000}).data['data']), 60)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/painel/resumo/').status_code, 401)
@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ResumoPainelView
+
+urlpatterns = [
+    path('resumo/', ResumoPainelView.as_view(), name='painel-resumo'),
+]
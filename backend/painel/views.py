@@ -0,0 +1,65 @@
+from datetime import date
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+
+from transacoes.resumos import ZERO, resumo_por_mes
+
+MESES_PADRAO = 12
+MESES_MAXIMO = 60
+
+
+def _voltar_meses(mes, quantidade):
+    indice = mes.year * 12 + mes.month - 1 - quantidade
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+class ResumoPainelView(APIView):
+    """
+    Receitas, despesas e lucro por mês (e por categoria) lidos da tabela de
+    resumos mensais, sem varrer o histórico de transações.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            meses = int(request.query_params.get('meses', MESES_PADRAO))
+            usuario_banco = request.query_params.get('usuario_banco')
+            usuario_banco = int(usuario_banco) if usuario_banco else None
+        except ValueError:
+            return Response({'detail': 'Parâmetros inválidos.'}, status=status.HTTP_400_BAD_REQUEST)
+        meses = min(max(meses, 1), MESES_MAXIMO)
+
+        fim = date.today().replace(day=1)
+        inicio = _voltar_meses(fim, meses - 1)
+        por_mes = {
+            _voltar_meses(fim, n): {'receitas': ZERO, 'despesas': ZERO, 'quantidade': 0, 'categorias': []}
+            for n in reversed(range(meses))
+        }
+
+        for linha in resumo_por_mes(request.user, inicio, fim, usuario_banco):
+            mes = por_mes[linha['mes']]
+            mes['receitas'] += linha['total_receitas']
+            mes['despesas'] += linha['total_despesas']
+            mes['quantidade'] += linha['total']
+            mes['categorias'].append({
+                'categoria': linha['categoria'],
+                'receitas': linha['total_receitas'],
+                'despesas': linha['total_despesas'],
+                'quantidade': linha['total'],
+            })
+
+        dados = [
+            {
+                'mes': mes.strftime('%Y-%m'),
+                'receitas': valores['receitas'],
+                'despesas': valores['despesas'],
+                'lucro': valores['receitas'] - valores['despesas'],
+                'quantidade': valores['quantidade'],
+                'categorias': valores['categorias'],
+            }
+            for mes, valores in por_mes.items()
+        ]
+        return Response({'success': True, 'data': dados})
@@ -0,0 +1,176 @@
+import codecs
+import csv
+import io
+import re
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+from bancos.catalogo import normalizar
+
+TAMANHO_BLOCO = 64 * 1024
+
+COLUNAS_CSV = {
+    'data': ['data', 'date', 'dt', 'data lancamento', 'data do lancamento'],
+    'descricao': ['descricao', 'historico', 'lancamento', 'description', 'memo'],
+    'valor': ['valor', 'valor (r$)', 'value', 'amount', 'quantia'],
+    'categoria': ['categoria', 'category'],
+    'identificador': ['id', 'identificador', 'fitid'],
+}
+
+FORMATOS_DATA = ('%d/%m/%Y', '%Y-%m-%d', '%d-%m-%Y', '%d/%m/%y', '%Y%m%d')
+
+TAG_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+class ErroExtrato(Exception):
+    pass
+
+
+@dataclass
+class LinhaExtrato:
+    data: date
+    valor: Decimal
+    descricao: str = ''
+    categoria: str = ''
+    identificador: str = ''
+
+
+def detectar_formato(nome_arquivo, inicio):
+    """
+    Deduz 'ofx' ou 'csv' pela extensão ou pelo início do conteúdo (bytes).
+    """
+    nome = (nome_arquivo or '').lower()
+    if nome.endswith(('.ofx', '.qfx')):
+        return 'ofx'
+    if nome.endswith('.csv'):
+        return 'csv'
+    if b'OFXHEADER' in inicio or b'<OFX>' in inicio.upper():
+        return 'ofx'
+    return 'csv'
+
+
+def ler_extrato(arquivo, formato, encoding=None):
+    """
+    Gera LinhaExtrato (ou None para linhas inválidas) a partir de um arquivo
+    binário, lendo em blocos para manter a memória constante.
+    """
+    if formato == 'ofx':
+        return ler_ofx(arquivo, encoding)
+    if formato == 'csv':
+        return ler_csv(arquivo, encoding or 'utf-8-sig')
+    raise ErroExtrato(f"Formato não suportado: {formato}")
+
+
+def ler_csv(arquivo, encoding='utf-8-sig'):
+    texto = io.TextIOWrapper(arquivo, encoding=encoding, errors='replace', newline='')
+    cabecalho = texto.readline()
+    if not cabecalho.strip():
+        raise ErroExtrato("Arquivo CSV vazio.")
+
+    delimitador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    nomes = [normalizar(nome).strip() for nome in next(csv.reader([cabecalho], delimiter=delimitador))]
+    indices = {}
+    for campo, aceitos in COLUNAS_CSV.items():
+        for posicao, nome in enumerate(nomes):
+            if nome in aceitos:
+                indices[campo] = posicao
+                break
+    if 'data' not in indices or 'valor' not in indices:
+        raise ErroExtrato("O CSV precisa das colunas de data e valor.")
+
+    try:
+        for linha in csv.reader(texto, delimiter=delimitador):
+            if not any(linha):
+                continue
+            try:
+                valores = {campo: linha[posicao].strip() for campo, posicao in indices.items()}
+                yield LinhaExtrato(
+                    data=converter_data(valores['data']),
+                    valor=converter_valor(valores['valor']),
+                    descricao=valores.get('descricao', '')[:255],
+                    categoria=valores.get('categoria', '')[:100],
+                    identificador=valores.get('identificador', '')[:255],
+                )
+            except (IndexError, ValueError, InvalidOperation):
+                yield None
+    finally:
+        # Não fecha o arquivo original junto com o wrapper
+        texto.detach()
+
+
+def ler_ofx(arquivo, encoding=None):
+    inicio = arquivo.read(TAMANHO_BLOCO)
+    if encoding is None:
+        encoding = 'cp1252' if re.search(rb'CHARSET:\s*1252', inicio) else 'utf-8'
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+
+    buffer = decoder.decode(inicio)
+    atual = None
+    bloco = inicio
+    while True:
+        # Processa apenas tags completas; o resto fica para o próximo bloco
+        limite = buffer.rfind('<') if bloco else len(buffer)
+        posicao = 0
+        for tag in TAG_OFX.finditer(buffer, 0, limite):
+            posicao = tag.end()
+            fechamento, nome, valor = tag.group(1), tag.group(2).upper(), tag.group(3).strip()
+            if nome == 'STMTTRN':
+                if fechamento:
+                    if atual is not None:
+                        yield _linha_ofx(atual)
+                    atual = None
+                else:
+                    atual = {}
+            elif atual is not None and not fechamento:
+                atual[nome] = valor
+        if not bloco:
+            break
+        buffer = buffer[posicao:]
+        bloco = arquivo.read(TAMANHO_BLOCO)
+        buffer += decoder.decode(bloco, final=not bloco)
+
+
+def _linha_ofx(campos):
+    try:
+        return LinhaExtrato(
+            data=converter_data(campos.get('DTPOSTED', '')[:8]),
+            valor=converter_valor(campos.get('TRNAMT', '')),
+            descricao=(campos.get('MEMO') or campos.get('NAME') or '')[:255],
+            categoria=campos.get('TRNTYPE', '')[:100],
+            identificador=campos.get('FITID', '')[:255],
+        )
+    except (ValueError, InvalidOperation):
+        return None
+
+
+@lru_cache(maxsize=4096)
+def converter_data(valor):
+    # Extratos repetem poucas datas em muitas linhas
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Data inválida: {valor}")
+
+
+def converter_valor(valor):
+    """
+    Aceita '1234.56', '-1.234,56', 'R$ 1.234,56', '(10,00)' e '1,234.56'.
+    """
+    texto = valor.replace('R$', '').replace(' ', '').strip()
+    negativo = texto.startswith('(') and texto.endswith(')')
+    texto = texto.strip('()')
+    if ',' in texto and '.' in texto:
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    elif ',' in texto:
+        texto = texto.replace(',', '.')
+    if not texto:
+        raise ValueError("Valor vazio.")
+    numero = Decimal(texto).quantize(Decimal('0.01'))
+    return -numero if negativo else numero
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bancos.models import UsuarioBanco
+from transacoes.extratos import ErroExtrato
+from transacoes.services import importar_extrato, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = "Importa um extrato OFX ou CSV para um vínculo usuário-banco."
+
+    def add_arguments(self, parser):
+        parser.add_argument('usuario_banco', type=int, help="ID do UsuarioBanco")
+        parser.add_argument('arquivo', help="Caminho do extrato")
+        parser.add_argument('--formato', choices=['ofx', 'csv'], help="Padrão: deduzido pelo arquivo")
+        parser.add_argument('--encoding', help="Padrão: utf-8 (CSV) ou o CHARSET do cabeçalho (OFX)")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE)
+
+    def handle(self, *args, **options):
+        try:
+            usuario_banco = UsuarioBanco.objects.get(pk=options['usuario_banco'])
+        except UsuarioBanco.DoesNotExist:
+            raise CommandError("UsuarioBanco não encontrado.")
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar_extrato(
+                    usuario_banco,
+                    arquivo,
+                    formato=options['formato'],
+                    nome_arquivo=options['arquivo'],
+                    encoding=options['encoding'],
+                    tamanho_lote=options['lote'],
+                )
+        except (OSError, ErroExtrato) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.lidas} lidas, {resultado.inseridas} inseridas, {resultado.duplicadas} duplicadas, "
+            f"{resultado.invalidas} inválidas em {resultado.duracao:.2f}s "
+            f"({resultado.por_segundo:.0f} transações/s)."
+        ))
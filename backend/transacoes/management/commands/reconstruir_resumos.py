@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from transacoes.resumos import reconstruir
+
+
+class Command(BaseCommand):
+    help = "Recalcula os resumos mensais (painel) a partir das transações."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--usuario-banco', type=int, nargs='+', dest='usuario_bancos',
+            help="IDs de UsuarioBanco; padrão: todos"
+        )
+        parser.add_argument('--lote', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        gerados = reconstruir(options['usuario_bancos'], tamanho_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{gerados} resumos mensais gerados em {time.perf_counter() - inicio:.2f}s."
+        ))
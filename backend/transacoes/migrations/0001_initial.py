@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('bancos', '0006_metadadosbanco'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transacao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField()),
+                ('descricao', models.CharField(blank=True, default='', max_length=255)),
+                ('valor', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('tipo', models.CharField(choices=[('receita', 'Receita'), ('despesa', 'Despesa')], max_length=10)),
+                ('categoria', models.CharField(blank=True, default='', max_length=100)),
+                ('identificador', models.CharField(blank=True, default='', help_text='FITID do OFX ou ID do CSV', max_length=255)),
+                ('hash_conteudo', models.CharField(help_text='Hash usado para deduplicar reimportações', max_length=64)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('usuario_banco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transacoes', to='bancos.usuariobanco')),
+            ],
+            options={
+                'verbose_name': 'Transação',
+                'verbose_name_plural': 'Transações',
+                'ordering': ['-data', '-id'],
+                'indexes': [models.Index(fields=['usuario_banco', 'data'], name='transacao_banco_data_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario_banco', 'hash_conteudo'), name='transacao_hash_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bancos', '0006_metadadosbanco'),
+        ('transacoes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoMensal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês')),
+                ('categoria', models.CharField(blank=True, default='', max_length=100)),
+                ('receitas', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('despesas', models.DecimalField(decimal_places=2, default=0, help_text='Valor positivo', max_digits=16)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to=settings.AUTH_USER_MODEL)),
+                ('usuario_banco', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='bancos.usuariobanco')),
+            ],
+            options={
+                'verbose_name': 'Resumo Mensal',
+                'verbose_name_plural': 'Resumos Mensais',
+                'indexes': [models.Index(fields=['user', 'mes'], name='resumo_user_mes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario_banco', 'mes', 'categoria'), name='resumo_mensal_unico')],
+            },
+        ),
+    ]
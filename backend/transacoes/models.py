@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import models
+from bancos.models import UsuarioBanco
+
+
+class Transacao(models.Model):
+    TIPO_CHOICES = [
+        ('receita', 'Receita'),
+        ('despesa', 'Despesa'),
+    ]
+    usuario_banco = models.ForeignKey(UsuarioBanco, on_delete=models.CASCADE, related_name="transacoes")
+    data = models.DateField()
+    descricao = models.CharField(max_length=255, blank=True, default='')
+    valor = models.DecimalField(max_digits=14, decimal_places=2)
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    categoria = models.CharField(max_length=100, blank=True, default='')
+    identificador = models.CharField(max_length=255, blank=True, default='', help_text="FITID do OFX ou ID do CSV")
+    hash_conteudo = models.CharField(max_length=64, help_text="Hash usado para deduplicar reimportações")
+    criado_em = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Transação"
+        verbose_name_plural = "Transações"
+        ordering = ['-data', '-id']
+        constraints = [
+            models.UniqueConstraint(fields=['usuario_banco', 'hash_conteudo'], name='transacao_hash_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['usuario_banco', 'data'], name='transacao_banco_data_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.data} {self.descricao} {self.valor}"
+
+
+class ResumoMensal(models.Model):
+    """
+    Totais de uma categoria em um mês para um vínculo usuário-banco.
+    Mantido incrementalmente por transacoes.resumos; ver reconstruir_resumos.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="resumos_mensais")
+    usuario_banco = models.ForeignKey(UsuarioBanco, on_delete=models.CASCADE, related_name="resumos_mensais")
+    mes = models.DateField(help_text="Primeiro dia do mês")
+    categoria = models.CharField(max_length=100, blank=True, default='')
+    receitas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    despesas = models.DecimalField(max_digits=16, decimal_places=2, default=0, help_text="Valor positivo")
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Mensal"
+        verbose_name_plural = "Resumos Mensais"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario_banco', 'mes', 'categoria'], name='resumo_mensal_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'mes'], name='resumo_user_mes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%m/%Y} {self.categoria}: +{self.receitas} -{self.despesas}"
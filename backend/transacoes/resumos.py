@@ -0,0 +1,165 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Q, Sum, Value, When
+from django.db.models.functions import TruncMonth
+
+from bancos.models import UsuarioBanco
+from .models import ResumoMensal, Transacao
+
+ZERO = Decimal('0.00')
+
+
+def mes_de(data):
+    return data.replace(day=1)
+
+
+def novos_deltas():
+    # (usuario_banco_id, mês, categoria) -> [receitas, despesas, quantidade]
+    return defaultdict(lambda: [ZERO, ZERO, 0])
+
+
+def acumular(deltas, usuario_banco_id, data, valor, categoria, sinal=1):
+    """
+    Soma (sinal=1) ou subtrai (sinal=-1) um lançamento dos deltas.
+    """
+    delta = deltas[(usuario_banco_id, mes_de(data), categoria)]
+    if valor >= 0:
+        delta[0] += sinal * valor
+    else:
+        delta[1] -= sinal * valor
+    delta[2] += sinal
+
+
+def registrar_insercoes(transacoes):
+    """
+    Atualiza os resumos com transações recém-inseridas (ex.: após bulk_create).
+    """
+    deltas = novos_deltas()
+    for t in transacoes:
+        acumular(deltas, t.usuario_banco_id, t.data, t.valor, t.categoria)
+    aplicar(deltas)
+
+
+def aplicar(deltas):
+    """
+    Aplica os deltas com UPDATE ... SET x = x + delta, uma linha por
+    (vínculo, mês, categoria) afetada, e cria as linhas que ainda não
+    existem. O custo depende de quantos meses/categorias mudaram, não do
+    tamanho do histórico.
+    """
+    deltas = {chave: delta for chave, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        faltando = []
+        for chave, delta in deltas.items():
+            if not _incrementar(chave, delta) and delta[2] > 0:
+                faltando.append(chave)
+
+        if faltando:
+            donos = dict(
+                UsuarioBanco.objects.filter(pk__in={chave[0] for chave in faltando})
+                .values_list('pk', 'user_id')
+            )
+            novos = [
+                ResumoMensal(
+                    user_id=donos[chave[0]],
+                    usuario_banco_id=chave[0],
+                    mes=chave[1],
+                    categoria=chave[2],
+                    receitas=deltas[chave][0],
+                    despesas=deltas[chave][1],
+                    quantidade=deltas[chave][2],
+                )
+                for chave in faltando if chave[0] in donos
+            ]
+            try:
+                with transaction.atomic():
+                    ResumoMensal.objects.bulk_create(novos)
+            except IntegrityError:
+                # Outra importação criou a linha entre o UPDATE e o INSERT
+                for resumo in novos:
+                    chave = (resumo.usuario_banco_id, resumo.mes, resumo.categoria)
+                    if not _incrementar(chave, deltas[chave]):
+                        resumo.save()
+
+        ResumoMensal.objects.filter(
+            usuario_banco_id__in={chave[0] for chave in deltas}, quantidade=0
+        ).delete()
+
+
+def _incrementar(chave, delta):
+    usuario_banco_id, mes, categoria = chave
+    return ResumoMensal.objects.filter(
+        usuario_banco_id=usuario_banco_id, mes=mes, categoria=categoria
+    ).update(
+        receitas=F('receitas') + delta[0],
+        despesas=F('despesas') + delta[1],
+        quantidade=F('quantidade') + delta[2],
+    )
+
+
+def reconstruir(usuario_bancos=None, tamanho_lote=2000):
+    """
+    Recalcula os resumos a partir de todas as transações (ou só das dos
+    vínculos informados). Usado para backfill e correções.
+    Retorna a quantidade de linhas de resumo geradas.
+    """
+    transacoes = Transacao.objects.all()
+    resumos = ResumoMensal.objects.all()
+    if usuario_bancos is not None:
+        transacoes = transacoes.filter(usuario_banco__in=usuario_bancos)
+        resumos = resumos.filter(usuario_banco__in=usuario_bancos)
+
+    decimal = DecimalField(max_digits=16, decimal_places=2)
+    agregados = (
+        transacoes.order_by()
+        .annotate(mes=TruncMonth('data'))
+        .values('usuario_banco_id', 'usuario_banco__user_id', 'mes', 'categoria')
+        .annotate(
+            total_receitas=Sum(Case(When(valor__gte=0, then=F('valor')), default=Value(ZERO), output_field=decimal)),
+            total_despesas=Sum(Case(When(valor__lt=0, then=-F('valor')), default=Value(ZERO), output_field=decimal)),
+            total=Count('id'),
+        )
+    )
+
+    gerados = 0
+    with transaction.atomic():
+        resumos.delete()
+        lote = []
+        for linha in agregados.iterator(chunk_size=tamanho_lote):
+            lote.append(ResumoMensal(
+                user_id=linha['usuario_banco__user_id'],
+                usuario_banco_id=linha['usuario_banco_id'],
+                mes=linha['mes'],
+                categoria=linha['categoria'],
+                receitas=linha['total_receitas'],
+                despesas=linha['total_despesas'],
+                quantidade=linha['total'],
+            ))
+            if len(lote) >= tamanho_lote:
+                ResumoMensal.objects.bulk_create(lote)
+                gerados += len(lote)
+                lote = []
+        ResumoMensal.objects.bulk_create(lote)
+        gerados += len(lote)
+    return gerados
+
+
+def resumo_por_mes(user, inicio, fim, usuario_banco=None):
+    """
+    Lê os resumos de [inicio, fim] agrupados por mês e categoria. O custo é
+    proporcional a meses x categorias exibidos.
+    """
+    filtro = Q(user=user, mes__gte=mes_de(inicio), mes__lte=mes_de(fim))
+    if usuario_banco is not None:
+        filtro &= Q(usuario_banco=usuario_banco)
+    return (
+        ResumoMensal.objects.filter(filtro)
+        .order_by('mes', 'categoria')
+        .values('mes', 'categoria')
+        .annotate(total_receitas=Sum('receitas'), total_despesas=Sum('despesas'), total=Sum('quantidade'))
+    )
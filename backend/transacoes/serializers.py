@@ -0,0 +1,24 @@
+from rest_framework import serializers
+from bancos.models import UsuarioBanco
+from .models import Transacao
+
+
+class TransacaoSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Transacao
+        fields = ['id', 'usuario_banco', 'data', 'descricao', 'valor', 'tipo', 'categoria', 'identificador']
+        read_only_fields = ['id', 'tipo']
+
+
+class ImportacaoExtratoSerializer(serializers.Serializer):
+    usuario_banco = serializers.PrimaryKeyRelatedField(
+        queryset=UsuarioBanco.objects.all(),
+        help_text="ID do vínculo usuário-banco que receberá as transações"
+    )
+    arquivo = serializers.FileField(help_text="Extrato em OFX ou CSV")
+    formato = serializers.ChoiceField(choices=['ofx', 'csv'], required=False)
+
+    def validate_usuario_banco(self, value):
+        if value.user_id != self.context['request'].user.id:
+            raise serializers.ValidationError("Banco não encontrado.")
+        return value
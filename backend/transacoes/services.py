@@ -0,0 +1,131 @@
+import hashlib
+import time
+from dataclasses import dataclass
+
+
+from bancos.catalogo import normalizar
+from bancos.models import UsuarioBanco
+from users.db import atomic_escrita
+from .extratos import ErroExtrato, ler_extrato, detectar_formato
+from .models import Transacao
+from .resumos import registrar_insercoes
+
+TAMANHO_LOTE = 2000
+
+# Máximo de lançamentos distintos sem FITID por extrato. A contagem de
+# ocorrências precisa do arquivo inteiro (ele não precisa estar ordenado por
+# data), então é ela que limita a memória: cerca de 100 bytes por lançamento.
+LIMITE_OCORRENCIAS = 200_000
+
+
+@dataclass
+class ResultadoImportacao:
+    lidas: int = 0
+    inseridas: int = 0
+    duplicadas: int = 0
+    invalidas: int = 0
+    duracao: float = 0.0
+
+    @property
+    def por_segundo(self):
+        return self.lidas / self.duracao if self.duracao else 0.0
+
+    def como_dict(self):
+        return {
+            'lidas': self.lidas,
+            'inseridas': self.inseridas,
+            'duplicadas': self.duplicadas,
+            'invalidas': self.invalidas,
+            'duracao': round(self.duracao, 3),
+            'transacoes_por_segundo': round(self.por_segundo, 1),
+        }
+
+
+def importar_extrato(usuario_banco, arquivo, formato=None, nome_arquivo='', encoding=None,
+                     tamanho_lote=TAMANHO_LOTE):
+    """
+    Importa um extrato OFX ou CSV (arquivo binário) para o UsuarioBanco.
+
+    O arquivo é lido como gerador e gravado em lotes com bulk_create. Cada
+    transação recebe um hash de conteúdo (FITID quando existir); reimportar
+    o mesmo extrato, ou um extrato com período sobreposto, não duplica
+    lançamentos. Os lançamentos sem FITID são contados por um digest de
+    16 bytes, e extratos com mais de LIMITE_OCORRENCIAS deles são recusados.
+    """
+    inicio = time.perf_counter()
+    if formato is None:
+        formato = detectar_formato(nome_arquivo, arquivo.read(1024))
+        arquivo.seek(0)
+
+    resultado = ResultadoImportacao()
+    lote = {}
+    ocorrencias = {}
+
+    for linha in ler_extrato(arquivo, formato, encoding):
+        resultado.lidas += 1
+        if linha is None:
+            resultado.invalidas += 1
+            continue
+
+        # Lançamentos idênticos no mesmo dia (ex.: duas compras iguais) são
+        # diferenciados pela ordem de ocorrência no arquivo inteiro, que não
+        # precisa estar ordenado por data.
+        hash_conteudo = _hash(usuario_banco.pk, linha, ocorrencias)
+
+        if hash_conteudo in lote:
+            resultado.duplicadas += 1
+            continue
+        lote[hash_conteudo] = Transacao(
+            usuario_banco=usuario_banco,
+            data=linha.data,
+            descricao=linha.descricao,
+            valor=linha.valor,
+            tipo='receita' if linha.valor >= 0 else 'despesa',
+            categoria=linha.categoria,
+            identificador=linha.identificador,
+            hash_conteudo=hash_conteudo,
+        )
+        if len(lote) >= tamanho_lote:
+            _gravar(usuario_banco, lote, resultado)
+            lote = {}
+
+    if lote:
+        _gravar(usuario_banco, lote, resultado)
+
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
+
+
+def _hash(usuario_banco_id, linha, ocorrencias):
+    if linha.identificador:
+        base = f"id|{linha.identificador}"
+    else:
+        base = f"{linha.data.isoformat()}|{linha.valor}|{normalizar(linha.descricao).strip()}"
+        chave = hashlib.blake2b(base.encode('utf-8'), digest_size=16).digest()
+        ocorrencia = ocorrencias.get(chave, 0)
+        if not ocorrencia and len(ocorrencias) >= LIMITE_OCORRENCIAS:
+            raise ErroExtrato(
+                f"O extrato tem mais de {LIMITE_OCORRENCIAS} lançamentos sem identificador; "
+                "divida-o por período."
+            )
+        ocorrencias[chave] = ocorrencia + 1
+        base = f"{base}|{ocorrencia}"
+    return hashlib.sha256(f"{usuario_banco_id}|{base}".encode('utf-8')).hexdigest()
+
+
+def _gravar(usuario_banco, lote, resultado):
+    with atomic_escrita():
+        # Importações simultâneas no mesmo vínculo esperam aqui: assim o que
+        # não está em 'existentes' é de fato inserido, e os resumos recebem
+        # só as linhas novas
+        UsuarioBanco.objects.select_for_update().filter(pk=usuario_banco.pk).values_list('pk', flat=True).get()
+        existentes = set(
+            Transacao.objects.filter(usuario_banco=usuario_banco, hash_conteudo__in=lote.keys())
+            .values_list('hash_conteudo', flat=True)
+        )
+        novas = [t for h, t in lote.items() if h not in existentes]
+        Transacao.objects.bulk_create(novas)
+        registrar_insercoes(novas)
+    resultado.inseridas += len(novas)
+    resultado.duplicadas += len(existentes)
+    return novas
@@ -0,0 +1,42 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Transacao
+from . import resumos
+
+
+# Transações gravadas com bulk_create/update() não disparam sinais; quem usa
+# esses caminhos chama resumos.registrar_insercoes/aplicar diretamente.
+
+@receiver(pre_save, sender=Transacao)
+def guardar_valores_anteriores(sender, instance, **kwargs):
+    instance._resumo_anterior = None
+    if instance.pk:
+        instance._resumo_anterior = (
+            Transacao.objects.filter(pk=instance.pk)
+            .values_list('usuario_banco_id', 'data', 'valor', 'categoria')
+            .first()
+        )
+
+
+@receiver(post_save, sender=Transacao)
+def atualizar_resumo(sender, instance, **kwargs):
+    deltas = resumos.novos_deltas()
+    anterior = getattr(instance, '_resumo_anterior', None)
+    if anterior is not None:
+        resumos.acumular(deltas, *anterior, sinal=-1)
+    resumos.acumular(deltas, instance.usuario_banco_id, instance.data, instance.valor, instance.categoria)
+    resumos.aplicar(deltas)
+
+
+@receiver(post_delete, sender=Transacao)
+def remover_do_resumo(sender, instance, origin=None, **kwargs):
+    # Exclusão em cascata do vínculo/usuário já remove os resumos junto
+    if origin is not None and not _originada_em_transacao(origin):
+        return
+    deltas = resumos.novos_deltas()
+    resumos.acumular(deltas, instance.usuario_banco_id, instance.data, instance.valor, instance.categoria, sinal=-1)
+    resumos.aplicar(deltas)
+
+
+def _originada_em_transacao(origin):
+    return isinstance(origin, Transacao) or getattr(origin, 'model', None) is Transacao
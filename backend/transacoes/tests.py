@@ -0,0 +1,86 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from unittest import mock
+
+from django.test import TestCase
+
+from bancos.models import Banco, UsuarioBanco
+from users.models import CustomUser
+from .extratos import ErroExtrato
+from .models import ResumoMensal, Transacao
+from .resumos import reconstruir
+from .services import importar_extrato
+
+
+class ImportarExtratoTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco Teste", tipo='conta_corrente', recurso='api')
+        self.usuario_banco = UsuarioBanco.objects.create(user=user, banco=banco)
+
+    def importar(self, texto):
+        return importar_extrato(self.usuario_banco, io.BytesIO(texto.encode()), formato='csv')
+
+    def test_lancamentos_iguais_separados_por_outra_data(self):
+        extrato = "data;descricao;valor\n01/01/2024;Cafe;-5,00\n02/01/2024;Pao;-3,00\n01/01/2024;Cafe;-5,00\n"
+        resultado = self.importar(extrato)
+        self.assertEqual((resultado.inseridas, resultado.duplicadas), (3, 0))
+        self.assertEqual(Transacao.objects.filter(descricao='Cafe').count(), 2)
+
+        reimportacao = self.importar(extrato)
+        self.assertEqual((reimportacao.inseridas, reimportacao.duplicadas), (0, 3))
+        self.assertEqual(Transacao.objects.count(), 3)
+
+    def test_limite_de_lancamentos_sem_identificador(self):
+        extrato = "data;descricao;valor\n01/01/2024;Cafe;-5,00\n01/01/2024;Cafe;-5,00\n02/01/2024;Pao;-3,00\n"
+        with mock.patch('transacoes.services.LIMITE_OCORRENCIAS', 1):
+            with self.assertRaises(ErroExtrato):
+                self.importar(extrato)
+        with mock.patch('transacoes.services.LIMITE_OCORRENCIAS', 2):
+            self.assertEqual(self.importar(extrato).inseridas, 3)
+
+
+class ResumoMensalTests(TestCase):
+
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        banco = Banco.objects.create(cnpj='00.000.000/0001-91', nome="Banco Teste", tipo='conta_corrente', recurso='api')
+        self.usuario_banco = UsuarioBanco.objects.create(user=user, banco=banco)
+
+    def criar(self, data, valor, categoria=''):
+        return Transacao.objects.create(
+            usuario_banco=self.usuario_banco, data=data, valor=Decimal(valor), categoria=categoria,
+            tipo='receita' if Decimal(valor) >= 0 else 'despesa', hash_conteudo=f"{data}|{valor}|{categoria}",
+        )
+
+    @staticmethod
+    def resumos():
+        return sorted(ResumoMensal.objects.values_list('mes', 'categoria', 'receitas', 'despesas', 'quantidade'))
+
+    def test_incremental_igual_a_reconstrucao(self):
+        salario = self.criar(date(2024, 1, 5), '5000.00', 'salario')
+        mercado = self.criar(date(2024, 1, 10), '-300.00', 'mercado')
+        self.criar(date(2024, 2, 10), '-120.50', 'mercado')
+        importar_extrato(self.usuario_banco, io.BytesIO(
+            "data;descricao;valor;categoria\n15/02/2024;Cafe;-5,00;mercado\n20/03/2024;Pix;100,00;\n".encode()
+        ), formato='csv')
+
+        salario.valor = Decimal('5500.00')
+        salario.save()
+        mercado.data, mercado.categoria = date(2024, 3, 1), 'feira'
+        mercado.save()
+        Transacao.objects.filter(descricao='Cafe').get().delete()
+
+        incremental = self.resumos()
+        reconstruir()
+        self.assertEqual(incremental, self.resumos())
+        self.assertNotIn(date(2024, 1, 1), [r[0] for r in incremental if r[1] == 'mercado'])
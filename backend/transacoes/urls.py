@@ -0,0 +1,6 @@
+from django.urls import path
+from .views import ImportarExtratoView
+
+urlpatterns = [
+    path('importar/', ImportarExtratoView.as_view(), name='transacoes-importar'),
+]
@@ -0,0 +1,40 @@
+import logging
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser, FormParser
+
+from .extratos import ErroExtrato
+from .serializers import ImportacaoExtratoSerializer
+from .services import importar_extrato
+
+logger = logging.getLogger(__name__)
+
+
+class ImportarExtratoView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request):
+        serializer = ImportacaoExtratoSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        arquivo = serializer.validated_data['arquivo']
+        try:
+            resultado = importar_extrato(
+                serializer.validated_data['usuario_banco'],
+                arquivo.file,
+                formato=serializer.validated_data.get('formato'),
+                nome_arquivo=arquivo.name,
+            )
+        except ErroExtrato as e:
+            return Response({'arquivo': [str(e)]}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(
+            "Extrato importado para usuario_banco %s: %s",
+            serializer.validated_data['usuario_banco'].pk, resultado.como_dict()
+        )
+        return Response(resultado.como_dict(), status=status.HTTP_201_CREATED)
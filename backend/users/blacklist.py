@@ -0,0 +1,246 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from .cache import cache_compartilhado
+
+CHAVE_VERSAO = 'users:blacklist:versao'
+# Muda quando linhas da blacklist são apagadas: um filtro de Bloom não
+# remove itens, então os processos remontam o filtro do zero
+CHAVE_GERACAO = 'users:blacklist:geracao'
+TAXA_FALSOS_POSITIVOS = 0.01
+CAPACIDADE_MINIMA = 100_000
+TAMANHO_LOTE = 100_000
+# Na atualização, as linhas gravadas nos últimos N segundos são relidas
+JANELA_RELEITURA = 60
+MASCARA_64 = (1 << 64) - 1
+
+
+def _hashes(jti):
+    digest = hashlib.blake2b(jti.encode('ascii'), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+class FiltroBloom:
+    """
+    Filtro de Bloom de strings sobre um bytearray. 'capacidade' itens com
+    'taxa' de falsos positivos; nunca dá falso negativo. As k posições vêm
+    de um blake2b de 128 bits por double hashing (h1 + i*h2 mod 2**64).
+    """
+
+    def __init__(self, capacidade, taxa=TAXA_FALSOS_POSITIVOS):
+        self.capacidade = capacidade
+        self.bits_total = max(int(-capacidade * math.log(taxa) / math.log(2) ** 2), 8)
+        self.funcoes = max(round(self.bits_total / capacidade * math.log(2)), 1)
+        self.bits = bytearray((self.bits_total + 7) // 8)
+        self.itens = 0
+
+    def __contains__(self, jti):
+        h1, h2 = _hashes(jti)
+        bits, total = self.bits, self.bits_total
+        for i in range(self.funcoes):
+            posicao = ((h1 + i * h2) & MASCARA_64) % total
+            if not bits[posicao >> 3] & (1 << (posicao & 7)):
+                return False
+        return True
+
+    def adicionar(self, jti):
+        h1, h2 = _hashes(jti)
+        for i in range(self.funcoes):
+            posicao = ((h1 + i * h2) & MASCARA_64) % self.bits_total
+            self.bits[posicao >> 3] |= 1 << (posicao & 7)
+        self.itens += 1
+
+    def adicionar_varios(self, jtis):
+        """
+        Mesmo resultado de adicionar() item a item, com as posições
+        calculadas e gravadas em bloco pelo NumPy.
+        """
+        if not jtis:
+            return
+        digests = b''.join(hashlib.blake2b(jti.encode('ascii'), digest_size=16).digest() for jti in jtis)
+        hashes = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+        h1, h2 = hashes[:, 0], hashes[:, 1]
+        total = np.uint64(self.bits_total)
+        bytes_ = np.frombuffer(self.bits, dtype=np.uint8)
+        for i in range(self.funcoes):
+            posicoes = (h1 + np.uint64(i) * h2) % total
+            np.bitwise_or.at(
+                bytes_,
+                (posicoes >> np.uint64(3)).astype(np.intp),
+                np.left_shift(1, posicoes & np.uint64(7)).astype(np.uint8),
+            )
+        self.itens += len(jtis)
+
+    @property
+    def tamanho_bytes(self):
+        return len(self.bits)
+
+
+class FiltroBlacklist:
+    """
+    Filtro de Bloom dos jti em BlacklistedToken, em memória do processo.
+
+    É montado a partir do banco na primeira consulta e atualizado pelas
+    gravações na blacklist (users.signals). Outros processos ficam sabendo
+    de uma gravação pela versão em CHAVE_VERSAO, o que exige um cache
+    compartilhado (REDIS_URL); sem ele o filtro não é usado e toda consulta
+    vai ao banco.
+
+    A atualização não parte do maior id já lido: no PostgreSQL uma linha de
+    id menor pode ser confirmada depois. Ela relê desde a última linha com
+    mais de JANELA_RELEITURA segundos, então só perderia uma gravação cuja
+    transação ficou aberta por mais tempo que isso.
+    """
+
+    def __init__(self):
+        self._filtro = None
+        self._ultimo_id = 0
+        self._versao = None
+        self._geracao = None
+        self._lock = threading.Lock()
+
+    def contem(self, jti):
+        """
+        True se o jti está na blacklist. O SQL só roda quando o filtro
+        indica um possível acerto.
+        """
+        if not cache_compartilhado():
+            # Sem a versão compartilhada, as gravações dos outros processos
+            # não chegariam a este filtro: um falso negativo
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        if jti not in self.sincronizar():
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def adicionar(self, jti):
+        with self._lock:
+            if self._filtro is not None:
+                self._filtro.adicionar(jti)
+
+    def sincronizar(self):
+        versao = cache.get(CHAVE_VERSAO)
+        if versao is None:
+            versao = _versao_inicial()
+            cache.add(CHAVE_VERSAO, versao, timeout=None)
+        filtro = self._filtro
+        if filtro is not None and versao == self._versao:
+            return filtro
+        with self._lock:
+            geracao = cache.get(CHAVE_GERACAO)
+            if self._filtro is None or geracao != self._geracao:
+                self._reconstruir()
+            elif versao != self._versao:
+                self._atualizar()
+            self._versao = versao
+            self._geracao = geracao
+            if self._filtro.itens > self._filtro.capacidade:
+                self._reconstruir()
+            return self._filtro
+
+    def publicar(self):
+        """
+        Incrementa a versão compartilhada após uma gravação deste processo.
+        """
+        try:
+            versao = cache.incr(CHAVE_VERSAO)
+        except ValueError:
+            cache.set(CHAVE_VERSAO, _versao_inicial(), timeout=None)
+            return
+        with self._lock:
+            # Ninguém mais gravou desde a última sincronização: o jti já está
+            # no filtro local e não é preciso buscar as linhas novas
+            if self._versao is not None and versao == self._versao + 1:
+                self._versao = versao
+
+    def publicar_remocao(self):
+        """
+        Avisa todos os processos que linhas da blacklist foram apagadas (ex.:
+        expurgar_tokens): a versão muda e cada filtro é remontado do banco
+        na próxima consulta.
+        """
+        versao = _versao_inicial()
+        cache.set(CHAVE_GERACAO, versao, timeout=None)
+        cache.set(CHAVE_VERSAO, versao, timeout=None)
+        self.descartar()
+
+    def reconstruir(self):
+        with self._lock:
+            self._reconstruir()
+
+    def descartar(self):
+        """
+        Descarta o filtro deste processo; a próxima consulta o remonta do
+        banco. Para os outros processos, use publicar_remocao().
+        """
+        with self._lock:
+            self._filtro = None
+            self._ultimo_id = 0
+
+    def estatisticas(self):
+        filtro = self._filtro
+        if filtro is None:
+            return {'itens': 0, 'capacidade': 0, 'bytes': 0, 'funcoes': 0}
+        return {
+            'itens': filtro.itens,
+            'capacidade': filtro.capacidade,
+            'bytes': filtro.tamanho_bytes,
+            'funcoes': filtro.funcoes,
+        }
+
+    def _reconstruir(self):
+        total = BlacklistedToken.objects.count()
+        self._filtro = FiltroBloom(max(total * 2, CAPACIDADE_MINIMA))
+        self._ultimo_id = 0
+        self._incorporar(BlacklistedToken.objects.all())
+
+    def _atualizar(self):
+        limite = timezone.now() - timedelta(seconds=JANELA_RELEITURA)
+        # Percorre o índice da chave primária de trás para frente e para na
+        # primeira linha antiga: lê só as linhas da janela
+        base = (
+            BlacklistedToken.objects.filter(id__lte=self._ultimo_id, blacklisted_at__lt=limite)
+            .order_by('-id').values_list('id', flat=True).first()
+        ) or 0
+        self._incorporar(BlacklistedToken.objects.filter(id__gt=base))
+
+    def _incorporar(self, queryset):
+        linhas = queryset.order_by('id').values_list('id', 'token__jti')
+        ultimo_lido = self._ultimo_id
+        lote = []
+        relidas = 0
+        for id_, jti in linhas.iterator(chunk_size=TAMANHO_LOTE):
+            lote.append(jti)
+            if id_ <= ultimo_lido:
+                relidas += 1
+            self._ultimo_id = max(self._ultimo_id, id_)
+            if len(lote) >= TAMANHO_LOTE:
+                self._filtro.adicionar_varios(lote)
+                lote = []
+        self._filtro.adicionar_varios(lote)
+        # As linhas relidas já estavam no filtro; só as novas ocupam capacidade
+        self._filtro.itens -= relidas
+
+
+def _versao_inicial():
+    # Igual a bancos.cache: recomeça em um valor que não repete versões antigas
+    return int(time.time() * 1000)
+
+
+def registrar_na_blacklist(jti):
+    """
+    Atualiza o filtro deste processo e, após o commit, avisa os outros.
+    """
+    filtro_blacklist.adicionar(jti)
+    transaction.on_commit(filtro_blacklist.publicar)
+
+
+filtro_blacklist = FiltroBlacklist()
@@ -0,0 +1,133 @@
+import re
+import unicodedata
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+TABELA_FTS = 'users_customuser_busca'
+# O tokenizer trigram indexa trechos de 3 caracteres; termos menores vão para LIKE
+TAMANHO_MINIMO_FTS = 3
+
+SQL_SQLITE = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        busca, content='users_customuser', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, busca) VALUES (new.id, new.busca);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, busca) VALUES ('delete', old.id, old.busca);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF busca ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, busca) VALUES ('delete', old.id, old.busca);
+        INSERT INTO {TABELA_FTS}(rowid, busca) VALUES (new.id, new.busca);
+    END
+    """,
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS users_customuser_busca_trgm ON users_customuser USING gin (busca gin_trgm_ops)",
+]
+
+
+def normalizar(texto):
+    """
+    Minúsculas e sem acentos ("João" -> "joao").
+    """
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def texto_busca(nome_completo, email, cpf):
+    """
+    Conteúdo da coluna CustomUser.busca.
+    """
+    return ' '.join(parte for parte in (normalizar(nome_completo), normalizar(email),
+                                        re.sub(r'\D', '', cpf or '')) if parte)
+
+
+def termos_busca(texto):
+    """
+    Quebra a busca em termos normalizados; termos só com dígitos e pontuação
+    de CPF ("529.982.247-25") viram apenas os dígitos.
+    """
+    termos = []
+    for termo in normalizar(texto).replace(',', ' ').split():
+        if re.fullmatch(r'[\d.\-/]+', termo):
+            termo = re.sub(r'\D', '', termo)
+        if termo:
+            termos.append(termo)
+    return termos
+
+
+def instalar_indice(conexao=None, somente_se_faltar=False):
+    """
+    Cria o índice de busca do banco em uso (FTS5 no SQLite, trigramas no
+    PostgreSQL) e o reconstrói. Idempotente; no SQLite também recria os
+    triggers, que se perdem quando uma migração recria users_customuser.
+    Com somente_se_faltar, nada é feito se o índice já estiver completo
+    ou se a coluna busca ainda não existir (ver users.signals).
+    """
+    conexao = conexao or connection
+    comandos = {'sqlite': SQL_SQLITE, 'postgresql': SQL_POSTGRESQL}.get(conexao.vendor, [])
+    with conexao.cursor() as cursor:
+        if somente_se_faltar and not _indice_incompleto(conexao, cursor):
+            return
+        for sql in comandos:
+            cursor.execute(sql)
+
+
+def _indice_incompleto(conexao, cursor):
+    if 'users_customuser' not in conexao.introspection.table_names(cursor):
+        return False
+    colunas = {coluna.name for coluna in conexao.introspection.get_table_description(cursor, 'users_customuser')}
+    if 'busca' not in colunas:
+        return False
+    if conexao.vendor != 'sqlite':
+        return True
+    esperados = {TABELA_FTS, f'{TABELA_FTS}_ai', f'{TABELA_FTS}_ad', f'{TABELA_FTS}_au'}
+    cursor.execute(
+        f"SELECT name FROM sqlite_master WHERE name IN ({', '.join(['%s'] * len(esperados))})",
+        list(esperados),
+    )
+    return {nome for nome, in cursor.fetchall()} != esperados
+
+
+class BuscaNormalizadaFilter(filters.SearchFilter):
+    """
+    ?search= sobre CustomUser.busca (nome sem acentos, email e CPF só com
+    dígitos). Todos os termos precisam aparecer, em qualquer posição.
+
+    No SQLite usa a tabela FTS5 com tokenizer trigram; no PostgreSQL, o
+    LIKE sobre a coluna usa o índice GIN de trigramas.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        termos = termos_busca(request.query_params.get(self.search_param, ''))
+        if not termos:
+            return queryset
+
+        curtos = termos
+        if connection.vendor == 'sqlite':
+            longos = [termo for termo in termos if len(termo) >= TAMANHO_MINIMO_FTS]
+            curtos = [termo for termo in termos if len(termo) < TAMANHO_MINIMO_FTS]
+            if longos:
+                consulta = ' '.join('"{}"'.format(termo.replace('"', '""')) for termo in longos)
+                queryset = queryset.filter(id__in=RawSQL(
+                    f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [consulta]
+                ))
+        for termo in curtos:
+            queryset = queryset.filter(busca__contains=termo)
+        return queryset
@@ -0,0 +1,173 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS
+
+CHAVE_USUARIO = 'users:usuario:{user_id}:{versao}'
+CHAVE_VERSAO_USUARIO = 'users:usuario:versao:{user_id}'
+# Fora do cache compartilhado: o hash da senha nunca sai do banco (fica
+# adiado no objeto montado) e a foto e o texto de busca não servem à
+# autenticação
+CAMPOS_OMITIDOS = {'password', 'busca'}
+CAMPOS_PERFIL_OMITIDOS = {'foto'}
+
+
+def cache_compartilhado(alias='default'):
+    """
+    True se o cache 'alias' é visto por todos os processos (Redis, banco,
+    arquivos). O LocMemCache, padrão sem REDIS_URL, é de cada processo: o que
+    um worker grava nele os outros não veem.
+    """
+    return not isinstance(caches[alias], (LocMemCache, DummyCache))
+
+
+class CacheLRU:
+    """
+    Cache em memória do processo com limite de itens (LRU) e validade (TTL).
+    """
+
+    def __init__(self, tamanho_maximo, ttl):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            valor, expira_em = item
+            if expira_em < time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def salvar(self, chave, valor):
+        with self._lock:
+            self._itens[chave] = (valor, time.monotonic() + self.ttl)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+usuarios_locais = CacheLRU(settings.USUARIOS_CACHE_TAMANHO, settings.USUARIOS_CACHE_TTL)
+
+
+def _copiar(user):
+    # Cada requisição recebe sua própria instância (e perfil): views que
+    # alteram request.user não podem mexer no objeto guardado no cache.
+    copia = copy.copy(user)
+    perfil = copia._state.fields_cache.get('perfil')
+    if perfil is not None:
+        copia._state.fields_cache['perfil'] = copy.copy(perfil)
+    return copia
+
+
+def _versao_inicial():
+    # Igual a bancos.cache: recomeça em um valor que não repete versões antigas
+    return int(time.time() * 1000)
+
+
+def _versao(user_id):
+    chave = CHAVE_VERSAO_USUARIO.format(user_id=user_id)
+    versao = cache.get(chave)
+    if versao is None:
+        versao = _versao_inicial()
+        cache.add(chave, versao, timeout=None)
+    return versao
+
+
+def _campos(instancia, omitidos):
+    return {
+        campo.attname: getattr(instancia, campo.attname)
+        for campo in instancia._meta.concrete_fields
+        if campo.attname not in omitidos
+    }
+
+
+def _serializar(user):
+    dados = {'usuario': _campos(user, CAMPOS_OMITIDOS), 'perfil': None}
+    perfil = user._state.fields_cache.get('perfil')
+    if perfil is not None:
+        dados['perfil'] = _campos(perfil, CAMPOS_PERFIL_OMITIDOS)
+    return dados
+
+
+def _montar(dados):
+    # from_db com parte dos campos: os demais ficam adiados, como em .only()
+    modelo = get_user_model()
+    user = modelo.from_db(DEFAULT_DB_ALIAS, list(dados['usuario']), list(dados['usuario'].values()))
+    perfil = None
+    if dados['perfil'] is not None:
+        modelo_perfil = modelo._meta.get_field('perfil').related_model
+        perfil = modelo_perfil.from_db(DEFAULT_DB_ALIAS, list(dados['perfil']), list(dados['perfil'].values()))
+        perfil._state.fields_cache['user'] = user
+    # None em cache = sem perfil, como o select_related deixaria
+    user._state.fields_cache['perfil'] = perfil
+    return user
+
+
+def obter_usuario(user_id, carregar):
+    """
+    Retorna o usuário 'user_id' do cache do processo; na falta, do cache
+    compartilhado (USUARIOS_CACHE_COMPARTILHADO) e por último de carregar(user_id).
+    carregar deve levantar DoesNotExist se o usuário não existir.
+
+    Cada acerto confere a versão do usuário no cache compartilhado, que
+    invalidar_usuario() incrementa: uma desativação ou troca de senha vale
+    na hora em todos os processos. Sem cache compartilhado não há como
+    avisar os outros processos, e o usuário vem sempre de carregar().
+    """
+    if not cache_compartilhado():
+        return carregar(user_id)
+
+    versao = _versao(user_id)
+    item = usuarios_locais.obter(user_id)
+    if item is not None and item[0] == versao:
+        return _copiar(item[1])
+
+    user = None
+    chave = CHAVE_USUARIO.format(user_id=user_id, versao=versao)
+    if settings.USUARIOS_CACHE_COMPARTILHADO:
+        dados = cache.get(chave)
+        if dados is not None:
+            user = _montar(dados)
+    if user is None:
+        user = carregar(user_id)
+        if settings.USUARIOS_CACHE_COMPARTILHADO:
+            cache.set(chave, _serializar(user), timeout=settings.USUARIOS_CACHE_TTL_COMPARTILHADO)
+    usuarios_locais.salvar(user_id, (versao, user))
+    return _copiar(user)
+
+
+def invalidar_usuario(user_id):
+    """
+    Remove o usuário do cache deste processo e incrementa a versão dele no
+    cache compartilhado; os outros processos recarregam no próximo acesso.
+    """
+    usuarios_locais.remover(user_id)
+    chave = CHAVE_VERSAO_USUARIO.format(user_id=user_id)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        cache.set(chave, _versao_inicial(), timeout=None)
@@ -0,0 +1,20 @@
+from django.core.checks import Tags, Warning, register
+from rest_framework.settings import api_settings
+
+from .cache import cache_compartilhado
+
+
+@register(Tags.caches, deploy=True)
+def verificar_cache_compartilhado(app_configs, **kwargs):
+    """
+    Os limites de tentativas (users.throttling) vivem no cache padrão; com
+    um cache por processo, N workers aceitam N vezes a taxa configurada.
+    """
+    if not api_settings.DEFAULT_THROTTLE_RATES or cache_compartilhado():
+        return []
+    return [Warning(
+        "O cache padrão é local de cada processo: com mais de um worker, os limites de "
+        "tentativas de login, cadastro e recuperação de senha valem por worker.",
+        hint="Defina REDIS_URL para que todos os workers dividam os mesmos limites.",
+        id='users.W001',
+    )]
@@ -0,0 +1,31 @@
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic_escrita(using=None):
+    """
+    transaction.atomic() para blocos que leem e depois escrevem. No SQLite a
+    transação abre com BEGIN IMMEDIATE, que espera a trava de escrita pelo
+    busy_timeout: com o BEGIN padrão (DEFERRED) a promoção da leitura a
+    escrita falha com "database is locked" se outro processo escreveu.
+    As demais transações continuam DEFERRED e não bloqueiam leitores.
+    Nos outros bancos (e dentro de outro atomic) é um atomic() comum; use
+    select_for_update para travar as linhas lidas.
+    """
+    conexao = transaction.get_connection(using)
+    if conexao.vendor != 'sqlite' or conexao.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+
+    conexao.ensure_connection()
+    modo = conexao.transaction_mode
+    conexao.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            conexao.transaction_mode = modo
+            yield
+    finally:
+        conexao.transaction_mode = modo
@@ -0,0 +1,136 @@
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .db import atomic_escrita
+from .models import EmailPendente
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_LOTE = 50
+MAXIMO_TENTATIVAS = 8
+ESPERA_BASE = 30
+ESPERA_MAXIMA = 60 * 60
+# Tempo em que um email fica reservado para o worker que o pegou
+RESERVA = timedelta(minutes=5)
+
+
+@dataclass
+class ResultadoEnvio:
+    enviados: int = 0
+    falhas: int = 0
+    desistencias: int = 0
+    duracao: float = 0.0
+
+
+def enfileirar_email(destinatario, assunto, corpo):
+    """
+    Grava o email na caixa de saída. Deve ser chamada dentro da transação
+    que cria o dado do email, para que um não exista sem o outro.
+    """
+    return EmailPendente.objects.create(destinatario=destinatario, assunto=assunto, corpo=corpo)
+
+
+def espera(tentativas):
+    """
+    Segundos até a próxima tentativa: exponencial com jitter, limitada a ESPERA_MAXIMA.
+    """
+    segundos = min(ESPERA_BASE * 2 ** (tentativas - 1), ESPERA_MAXIMA)
+    return segundos * random.uniform(0.8, 1.2)
+
+
+def profundidade_fila():
+    """
+    Retorna {'prontos', 'agendados', 'falhos'}: pendentes que já podem ser
+    enviados, pendentes aguardando retry/reserva e emails que esgotaram as tentativas.
+    """
+    agora = timezone.now()
+    return EmailPendente.objects.aggregate(
+        prontos=Count('id', filter=Q(status='pendente', proxima_tentativa__lte=agora)),
+        agendados=Count('id', filter=Q(status='pendente', proxima_tentativa__gt=agora)),
+        falhos=Count('id', filter=Q(status='falhou')),
+    )
+
+
+def _reservar(tamanho_lote):
+    agora = timezone.now()
+    with atomic_escrita():
+        ids = list(
+            EmailPendente.objects
+            .select_for_update(skip_locked=True)
+            .filter(status='pendente', proxima_tentativa__lte=agora)
+            .order_by('proxima_tentativa', 'id')
+            .values_list('id', flat=True)[:tamanho_lote]
+        )
+        # Empurra a próxima tentativa para frente: outro worker não pega o
+        # mesmo email e, se este morrer no meio do envio, o email volta à fila.
+        EmailPendente.objects.filter(id__in=ids).update(proxima_tentativa=agora + RESERVA)
+    return list(EmailPendente.objects.filter(id__in=ids).order_by('id'))
+
+
+def enviar_pendentes(tamanho_lote=TAMANHO_LOTE, maximo_tentativas=MAXIMO_TENTATIVAS, connection=None):
+    """
+    Envia um lote da caixa de saída usando uma única conexão com o servidor
+    de email. Falhas voltam para a fila com backoff exponencial; depois de
+    'maximo_tentativas' o email é marcado como 'falhou'.
+    """
+    inicio = time.perf_counter()
+    resultado = ResultadoEnvio()
+    emails = _reservar(tamanho_lote)
+    if not emails:
+        return resultado
+
+    conexao = connection or get_connection(fail_silently=False)
+    try:
+        conexao.open()
+    except Exception as e:
+        # Servidor fora do ar: o lote inteiro volta para a fila
+        erro_conexao = f"{type(e).__name__}: {e}"
+        logger.warning("Falha ao conectar ao servidor de email: %s", erro_conexao)
+    else:
+        erro_conexao = None
+
+    agora = timezone.now()
+    try:
+        for email in emails:
+            erro = erro_conexao
+            if erro is None:
+                try:
+                    EmailMessage(
+                        email.assunto, email.corpo, settings.DEFAULT_FROM_EMAIL,
+                        [email.destinatario], connection=conexao,
+                    ).send()
+                except Exception as e:
+                    erro = f"{type(e).__name__}: {e}"
+            if erro is None:
+                email.status = 'enviado'
+                email.enviado_em = agora
+                email.ultimo_erro = ''
+                resultado.enviados += 1
+                continue
+
+            email.tentativas += 1
+            email.ultimo_erro = erro
+            if email.tentativas >= maximo_tentativas:
+                email.status = 'falhou'
+                resultado.desistencias += 1
+                logger.error("Email %s descartado após %s tentativas: %s", email.pk, email.tentativas, erro)
+            else:
+                email.proxima_tentativa = agora + timedelta(seconds=espera(email.tentativas))
+                resultado.falhas += 1
+    finally:
+        if erro_conexao is None:
+            conexao.close()
+        EmailPendente.objects.bulk_update(
+            emails, ['status', 'tentativas', 'proxima_tentativa', 'ultimo_erro', 'enviado_em']
+        )
+
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
@@ -120,7 +120,7 @@ def custom_exception_handler(exc, context):
             )
         else:
             # Log do erro não tratado
-            logger.error(f"Erro não tratado: {type(exc).__name__}: {str(exc)}", exc_info=True)
+            logger.error("Erro não tratado: %s: %s", type(exc).__name__, exc, exc_info=True)
             response = Response(
                 {
                     'error': {
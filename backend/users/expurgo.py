@@ -0,0 +1,87 @@
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from .blacklist import filtro_blacklist
+from .db import atomic_escrita
+from .models import EmailPendente, PasswordResetToken
+
+TAMANHO_LOTE = 2000
+# Emails enviados ficam um tempo para consulta (contêm links de reset)
+RETENCAO_EMAILS = timedelta(days=7)
+
+
+@dataclass
+class ResultadoExpurgo:
+    tabela: str
+    removidas: int = 0
+    lotes: int = 0
+    duracao: float = 0.0
+
+    @property
+    def por_segundo(self):
+        return self.removidas / self.duracao if self.duracao else 0.0
+
+
+def expurgar_em_lotes(queryset, tamanho_lote=TAMANHO_LOTE, pausa=0.0):
+    """
+    Apaga as linhas do queryset em lotes de até 'tamanho_lote' chaves
+    primárias, lidas em ordem pelo índice da PK, cada lote em uma transação
+    curta. Assim o SQLite não fica bloqueado para escrita nem acumula um WAL
+    enorme, e ids esparsos não geram lotes vazios.
+    """
+    modelo = queryset.model
+    resultado = ResultadoExpurgo(tabela=modelo._meta.db_table)
+    inicio = time.perf_counter()
+    chaves = queryset.order_by('pk').values_list('pk', flat=True)
+    ultimo = None
+    while True:
+        pendentes = chaves if ultimo is None else chaves.filter(pk__gt=ultimo)
+        ids = list(pendentes[:tamanho_lote])
+        if not ids:
+            break
+        with atomic_escrita():
+            # Refaz o filtro: uma linha alterada desde a leitura fica
+            _, por_modelo = queryset.filter(pk__in=ids).delete()
+        resultado.removidas += por_modelo.get(modelo._meta.label, 0)
+        resultado.lotes += 1
+        ultimo = ids[-1]
+        if pausa:
+            time.sleep(pausa)
+    resultado.duracao = time.perf_counter() - inicio
+    return resultado
+
+
+def expurgar_tokens(tamanho_lote=TAMANHO_LOTE, pausa=0.0, agora=None):
+    """
+    Remove tokens de reset usados ou expirados, refresh tokens expirados
+    (com suas entradas na blacklist, por cascata) e emails já enviados há
+    mais de RETENCAO_EMAILS. Retorna um ResultadoExpurgo por tabela.
+    """
+    agora = agora or timezone.now()
+    resultados = [
+        expurgar_em_lotes(
+            PasswordResetToken.objects.filter(Q(used=True) | Q(expires_at__lt=agora)),
+            tamanho_lote, pausa,
+        ),
+        # Tokens na blacklist ainda não expirados continuam: sem a entrada,
+        # voltariam a ser aceitos
+        expurgar_em_lotes(OutstandingToken.objects.filter(expires_at__lt=agora), tamanho_lote, pausa),
+        expurgar_em_lotes(
+            EmailPendente.objects.filter(status='enviado', enviado_em__lt=agora - RETENCAO_EMAILS),
+            tamanho_lote, pausa,
+        ),
+    ]
+    if resultados[1].removidas:
+        # Os workers remontam seus filtros sem os jti removidos
+        filtro_blacklist.publicar_remocao()
+    # O checkpoint não roda dentro de uma transação
+    if connection.vendor == 'sqlite' and not connection.in_atomic_block:
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    return resultados
@@ -0,0 +1,133 @@
+import base64
+import binascii
+import hashlib
+import io
+import re
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# Lado máximo (px) de cada tamanho gerado; 'g' substitui o original
+TAMANHOS_FOTO = {'p': 64, 'm': 256, 'g': 1024}
+TAMANHO_PADRAO = 'm'
+TAMANHO_MAXIMO_BYTES = 5 * 1024 * 1024
+FORMATOS_ACEITOS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+HASH_FOTO = re.compile(r'^[0-9a-f]{64}$')
+DATA_URL = re.compile(r'^data:image/[\w.+-]+;base64,', re.IGNORECASE)
+
+
+class FotoInvalida(ValueError):
+    pass
+
+
+def caminho_foto(hash_foto, tamanho):
+    return f"fotos/{hash_foto[:2]}/{hash_foto}_{tamanho}.webp"
+
+
+def url_foto(hash_foto, tamanho=TAMANHO_PADRAO):
+    """
+    Caminho da foto na API, relativo ao host, ou com FOTOS_URL_BASE na
+    frente quando configurado.
+    """
+    if not hash_foto:
+        return None
+    return settings.FOTOS_URL_BASE.rstrip('/') + reverse('foto-perfil', args=[hash_foto, tamanho])
+
+
+def decodificar(valor):
+    """
+    Converte uma data URL ('data:image/png;base64,...') ou base64 puro em bytes.
+    """
+    texto = DATA_URL.sub('', valor.strip(), count=1)
+    try:
+        conteudo = base64.b64decode(texto, validate=True)
+    except (binascii.Error, ValueError):
+        raise FotoInvalida("Foto em base64 inválida.")
+    if not conteudo:
+        raise FotoInvalida("Foto vazia.")
+    return conteudo
+
+
+@dataclass
+class FotoPreparada:
+    """
+    Foto validada e convertida, ainda não gravada: 'arquivos' leva o caminho
+    e o conteúdo de cada miniatura (vazio se a foto já está no storage).
+    """
+    hash: str
+    arquivos: dict = field(default_factory=dict)
+
+
+def preparar_foto(conteudo):
+    """
+    Valida a foto (bytes) e gera as miniaturas em memória, sem tocar no
+    storage. Levanta FotoInvalida.
+    """
+    if len(conteudo) > TAMANHO_MAXIMO_BYTES:
+        raise FotoInvalida(f"A foto deve ter no máximo {TAMANHO_MAXIMO_BYTES // (1024 * 1024)} MB.")
+    hash_foto = hashlib.sha256(conteudo).hexdigest()
+    if all(default_storage.exists(caminho_foto(hash_foto, tamanho)) for tamanho in TAMANHOS_FOTO):
+        return FotoPreparada(hash_foto)
+
+    try:
+        imagem = Image.open(io.BytesIO(conteudo))
+        if imagem.format not in FORMATOS_ACEITOS:
+            raise FotoInvalida("Formato de imagem não suportado.")
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem = imagem.convert('RGBA' if 'A' in imagem.getbands() else 'RGB')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise FotoInvalida("Arquivo de imagem inválido.")
+
+    foto = FotoPreparada(hash_foto)
+    for tamanho, lado in TAMANHOS_FOTO.items():
+        copia = imagem.copy()
+        copia.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        saida = io.BytesIO()
+        copia.save(saida, 'WEBP', quality=85, method=4)
+        foto.arquivos[caminho_foto(hash_foto, tamanho)] = saida.getvalue()
+    return foto
+
+
+def gravar_foto(foto):
+    """
+    Grava em default_storage as miniaturas de uma FotoPreparada, endereçadas
+    pelo SHA-256 do conteúdo, e retorna o hash. Fotos iguais são gravadas
+    uma única vez.
+    """
+    for caminho, conteudo in foto.arquivos.items():
+        if not default_storage.exists(caminho):
+            default_storage.save(caminho, ContentFile(conteudo))
+    return foto.hash
+
+
+def salvar_foto(conteudo):
+    return gravar_foto(preparar_foto(conteudo))
+
+
+def remover_foto_sem_uso(hash_foto):
+    """
+    Apaga os arquivos da foto se nenhum perfil a usa mais. Chamada após o
+    commit da troca ou remoção da foto.
+    """
+    from .models import UserPerfil
+
+    if not hash_foto or UserPerfil.objects.filter(foto_hash=hash_foto).exists():
+        return
+    for tamanho in TAMANHOS_FOTO:
+        default_storage.delete(caminho_foto(hash_foto, tamanho))
+
+
+def abrir_foto(hash_foto, tamanho):
+    """
+    Abre o arquivo de uma foto gravada por salvar_foto(), ou None.
+    """
+    if not HASH_FOTO.match(hash_foto) or tamanho not in TAMANHOS_FOTO:
+        return None
+    caminho = caminho_foto(hash_foto, tamanho)
+    if not default_storage.exists(caminho):
+        return None
+    return default_storage.open(caminho, 'rb')
@@ -0,0 +1,211 @@
+import atexit
+import json
+import logging
+import logging.config
+import logging.handlers
+import os
+import queue
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+# Atributos padrão do LogRecord; o resto veio de extra= e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+# Argumentos que podem ser formatados depois, na thread da PipelineLogs
+_TIPOS_IMUTAVEIS = frozenset({
+    str, int, float, bool, bytes, type(None), Decimal, uuid.UUID, date, datetime, time,
+})
+CHAVE_DESCARTADOS = 'logs:descartados'
+
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Uma linha JSON por registro, com os campos passados em extra=.
+    """
+
+    def format(self, record):
+        dados = {
+            'momento': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+            'processo': record.process,
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO and not chave.startswith('_'):
+                dados[chave] = valor
+        if record.exc_info:
+            dados['excecao'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            dados['pilha'] = self.formatStack(record.stack_info)
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class FilaHandler(logging.handlers.QueueHandler):
+    """
+    Coloca o registro na fila da PipelineLogs junto com os handlers de
+    destino do logger. Com argumentos de tipos imutáveis a formatação fica
+    para a thread da PipelineLogs; os demais (dicts, listas, objetos) podem
+    mudar até lá, então a mensagem é montada aqui.
+    """
+
+    def __init__(self, pipeline, destinos):
+        super().__init__(pipeline.fila)
+        self.pipeline = pipeline
+        self.destinos = destinos
+
+    def emit(self, record):
+        if self.queue.qsize() >= self.pipeline.tamanho_fila:
+            # Disco travado: descarta em vez de prender a requisição
+            self.pipeline.descartados += 1
+            return
+        if not _formatacao_adiavel(record):
+            try:
+                record.msg = record.getMessage()
+            except Exception:
+                self.handleError(record)
+                return
+            record.args = None
+        self.queue.put((record, self.destinos))
+
+
+def _formatacao_adiavel(record):
+    if type(record.msg) is not str:
+        return False
+    args = record.args
+    if not args:
+        return True
+    if isinstance(args, dict):
+        args = args.values()
+    return all(type(arg) in _TIPOS_IMUTAVEIS for arg in args)
+
+
+class _Ouvinte(logging.handlers.QueueListener):
+
+    def handle(self, item):
+        record, destinos = item
+        for handler in destinos:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class PipelineLogs:
+    """
+    Registros de log saem da thread da requisição por uma fila em memória;
+    uma thread própria formata e grava nos handlers originais (arquivos com
+    rotação, console). Cada logger continua com seus próprios destinos.
+    """
+
+    def __init__(self, tamanho_fila):
+        self.tamanho_fila = tamanho_fila
+        # SimpleQueue (em C): put() bem mais barato que o de queue.Queue na
+        # thread da requisição; o limite é conferido por qsize() no FilaHandler
+        self.fila = queue.SimpleQueue()
+        self.filas_handlers = []
+        self.ouvinte = None
+        self.descartados = 0
+        self.descartados_publicados = 0
+
+    def desviar(self, logger):
+        """
+        Troca os handlers do logger por um FilaHandler que os alimenta.
+        """
+        destinos = tuple(logger.handlers)
+        if not destinos:
+            return
+        fila_handler = FilaHandler(self, destinos)
+        for handler in destinos:
+            logger.removeHandler(handler)
+        logger.addHandler(fila_handler)
+        self.filas_handlers.append(fila_handler)
+
+    def iniciar(self):
+        self.ouvinte = _Ouvinte(self.fila)
+        self.ouvinte.start()
+
+    def parar(self):
+        # Grava o que ainda está na fila
+        if self.ouvinte is not None:
+            self.ouvinte.stop()
+            self.ouvinte = None
+
+    def publicar_descartados(self):
+        """
+        Soma no cache os registros descartados desde a última publicação,
+        para que /metrics mostre o total de todos os workers.
+        """
+        novos = self.descartados - self.descartados_publicados
+        if novos <= 0:
+            return
+        from django.core.cache import cache
+
+        self.descartados_publicados += novos
+        try:
+            cache.incr(CHAVE_DESCARTADOS, novos)
+        except ValueError:
+            if not cache.add(CHAVE_DESCARTADOS, novos, timeout=None):
+                cache.incr(CHAVE_DESCARTADOS, novos)
+
+    def reiniciar_no_filho(self):
+        # A thread não sobrevive ao fork (ex.: gunicorn --preload) e a fila
+        # pode ter ficado com a trava presa: fila e thread novas. Os
+        # descartes herdados são do processo pai, que os publica
+        self.fila = queue.SimpleQueue()
+        self.descartados = self.descartados_publicados = 0
+        for fila_handler in self.filas_handlers:
+            fila_handler.queue = self.fila
+        self.iniciar()
+
+
+pipeline = None
+
+
+def configurar_logging(config):
+    """
+    LOGGING_CONFIG: aplica o dictConfig de settings.LOGGING e, com
+    LOG_ASSINCRONO, passa os loggers configurados (e o root) a gravar pela
+    PipelineLogs.
+    """
+    from django.conf import settings
+
+    global pipeline
+    logging.config.dictConfig(config)
+    if not settings.LOG_ASSINCRONO:
+        return
+
+    if pipeline is not None:
+        pipeline.parar()
+    pipeline = PipelineLogs(settings.LOG_FILA_TAMANHO)
+    for nome in ['', *config.get('loggers', {})]:
+        pipeline.desviar(logging.getLogger(nome))
+    pipeline.iniciar()
+
+
+def publicar_descartados():
+    if pipeline is not None:
+        pipeline.publicar_descartados()
+
+
+def logs_descartados():
+    """
+    Total de registros descartados por fila cheia, somado entre os workers.
+    """
+    from django.core.cache import cache
+
+    publicar_descartados()
+    return cache.get(CHAVE_DESCARTADOS, 0)
+
+
+def _parar_pipeline():
+    if pipeline is not None:
+        pipeline.parar()
+
+
+def _reiniciar_no_filho():
+    if pipeline is not None:
+        pipeline.reiniciar_no_filho()
+
+
+atexit.register(_parar_pipeline)
+if hasattr(os, 'register_at_fork'):  # não existe no Windows
+    os.register_at_fork(after_in_child=_reiniciar_no_filho)
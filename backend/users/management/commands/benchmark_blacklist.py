@@ -0,0 +1,135 @@
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as TokenRefreshSerializerPadrao
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from users.blacklist import FiltroBlacklist, filtro_blacklist
+from users.cache import cache_compartilhado
+from users.models import CustomUser
+from users.serializers import TokenRefreshSerializer
+from users.tokens import RefreshToken
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a consulta à blacklist de refresh tokens (SQL x filtro de Bloom) e a "
+        "vazão de /api/token/refresh/ com N tokens na blacklist. Os dados de teste "
+        "são criados em uma transação desfeita ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=10_000_000, help="Tokens na blacklist (padrão: 10M)")
+        parser.add_argument('--consultas', type=int, default=20_000)
+        parser.add_argument('--renovacoes', type=int, default=2_000)
+        parser.add_argument('--lote', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        if cache_compartilhado():
+            self._medir_tudo(options)
+            return
+        # O filtro só é usado com um cache compartilhado entre processos;
+        # sem REDIS_URL, um cache em arquivos faz esse papel na medição
+        with tempfile.TemporaryDirectory(prefix='investsmart-cache-') as diretorio:
+            with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio,
+            }}):
+                self._medir_tudo(options)
+
+    def _medir_tudo(self, options):
+        try:
+            with transaction.atomic():
+                self._popular(options['tokens'], options['lote'])
+                self._consultas(options['consultas'])
+                self._renovacoes(options['renovacoes'])
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            filtro_blacklist.descartar()
+
+    def _popular(self, quantidade, tamanho_lote):
+        self.stdout.write(f"Criando {quantidade} tokens na blacklist...")
+        inicio = time.perf_counter()
+        agora = timezone.now()
+        expira = agora + timedelta(days=7)
+        proximo_id = (OutstandingToken.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        # INSERT direto: bulk_create de 10M objetos levaria a maior parte do tempo
+        with connection.cursor() as cursor:
+            for deslocamento in range(0, quantidade, tamanho_lote):
+                ids = range(proximo_id + deslocamento, proximo_id + min(deslocamento + tamanho_lote, quantidade))
+                cursor.executemany(
+                    f"INSERT INTO {OutstandingToken._meta.db_table} (id, jti, token, expires_at) "
+                    f"VALUES (%s, %s, '', %s)",
+                    [(id_, uuid.uuid4().hex, expira) for id_ in ids],
+                )
+                cursor.executemany(
+                    f"INSERT INTO {BlacklistedToken._meta.db_table} (token_id, blacklisted_at) VALUES (%s, %s)",
+                    [(id_, agora) for id_ in ids],
+                )
+        self.stdout.write(f"  {time.perf_counter() - inicio:.1f}s")
+
+    def _consultas(self, quantidade):
+        inicio = time.perf_counter()
+        filtro = FiltroBlacklist()
+        filtro.reconstruir()
+        montagem = time.perf_counter() - inicio
+        estatisticas = filtro.estatisticas()
+        self.stdout.write(
+            f"Filtro de Bloom: {estatisticas['itens']} itens, {estatisticas['bytes'] / 2**20:.1f} MiB, "
+            f"k={estatisticas['funcoes']}, montado em {montagem:.1f}s"
+        )
+
+        # Tokens válidos (fora da blacklist): o caso de toda renovação legítima
+        jtis = [uuid.uuid4().hex for _ in range(quantidade)]
+        sql = self._medir(lambda jti: BlacklistedToken.objects.filter(token__jti=jti).exists(), jtis)
+        bloom = self._medir(filtro.contem, jtis)
+        self.stdout.write(
+            f"Consulta à blacklist ({quantidade} jti válidos): SQL {sql:,.0f}/s, "
+            f"filtro {bloom:,.0f}/s ({bloom / sql:.0f}x)"
+        )
+
+        amostra = list(
+            BlacklistedToken.objects.order_by('-id').values_list('token__jti', flat=True)[:min(quantidade, 2000)]
+        )
+        acertos = self._medir(filtro.contem, amostra)
+        self.stdout.write(f"Consulta de jti na blacklist (filtro + SQL): {acertos:,.0f}/s")
+
+    def _renovacoes(self, quantidade):
+        user = CustomUser.objects.create_user(
+            nome_completo="Usuário Benchmark",
+            cpf='52998224725' if not CustomUser.objects.filter(cpf='52998224725').exists() else '11144477735',
+            email=f"benchmark-{uuid.uuid4().hex[:8]}@investsmart.test",
+            data_nascimento=date(1990, 1, 1),
+            password='Senha@12345',
+        )
+        filtro_blacklist.reconstruir()
+        # Alterna os dois serializers para que ambos vejam o mesmo volume de tabelas
+        tokens = [str(RefreshToken.for_user(user)) for _ in range(quantidade * 2)]
+        duracoes = {TokenRefreshSerializerPadrao: 0.0, TokenRefreshSerializer: 0.0}
+        for posicao, token in enumerate(tokens):
+            serializer = TokenRefreshSerializer if posicao % 2 else TokenRefreshSerializerPadrao
+            inicio = time.perf_counter()
+            serializer(data={'refresh': token}).is_valid(raise_exception=True)
+            duracoes[serializer] += time.perf_counter() - inicio
+        sql, filtro = (quantidade / duracoes[classe] for classe in (TokenRefreshSerializerPadrao, TokenRefreshSerializer))
+        self.stdout.write(
+            f"/api/token/refresh/: simplejwt {sql:,.0f} renovações/s, "
+            f"users.TokenRefreshSerializer {filtro:,.0f} renovações/s ({filtro / sql:.2f}x)"
+        )
+
+    def _medir(self, funcao, jtis):
+        inicio = time.perf_counter()
+        for jti in jtis:
+            funcao(jti)
+        return len(jtis) / (time.perf_counter() - inicio)
@@ -0,0 +1,118 @@
+import copy
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.logs import configurar_logging
+from users.models import CustomUser
+
+MODOS = [
+    ("síncrono", {'LOG_ASSINCRONO': False}),
+    ("fila", {'LOG_ASSINCRONO': True}),
+    ("fila + amostra 10%", {'LOG_ASSINCRONO': True, 'LOG_AMOSTRA_ACESSO': 0.1}),
+]
+
+
+class ArquivoLento(RotatingFileHandler):
+    """
+    RotatingFileHandler em que 1% das gravações demora 'atraso' segundos,
+    simulando um disco com picos de latência (fsync, rotação, volume de rede).
+    """
+
+    def __init__(self, *args, atraso=0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.atraso = atraso
+
+    def emit(self, record):
+        super().emit(record)
+        if self.atraso and random.random() < 0.01:
+            time.sleep(self.atraso)
+
+
+def _cpf_aleatorio():
+    digitos = [random.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        soma = sum(d * peso for d, peso in zip(digitos, range(tamanho + 1, 1, -1)))
+        digitos.append(soma * 10 % 11 % 10)
+    return ''.join(map(str, digitos))
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência (p50/p99) de GET /api/users/me/ sob carga concorrente com "
+        "o logging síncrono (handlers na thread da requisição) e com a fila de "
+        "users.logs. Os logs vão para um diretório temporário."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=3000, help="Requisições por modo e rodada")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--rodadas', type=int, default=3)
+        parser.add_argument('--atraso-disco', type=float, default=0,
+                            help="Atraso (ms) em 1%% das gravações de log, simulando picos do disco")
+
+    def handle(self, *args, **options):
+        cpf = _cpf_aleatorio()
+        while CustomUser.objects.filter(cpf=cpf).exists():
+            cpf = _cpf_aleatorio()
+        user = CustomUser.objects.create_user(
+            nome_completo="Usuário Benchmark", cpf=cpf, email=f"benchmark-logs-{cpf}@investsmart.test",
+            data_nascimento=date(1990, 1, 1), password=None,
+        )
+        token = str(AccessToken.for_user(user))
+
+        diretorio = tempfile.mkdtemp(prefix='investsmart-logs-')
+        config = copy.deepcopy(settings.LOGGING)
+        for handler in config['handlers'].values():
+            if 'filename' in handler:
+                handler['filename'] = os.path.join(diretorio, os.path.basename(handler['filename']))
+                handler.pop('class')
+                handler.update({'()': ArquivoLento, 'atraso': options['atraso_disco'] / 1000})
+
+        latencias = {nome: [] for nome, _ in MODOS}
+        try:
+            for _ in range(options['rodadas']):
+                for nome, ajustes in MODOS:
+                    with override_settings(**ajustes):
+                        configurar_logging(config)
+                        latencias[nome] += self._carga(token, options['requisicoes'], options['threads'])
+        finally:
+            configurar_logging(settings.LOGGING)
+            user.delete()
+
+        base = None
+        for nome, _ in MODOS:
+            valores = sorted(latencias[nome])
+            p50 = statistics.median(valores) * 1000
+            p99 = valores[int(len(valores) * 0.99)] * 1000
+            comparacao = f" ({(p99 / base - 1) * 100:+.0f}% no p99)" if base else ""
+            base = base or p99
+            self.stdout.write(f"{nome:>20}: p50 {p50:.2f} ms, p99 {p99:.2f} ms{comparacao}")
+        self.stdout.write(f"Logs gravados em {diretorio}")
+
+    def _carga(self, token, quantidade, threads):
+        def trabalhador(total):
+            cliente = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Bearer {token}')
+            medidas = []
+            for _ in range(total):
+                inicio = time.perf_counter()
+                resposta = cliente.get('/api/users/me/')
+                medidas.append(time.perf_counter() - inicio)
+                assert resposta.status_code == 200, resposta.status_code
+            connection.close()
+            return medidas
+
+        with ThreadPoolExecutor(threads) as pool:
+            partes = pool.map(trabalhador, [quantidade // threads] * threads)
+        return [medida for parte in partes for medida in parte]
@@ -0,0 +1,76 @@
+import logging
+import shutil
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+
+from users.metricas import metricas
+from users.middleware import APIResponseMiddleware
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo da instrumentação do APIResponseMiddleware (Server-Timing, "
+        "contagem de consultas e histogramas de users.metricas) por requisição, "
+        "comparando o middleware com METRICAS_ATIVAS ligado e desligado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=50_000)
+        parser.add_argument('--consultas', type=int, default=3, help="Consultas SQL por requisição (padrão: 3)")
+        parser.add_argument('--rodadas', type=int, default=100)
+
+    def handle(self, *args, **options):
+        consultas = options['consultas']
+        corpo = {'success': True, 'data': {'user': {'id': 1, 'nome_completo': 'Usuário Benchmark'}}}
+
+        def view(request):
+            with connection.cursor() as cursor:
+                for _ in range(consultas):
+                    cursor.execute('SELECT 1')
+            return JsonResponse(corpo)
+
+        fabrica = RequestFactory()
+        match = resolve('/api/users/me/')
+        middleware = APIResponseMiddleware(view)
+
+        def medir(ativas, quantidade):
+            with override_settings(METRICAS_ATIVAS=ativas):
+                inicio = time.perf_counter()
+                for _ in range(quantidade):
+                    request = fabrica.get('/api/users/me/')
+                    request.resolver_match = match
+                    middleware(request)
+                return (time.perf_counter() - inicio) / quantidade
+
+        # Sem os logs de cada requisição, que dominariam a medição, e com um
+        # diretório próprio para não somar requisições falsas ao /metrics real
+        diretorio = settings.METRICAS_DIR + '-benchmark'
+        por_rodada = max(1, options['requisicoes'] // options['rodadas'])
+        logging.disable(logging.CRITICAL)
+        try:
+            metricas.diretorio = diretorio
+            medir(True, por_rodada)
+            # Muitas rodadas curtas alternadas e a mediana das diferenças:
+            # variações da máquina afetam os dois lados da mesma rodada
+            sem, com = [], []
+            for _ in range(options['rodadas']):
+                sem.append(medir(False, por_rodada))
+                com.append(medir(True, por_rodada))
+        finally:
+            logging.disable(logging.NOTSET)
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+        custo = statistics.median(b - a for a, b in zip(sem, com)) * 1e6
+        self.stdout.write(
+            f"Sem métricas: {statistics.median(sem) * 1e6:.1f} µs/requisição; "
+            f"com métricas: {statistics.median(com) * 1e6:.1f} µs/requisição ({consultas} consultas cada)."
+        )
+        estilo = self.style.SUCCESS if custo < 50 else self.style.WARNING
+        self.stdout.write(estilo(f"Custo da instrumentação: {custo:.1f} µs por requisição (meta: < 50 µs)."))
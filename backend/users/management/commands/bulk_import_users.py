@@ -0,0 +1,170 @@
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from users.busca import texto_busca
+from users.models import CustomUser, UserPerfil
+from users.serializers import MENSAGENS_DUPLICADO, RegisterUserSerializer
+
+COLUNAS = ['nome_completo', 'cpf', 'email', 'data_nascimento', 'senha']
+
+
+class ImportacaoSerializer(RegisterUserSerializer):
+    """
+    Validações do cadastro sem confirmação de senha; senha vazia cria o
+    usuário sem senha utilizável (ele define uma por esqueceu_a_senha).
+    """
+    password_confirm = None
+
+    class Meta(RegisterUserSerializer.Meta):
+        fields = ['nome_completo', 'email', 'cpf', 'data_nascimento', 'password']
+        extra_kwargs = {
+            **RegisterUserSerializer.Meta.extra_kwargs,
+            'password': {'write_only': True, 'required': False, 'allow_blank': True},
+        }
+
+    def validate_password(self, value):
+        return super().validate_password(value) if value else ''
+
+    def validate(self, attrs):
+        return attrs
+
+
+def _hash(senha):
+    # Senha vazia: make_password(None) gera uma senha inutilizável
+    return make_password(senha or None)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa usuários de um CSV (colunas: nome_completo, cpf, email, "
+        "data_nascimento, senha) para onboarding corporativo. As senhas são "
+        "calculadas em paralelo em vários processos e usuários e perfis são "
+        "gravados com bulk_create, um lote por transação. Linhas inválidas ou "
+        "com CPF/email já cadastrado são relatadas e ignoradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do CSV (com cabeçalho)")
+        parser.add_argument('--lote', type=int, default=1000, help="Usuários por transação (padrão: 1000)")
+        parser.add_argument('--processos', type=int, default=os.cpu_count(),
+                            help="Processos para calcular as senhas (padrão: núcleos da máquina)")
+        parser.add_argument('--delimitador', default=',')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['processos'] < 1:
+            raise CommandError("--lote e --processos devem ser maiores que zero.")
+
+        try:
+            arquivo = open(options['arquivo'], newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(f"Não foi possível abrir o arquivo: {e}")
+
+        inicio = time.perf_counter()
+        self.criados = self.rejeitados = 0
+        self.vistos = set()
+        # Os filhos não usam o banco: fecha as conexões antes do fork
+        connections.close_all()
+        with arquivo, ProcessPoolExecutor(max_workers=options['processos']) as pool:
+            leitor = csv.DictReader(arquivo, delimiter=options['delimitador'])
+            faltando = set(COLUNAS[:4]) - set(leitor.fieldnames or [])
+            if faltando:
+                raise CommandError(f"Colunas ausentes no CSV: {', '.join(sorted(faltando))}")
+
+            lote = []
+            for linha in leitor:
+                lote.append((leitor.line_num, linha))
+                if len(lote) == options['lote']:
+                    self._importar(lote, pool, options['processos'])
+                    lote = []
+            if lote:
+                self._importar(lote, pool, options['processos'])
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{self.criados} usuários criados, {self.rejeitados} linhas rejeitadas em {duracao:.1f}s "
+            f"({self.criados / duracao:,.0f} usuários/s)."
+        ))
+
+    def _importar(self, lote, pool, processos):
+        validos = self._validar(lote)
+        if validos:
+            validos = self._remover_existentes(validos)
+        if not validos:
+            return
+
+        senhas = pool.map(_hash, [dados['password'] for _, dados in validos],
+                          chunksize=max(1, len(validos) // (processos * 4)))
+        agora = timezone.now()
+        users = []
+        for (_, dados), senha in zip(validos, senhas):
+            users.append(CustomUser(
+                nome_completo=dados['nome_completo'],
+                cpf=dados['cpf'],
+                email=dados['email'],
+                data_nascimento=dados['data_nascimento'],
+                password=senha,
+                created_at=agora,
+                # bulk_create não passa por save()
+                busca=texto_busca(dados['nome_completo'], dados['email'], dados['cpf']),
+            ))
+
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(users)
+                UserPerfil.objects.bulk_create([UserPerfil(user=user) for user in users])
+        except IntegrityError as e:
+            # Cadastro concorrente entre a checagem e o INSERT
+            self.rejeitados += len(users)
+            self.stderr.write(
+                f"Linhas {validos[0][0]}-{validos[-1][0]}: lote descartado ({e}); importe-o novamente."
+            )
+            return
+        self.criados += len(users)
+        self.stdout.write(f"  {self.criados} usuários criados...")
+
+    def _validar(self, lote):
+        validos = []
+        for numero, linha in lote:
+            dados = {campo: (linha.get(campo) or '').strip() for campo in COLUNAS}
+            dados['password'] = dados.pop('senha')
+            serializer = ImportacaoSerializer(data=dados)
+            if not serializer.is_valid():
+                self._rejeitar(numero, serializer.errors)
+                continue
+            validados = serializer.validated_data
+            chaves = (('cpf', validados['cpf']), ('email', validados['email']))
+            repetida = next((campo for campo in chaves if campo in self.vistos), None)
+            if repetida:
+                self._rejeitar(numero, {repetida[0]: ["Repetido no arquivo."]})
+                continue
+            self.vistos.update(chaves)
+            validos.append((numero, validados))
+        return validos
+
+    def _remover_existentes(self, validos):
+        # Duas consultas por lote em vez de duas por usuário
+        cpfs = set(CustomUser.objects.filter(cpf__in=[dados['cpf'] for _, dados in validos])
+                   .values_list('cpf', flat=True))
+        emails = set(CustomUser.objects.filter(email__in=[dados['email'] for _, dados in validos])
+                     .values_list('email', flat=True))
+        restantes = []
+        for numero, dados in validos:
+            if dados['cpf'] in cpfs:
+                self._rejeitar(numero, {'cpf': [MENSAGENS_DUPLICADO['cpf']]})
+            elif dados['email'] in emails:
+                self._rejeitar(numero, {'email': [MENSAGENS_DUPLICADO['email']]})
+            else:
+                restantes.append((numero, dados))
+        return restantes
+
+    def _rejeitar(self, numero, erros):
+        self.rejeitados += 1
+        detalhes = '; '.join(f"{campo}: {' '.join(str(m) for m in mensagens)}" for campo, mensagens in erros.items())
+        self.stderr.write(f"Linha {numero}: {detalhes}")
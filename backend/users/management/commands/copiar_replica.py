@@ -0,0 +1,40 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from users.replica import ALIAS_REPLICA, replica_configurada
+
+
+class Command(BaseCommand):
+    help = (
+        "Copia o banco SQLite principal para o arquivo da réplica (DB_REPLICA_NAME) "
+        "com a API de backup do SQLite, simulando a replicação no ambiente local. "
+        "Use --intervalo para repetir a cópia continuamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help="Copia a cada N segundos (0 = copia uma vez e sai)")
+
+    def handle(self, *args, **options):
+        if not replica_configurada():
+            raise CommandError("Defina DB_REPLICA_NAME para configurar a réplica.")
+        principal, replica = connections[DEFAULT_DB_ALIAS], connections[ALIAS_REPLICA]
+        if principal.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("A cópia só se aplica a réplicas SQLite; no PostgreSQL use a replicação do servidor.")
+
+        while True:
+            inicio = time.perf_counter()
+            principal.ensure_connection()
+            destino = sqlite3.connect(replica.settings_dict['NAME'])
+            try:
+                principal.connection.backup(destino)
+            finally:
+                destino.close()
+            self.stdout.write(f"Réplica atualizada em {(time.perf_counter() - inicio) * 1000:.0f} ms.")
+            if not options['intervalo']:
+                break
+            principal.close()
+            time.sleep(options['intervalo'])
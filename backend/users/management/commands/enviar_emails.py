@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.emails import enviar_pendentes, profundidade_fila, MAXIMO_TENTATIVAS, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Envia os emails da caixa de saída em lotes, com uma conexão SMTP por lote "
+        "e retry com backoff exponencial. Use --intervalo para rodar como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Emails por conexão (padrão: 50)")
+        parser.add_argument('--maximo-tentativas', type=int, default=MAXIMO_TENTATIVAS,
+                            help="Tentativas antes de marcar o email como falho")
+        parser.add_argument('--intervalo', type=float, default=0,
+                            help="Verifica a fila a cada N segundos (0 = esvazia a fila e sai)")
+        parser.add_argument('--status', action='store_true', help="Apenas mostra a profundidade da fila")
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['maximo_tentativas'] < 1:
+            raise CommandError("--lote e --maximo-tentativas devem ser maiores que zero.")
+
+        if options['status']:
+            self._mostrar_fila()
+            return
+
+        while True:
+            self._esvaziar(options)
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _esvaziar(self, options):
+        while True:
+            resultado = enviar_pendentes(options['lote'], options['maximo_tentativas'])
+            total = resultado.enviados + resultado.falhas + resultado.desistencias
+            if not total:
+                break
+            self.stdout.write(
+                f"{resultado.enviados} enviados, {resultado.falhas} reagendados, "
+                f"{resultado.desistencias} falhos em {resultado.duracao:.2f}s."
+            )
+            if resultado.enviados == 0:
+                # Lote inteiro falhou: espera o backoff em vez de insistir
+                break
+        self._mostrar_fila()
+
+    def _mostrar_fila(self):
+        fila = profundidade_fila()
+        self.stdout.write(self.style.SUCCESS(
+            f"Fila: {fila['prontos']} prontos, {fila['agendados']} agendados, {fila['falhos']} falhos."
+        ))
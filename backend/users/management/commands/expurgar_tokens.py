@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.expurgo import expurgar_tokens, TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove tokens de reset usados/expirados, refresh tokens expirados (e sua "
+        "blacklist) e emails enviados antigos, em lotes de chaves primárias. "
+        "Use --intervalo para rodar como job contínuo ou agende via cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Ids por transação (padrão: 2000)")
+        parser.add_argument('--pausa', type=float, default=0.0,
+                            help="Segundos de espera entre lotes, para dar vez a outras escritas")
+        parser.add_argument('--intervalo', type=int, default=0,
+                            help="Repete o expurgo a cada N segundos (0 = executa uma vez)")
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        while True:
+            for resultado in expurgar_tokens(options['lote'], options['pausa']):
+                self.stdout.write(self.style.SUCCESS(
+                    f"{resultado.tabela}: {resultado.removidas} linhas removidas em {resultado.lotes} lotes, "
+                    f"{resultado.duracao:.2f}s ({resultado.por_segundo:.0f} linhas/s)."
+                ))
+            if not options['intervalo']:
+                break
+            time.sleep(options['intervalo'])
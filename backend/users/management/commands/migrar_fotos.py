@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.cache import invalidar_usuario
+from users.fotos import FotoInvalida, decodificar, salvar_foto
+from users.models import UserPerfil
+
+
+class Command(BaseCommand):
+    help = (
+        "Converte as fotos de perfil legadas (base64 em UserPerfil.foto) para "
+        "arquivos endereçados por hash com miniaturas, em lotes. Pode ser "
+        "interrompido e executado de novo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=100, help="Perfis por transação (padrão: 100)")
+        parser.add_argument('--manter-invalidas', action='store_true',
+                            help="Não apaga o base64 das fotos que não puderem ser lidas")
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        inicio = time.perf_counter()
+        convertidas = invalidas = bytes_liberados = 0
+        ultimo = 0
+        while True:
+            # Keyset pela PK: lê só o lote atual da coluna pesada
+            lote = list(
+                UserPerfil.objects
+                .filter(pk__gt=ultimo, foto__isnull=False)
+                .exclude(foto='')
+                .order_by('pk')
+                .values_list('pk', 'user_id', 'foto')[:options['lote']]
+            )
+            if not lote:
+                break
+            ultimo = lote[-1][0]
+
+            with transaction.atomic():
+                for pk, user_id, foto in lote:
+                    bytes_liberados += len(foto)
+                    try:
+                        hash_foto = salvar_foto(decodificar(foto))
+                    except FotoInvalida as e:
+                        invalidas += 1
+                        self.stderr.write(f"Perfil {pk}: {e}")
+                        if options['manter_invalidas']:
+                            continue
+                        hash_foto = ''
+                    else:
+                        convertidas += 1
+                    UserPerfil.objects.filter(pk=pk).update(foto=None, foto_hash=hash_foto)
+                    invalidar_usuario(user_id)
+            self.stdout.write(f"  {convertidas + invalidas} perfis processados...")
+
+        duracao = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"{convertidas} fotos convertidas, {invalidas} inválidas, "
+            f"{bytes_liberados / 2**20:.1f} MB de base64 removidos do banco em {duracao:.2f}s."
+        ))
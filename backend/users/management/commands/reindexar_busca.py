@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from users.busca import instalar_indice, texto_busca
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula CustomUser.busca e recria o índice de busca (FTS5 no SQLite, "
+        "trigramas no PostgreSQL). Os triggers perdidos em migrações são recriados no "
+        "post_migrate; use este comando após gravações em massa que não passem pelo save()."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        alterados = 0
+        ultimo = 0
+        while True:
+            lote = list(
+                CustomUser.objects.filter(pk__gt=ultimo).order_by('pk')
+                .only('nome_completo', 'email', 'cpf', 'busca')[:options['lote']]
+            )
+            if not lote:
+                break
+            ultimo = lote[-1].pk
+            mudaram = []
+            for user in lote:
+                busca = texto_busca(user.nome_completo, user.email, user.cpf)
+                if busca != user.busca:
+                    user.busca = busca
+                    mudaram.append(user)
+            CustomUser.objects.bulk_update(mudaram, ['busca'])
+            alterados += len(mudaram)
+
+        instalar_indice()
+        self.stdout.write(self.style.SUCCESS(f"{alterados} usuários atualizados; índice de busca reconstruído."))
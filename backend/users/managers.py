@@ -1,4 +1,5 @@
 from django.contrib.auth.models import BaseUserManager
+from django.db import transaction
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, nome_completo, cpf, email, data_nascimento, password=None, **extra_fields):
@@ -21,9 +22,10 @@ class CustomUserManager(BaseUserManager):
         
         user = self.model(nome_completo=nome_completo, cpf=cpf, email=email, data_nascimento=data_nascimento, **extra_fields)
         user.set_password(password)
-        user.save()
-        
-        UserPerfil.objects.create(user=user)
+        # CPF/email duplicados: IntegrityError das constraints únicas
+        with transaction.atomic(using=self._db):
+            user.save(using=self._db, validar_unicidade=False)
+            UserPerfil.objects.using(self._db).create(user=user)
         
         return user
     
@@ -41,9 +43,10 @@ class CustomUserManager(BaseUserManager):
         
         user = self.model(nome_completo=nome_completo, cpf=cpf, email=email, data_nascimento=data_nascimento, **extra_fields)
         user.set_password(password)
-        user.save()
-        
-        UserPerfil.objects.create(user=user)
+        # CPF/email duplicados: IntegrityError das constraints únicas
+        with transaction.atomic(using=self._db):
+            user.save(using=self._db, validar_unicidade=False)
+            UserPerfil.objects.using(self._db).create(user=user)
         
         return user
         
\ No newline at end of file
@@ -0,0 +1,270 @@
+import glob
+import hashlib
+import os
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+import numpy as np
+from django.conf import settings
+from django.urls import URLResolver, get_resolver
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+    fcntl = None
+
+# Limites superiores (le) dos histogramas; a última faixa é +Inf
+FAIXAS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAIXAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+METODOS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE', 'OUTRO')
+CLASSES_STATUS = ('1xx', '2xx', '3xx', '4xx', '5xx')
+ROTA_OUTRA = '<outra>'
+
+# Campos de cada célula (rota, método, classe de status) do array
+LATENCIA = 0
+LATENCIA_SOMA = LATENCIA + len(FAIXAS_LATENCIA) + 1
+BYTES = LATENCIA_SOMA + 1
+BYTES_SOMA = BYTES + len(FAIXAS_BYTES) + 1
+DB_CONSULTAS = BYTES_SOMA + 1
+DB_SEGUNDOS = DB_CONSULTAS + 1
+CAMPOS = DB_SEGUNDOS + 1
+
+_INDICE_METODO = {metodo: posicao for posicao, metodo in enumerate(METODOS)}
+
+
+class ColetorConsultas:
+    """
+    Consultas SQL da requisição atual e o tempo gasto nelas.
+    """
+    __slots__ = ('consultas', 'segundos')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+
+
+_coletor_atual = ContextVar('users_metricas_coletor', default=None)
+
+
+def iniciar_coleta():
+    """
+    Passa a contar as consultas da requisição em um novo ColetorConsultas.
+    Retorna (coletor, token); o token vai para encerrar_coleta().
+    """
+    coletor = ColetorConsultas()
+    return coletor, _coletor_atual.set(coletor)
+
+
+def encerrar_coleta(token):
+    _coletor_atual.reset(token)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """
+    execute_wrapper instalado em todas as conexões (ver instalar_na_conexao);
+    fora de uma coleta só repassa a consulta.
+    """
+    coletor = _coletor_atual.get()
+    if coletor is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        coletor.consultas += 1
+        coletor.segundos += time.perf_counter() - inicio
+
+
+def instalar_na_conexao(connection):
+    # Fixo na conexão em vez de connection.execute_wrapper() a cada
+    # requisição: buscar connections[alias] custa alguns µs por alias
+    if medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(medir_consulta)
+
+
+def _listar_rotas(padroes, prefixo=''):
+    for padrao in padroes:
+        rota = URLResolver._join_route(prefixo, str(padrao.pattern))
+        if isinstance(padrao, URLResolver):
+            yield from _listar_rotas(padrao.url_patterns, rota)
+        else:
+            yield rota
+
+
+class Metricas:
+    """
+    Histogramas por rota em um array numpy mapeado em um arquivo de
+    METRICAS_DIR (de preferência em /dev/shm), um arquivo por processo: cada
+    worker escreve só no seu, sem trava entre processos, e /metrics soma
+    todos. As rotas vêm do URLconf, na mesma ordem em todos os processos; o
+    hash da lista entra no nome do arquivo para não misturar versões. O nome
+    leva ainda o PID (para saber se o processo acabou) e um token aleatório,
+    então um PID reaproveitado não reabre os contadores de outro processo.
+    """
+
+    def __init__(self, diretorio=None):
+        self.diretorio = diretorio
+        self.rotas = None
+        self.indice_rota = None
+        self.assinatura = None
+        self.array = None
+        self.valores = None
+        self.pid = None
+        self.trava = threading.Lock()
+
+    def _preparar(self):
+        if self.rotas is None:
+            self.diretorio = self.diretorio or settings.METRICAS_DIR
+            rotas = sorted(set(_listar_rotas(get_resolver().url_patterns)))
+            self.rotas = [ROTA_OUTRA] + rotas
+            self.indice_rota = {rota: posicao for posicao, rota in enumerate(self.rotas)}
+            self.assinatura = hashlib.blake2b('\n'.join(self.rotas).encode(), digest_size=6).hexdigest()
+        if self.pid != os.getpid():
+            # Primeiro uso ou processo filho após fork: arquivo próprio
+            self.pid = os.getpid()
+            self.array = self._abrir(self._arquivo(f"{self.pid}-{secrets.token_hex(4)}"))
+            # Escrita por elemento via memoryview: bem mais barata que a
+            # indexação de um np.memmap, e sobre o mesmo mapeamento
+            self.valores = memoryview(self.array.view(np.ndarray).reshape(-1))
+
+    @property
+    def formato(self):
+        return (len(self.rotas), len(METODOS), len(CLASSES_STATUS), CAMPOS)
+
+    def _arquivo(self, sufixo):
+        return os.path.join(self.diretorio, f"metricas_{self.assinatura}_{sufixo}.npy")
+
+    def _abrir(self, caminho):
+        os.makedirs(self.diretorio, exist_ok=True)
+        if os.path.exists(caminho):
+            # Só o acumulado dos processos encerrados é reaberto
+            array = np.load(caminho, mmap_mode='r+')
+            if array.shape == self.formato:
+                return array
+        return np.lib.format.open_memmap(caminho, mode='w+', dtype=np.float64, shape=self.formato)
+
+    def registrar(self, rota, metodo, status, duracao, tamanho, consultas=0, segundos_db=0.0):
+        self._preparar()
+        celula = ((
+            self.indice_rota.get(rota, 0) * len(METODOS)
+            + _INDICE_METODO.get(metodo, len(METODOS) - 1)
+        ) * len(CLASSES_STATUS) + min(max(status // 100, 1), 5) - 1) * CAMPOS
+        faixa_latencia = celula + LATENCIA + bisect_left(FAIXAS_LATENCIA, duracao)
+        faixa_bytes = celula + BYTES + bisect_left(FAIXAS_BYTES, tamanho)
+        valores = self.valores
+        with self.trava:
+            valores[faixa_latencia] += 1
+            valores[celula + LATENCIA_SOMA] += duracao
+            valores[faixa_bytes] += 1
+            valores[celula + BYTES_SOMA] += tamanho
+            valores[celula + DB_CONSULTAS] += consultas
+            valores[celula + DB_SEGUNDOS] += segundos_db
+
+    def somar(self):
+        """
+        Soma os arquivos de todos os processos. Os de processos encerrados
+        são incorporados a um arquivo acumulado e removidos, para que o
+        diretório não cresça a cada reinício de worker.
+        """
+        self._preparar()
+        total = np.zeros(self.formato)
+        with open(os.path.join(self.diretorio, '.trava'), 'w') as trava:
+            _travar(trava)
+            acumulado = self._abrir(self._arquivo('encerrados'))
+            for caminho in glob.glob(self._arquivo('*')):
+                pid = caminho.rsplit('_', 1)[1][:-len('.npy')].partition('-')[0]
+                if not pid.isdigit():
+                    continue
+                array = np.load(caminho, mmap_mode='r')
+                if array.shape != self.formato:
+                    continue
+                if _processo_vivo(int(pid)):
+                    total += array
+                else:
+                    acumulado += array
+                    acumulado.flush()
+                    os.remove(caminho)
+            total += acumulado
+        return total
+
+    def exportar(self, extras=()):
+        """
+        Texto no formato de exposição do Prometheus. 'extras' são tuplas
+        (nome, tipo, ajuda, [(rótulos, valor), ...]) de outras métricas.
+        """
+        total = self.somar()
+        contagens = total[..., LATENCIA:LATENCIA_SOMA].sum(axis=-1)
+        celulas = list(zip(*np.nonzero(contagens)))
+        linhas = []
+
+        def rotulos(r, m, s):
+            rota = self.rotas[r].replace('\\', '\\\\').replace('"', '\\"')
+            return f'rota="{rota}",metodo="{METODOS[m]}",status="{CLASSES_STATUS[s]}"'
+
+        def histograma(nome, ajuda, inicio, faixas, soma):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} histogram")
+            for r, m, s in celulas:
+                base = rotulos(r, m, s)
+                acumulado = np.cumsum(total[r, m, s, inicio:inicio + len(faixas) + 1])
+                for limite, valor in zip((*faixas, '+Inf'), acumulado):
+                    linhas.append(f'{nome}_bucket{{{base},le="{limite}"}} {valor:.0f}')
+                linhas.append(f"{nome}_sum{{{base}}} {total[r, m, s, soma]:.10g}")
+                linhas.append(f"{nome}_count{{{base}}} {contagens[r, m, s]:.0f}")
+
+        def contador(nome, ajuda, campo):
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} counter")
+            for r, m, s in celulas:
+                linhas.append(f"{nome}{{{rotulos(r, m, s)}}} {total[r, m, s, campo]:.10g}")
+
+        histograma('investsmart_http_requisicao_segundos', "Latência das requisições por rota.",
+                   LATENCIA, FAIXAS_LATENCIA, LATENCIA_SOMA)
+        histograma('investsmart_http_resposta_bytes', "Tamanho do corpo das respostas por rota.",
+                   BYTES, FAIXAS_BYTES, BYTES_SOMA)
+        contador('investsmart_db_consultas_total', "Consultas SQL executadas pelas requisições.", DB_CONSULTAS)
+        contador('investsmart_db_consultas_segundos_total', "Tempo gasto em consultas SQL.", DB_SEGUNDOS)
+
+        for nome, tipo, ajuda, valores in extras:
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for chave, valor in valores:
+                linhas.append(f"{nome}{{{chave}}} {valor}" if chave else f"{nome} {valor}")
+        return '\n'.join(linhas) + '\n'
+
+
+def _travar(arquivo):
+    """
+    Trava exclusiva no arquivo até ele ser fechado.
+    """
+    if fcntl is not None:
+        fcntl.flock(arquivo, fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            # Espera ~10 s e desiste com OSError; tenta de novo
+            msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _processo_vivo(pid):
+    if fcntl is None:
+        # No Windows os.kill(pid, 0) encerra o processo em vez de só testá-lo:
+        # os arquivos continuam sendo somados, mas não são incorporados
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+metricas = Metricas()
@@ -1,11 +1,19 @@
 import logging
+import random
 import time
 import uuid
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.http import JsonResponse
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from .logs import publicar_descartados
+from .metricas import ROTA_OUTRA, encerrar_coleta, iniciar_coleta, metricas
+from .replica import encerrar, iniciar, replica_configurada
 
 logger = logging.getLogger(__name__)
+# Log de acesso (uma linha na entrada e outra na saída de cada requisição)
+logger_acesso = logging.getLogger('users.acesso')
 
 
 class LogRequestMiddleware:
@@ -16,8 +24,10 @@ class LogRequestMiddleware:
         self.get_response = get_response
 
     def __call__(self, request):
-        # Log básico das headers (mantendo funcionalidade original)
-        logger.debug('HEADERS: %s', dict(request.headers))
+        # Log básico das headers (mantendo funcionalidade original); o
+        # dict só é montado se o nível DEBUG estiver ativo
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('HEADERS: %s', dict(request.headers))
         response = self.get_response(request)
         return response
 
@@ -25,21 +35,50 @@ class LogRequestMiddleware:
 class APIResponseMiddleware(MiddlewareMixin):
     """
     Middleware para padronizar respostas da API e adicionar logging avançado.
+    Também mede cada requisição (latência, consultas SQL e tamanho da
+    resposta): o resultado vai no header Server-Timing e nos histogramas de
+    users.metricas, expostos em /metrics.
     """
     
+    def __call__(self, request):
+        if self.async_mode or not settings.METRICAS_ATIVAS:
+            # No modo assíncrono o MiddlewareMixin delega a __acall__
+            return super().__call__(request)
+        request.consultas_db, token = iniciar_coleta()
+        try:
+            return super().__call__(request)
+        finally:
+            encerrar_coleta(token)
+
+    async def __acall__(self, request):
+        # Pilha assíncrona (ASGI): mesma coleta; as consultas das views
+        # síncronas herdam o contexto pelo sync_to_async
+        if not settings.METRICAS_ATIVAS:
+            return await super().__acall__(request)
+        request.consultas_db, token = iniciar_coleta()
+        try:
+            return await super().__acall__(request)
+        finally:
+            encerrar_coleta(token)
+    
     def process_request(self, request):
         """
         Processa a requisição antes de chegar à view.
         """
         # Gera um ID único para a requisição
         request.request_id = str(uuid.uuid4())
-        request.start_time = time.time()
+        request.start_time = time.perf_counter()
+        # Amostragem do log de acesso: decidida uma vez para as duas linhas
+        taxa = settings.LOG_AMOSTRA_ACESSO
+        request.registrar_acesso = taxa >= 1 or random.random() < taxa
         
-        logger.info(
-            f"[{request.request_id}] {request.method} {request.path} - "
-            f"IP: {self.get_client_ip(request)} - "
-            f"User-Agent: {request.META.get('HTTP_USER_AGENT', 'N/A')[:100]}"
-        )
+        if request.registrar_acesso:
+            logger_acesso.info(
+                "[%s] %s %s - IP: %s - User-Agent: %s",
+                request.request_id, request.method, request.path,
+                self.get_client_ip(request), request.META.get('HTTP_USER_AGENT', 'N/A')[:100],
+                extra={'request_id': request.request_id},
+            )
         
         return None
     
@@ -48,18 +87,27 @@ class APIResponseMiddleware(MiddlewareMixin):
         Processa a resposta e adiciona informações de timing.
         """
         if hasattr(request, 'start_time'):
-            duration = time.time() - request.start_time
+            duration = time.perf_counter() - request.start_time
             
-            # Log da resposta
-            logger.info(
-                f"[{getattr(request, 'request_id', 'N/A')}] "
-                f"Response: {response.status_code} - "
-                f"Duration: {duration:.3f}s"
-            )
+            # Log da resposta; erros do servidor sempre, mesmo fora da amostra
+            if request.registrar_acesso or response.status_code >= 500:
+                logger_acesso.info(
+                    "[%s] Response: %s - Duration: %.3fs",
+                    request.request_id, response.status_code, duration,
+                    extra={
+                        'request_id': request.request_id,
+                        'status': response.status_code,
+                        'duracao_ms': round(duration * 1000, 2),
+                    },
+                )
             
             # Adiciona headers de timing
             response['X-Response-Time'] = f"{duration:.3f}s"
             response['X-Request-ID'] = getattr(request, 'request_id', 'N/A')
+            
+            coletor = getattr(request, 'consultas_db', None)
+            if coletor is not None:
+                self.registrar_metricas(request, response, duration, coletor)
         
         # Adiciona headers de segurança
         response['X-Content-Type-Options'] = 'nosniff'
@@ -68,13 +116,58 @@ class APIResponseMiddleware(MiddlewareMixin):
         
         return response
     
-    def get_client_ip(self, request):
+    @staticmethod
+    def registrar_metricas(request, response, duration, coletor):
         """
-        Obtém o IP real do cliente.
+        Adiciona o Server-Timing e registra a requisição em users.metricas.
         """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
+        publicar_descartados()
+        response['Server-Timing'] = (
+            f'db;dur={coletor.segundos * 1000:.1f};desc="{coletor.consultas} consultas", '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        if response.streaming:
+            tamanho = int(response.get('Content-Length') or 0)
         else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+            tamanho = len(response.content)
+        match = request.resolver_match
+        metricas.registrar(
+            match.route if match else ROTA_OUTRA, request.method, response.status_code,
+            duration, tamanho, coletor.consultas, coletor.segundos,
+        )
+    
+    @staticmethod
+    def get_client_ip(request):
+        """
+        Obtém o IP real do cliente. O X-Forwarded-For só é usado atrás de
+        proxies confiáveis (REST_FRAMEWORK['NUM_PROXIES']), contando do fim:
+        o começo do cabeçalho é escrito pelo próprio cliente.
+        """
+        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+        num_proxies = api_settings.NUM_PROXIES
+        if x_forwarded_for and num_proxies:
+            enderecos = x_forwarded_for.split(',')
+            return enderecos[-min(num_proxies, len(enderecos))].strip()
+        return request.META.get('REMOTE_ADDR')
+
+
+class ReplicaMiddleware:
+    """
+    Delimita a requisição para o ReplicaRouter: GET/HEAD/OPTIONS leem da
+    réplica. Não faz nada sem o alias 'replica' configurado.
+    """
+    METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.ativo = replica_configurada()
+
+    def __call__(self, request):
+        if not self.ativo:
+            return self.get_response(request)
+        ip = APIResponseMiddleware.get_client_ip(request)
+        token = iniciar(request.method in self.METODOS_LEITURA, ip)
+        try:
+            return self.get_response(request)
+        finally:
+            encerrar(token, ip)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_passwordresettoken_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userperfil',
+            name='foto_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
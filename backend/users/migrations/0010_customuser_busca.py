@@ -0,0 +1,92 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:49
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+# Cópia do SQL e da normalização de users.busca na época desta migração:
+# migrações não importam código da aplicação, que pode mudar depois
+
+TABELA_FTS = 'users_customuser_busca'
+
+SQL_SQLITE = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5(
+        busca, content='users_customuser', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ai AFTER INSERT ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}(rowid, busca) VALUES (new.id, new.busca);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_ad AFTER DELETE ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, busca) VALUES ('delete', old.id, old.busca);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABELA_FTS}_au AFTER UPDATE OF busca ON users_customuser BEGIN
+        INSERT INTO {TABELA_FTS}({TABELA_FTS}, rowid, busca) VALUES ('delete', old.id, old.busca);
+        INSERT INTO {TABELA_FTS}(rowid, busca) VALUES (new.id, new.busca);
+    END
+    """,
+    f"INSERT INTO {TABELA_FTS}({TABELA_FTS}) VALUES ('rebuild')",
+]
+
+SQL_POSTGRESQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS users_customuser_busca_trgm ON users_customuser USING gin (busca gin_trgm_ops)",
+]
+
+
+def normalizar(texto):
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def texto_busca(nome_completo, email, cpf):
+    return ' '.join(parte for parte in (normalizar(nome_completo), normalizar(email),
+                                        re.sub(r'\D', '', cpf or '')) if parte)
+
+
+def preencher_busca(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ultimo = 0
+    while True:
+        lote = list(
+            CustomUser.objects.filter(pk__gt=ultimo).order_by('pk')
+            .only('nome_completo', 'email', 'cpf')[:5000]
+        )
+        if not lote:
+            break
+        for user in lote:
+            user.busca = texto_busca(user.nome_completo, user.email, user.cpf)
+        CustomUser.objects.bulk_update(lote, ['busca'])
+        ultimo = lote[-1].pk
+
+
+def criar_indice(apps, schema_editor):
+    comandos = {'sqlite': SQL_SQLITE, 'postgresql': SQL_POSTGRESQL}.get(schema_editor.connection.vendor, [])
+    for sql in comandos:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_userperfil_foto_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='busca',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(preencher_busca, migrations.RunPython.noop),
+        migrations.RunPython(criar_indice, migrations.RunPython.noop),
+    ]
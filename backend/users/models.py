@@ -6,6 +6,7 @@ from datetime import timedelta
 import re
 import secrets
 from .managers import CustomUserManager
+from .busca import texto_busca
 
 def validate_cpf(value):
     """Valida se o CPF está no formato correto"""
@@ -20,12 +21,21 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     data_nascimento = models.DateField(help_text="Data de nascimento")
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    created_at = models.DateTimeField(default=timezone.now, editable=False, help_text="Data de cadastro")
+    # Nome sem acentos, email e CPF só com dígitos; indexado por users.busca
+    busca = models.TextField(blank=True, default='', editable=False)
     
     objects = CustomUserManager()
     
     USERNAME_FIELD = 'cpf'
     REQUIRED_FIELDS = ['email', 'data_nascimento', 'nome_completo']
     
+    class Meta:
+        indexes = [
+            # Chave da paginação por cursor da listagem de usuários
+            models.Index(fields=['created_at', 'id'], name='users_created_at_id_idx'),
+        ]
+    
     def clean(self):
         super().clean()
         if self.data_nascimento:
@@ -35,10 +45,13 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
             if age < 18:
                 raise ValidationError({'data_nascimento': 'Usuário deve ter pelo menos 18 anos.'})
     
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, validar_unicidade=True, **kwargs):
+        # validar_unicidade=False deixa CPF e email para as constraints do
+        # banco (IntegrityError), sem os SELECTs do validate_unique()
+        self.full_clean(validate_unique=validar_unicidade)
         if self.cpf:
             self.cpf = re.sub(r'[^0-9]', '', self.cpf)
+        self.busca = texto_busca(self.nome_completo, self.email, self.cpf)
         super().save(*args, **kwargs)
     
     def __str__(self):
@@ -73,7 +86,10 @@ class UserPerfil(models.Model):
 
     telefone = models.CharField(max_length=20, blank=True, null=True)
     genero = models.CharField(max_length=1, choices=GENERO_CHOICE, null=True, blank=True)
+    # Legado: data URL em base64; migrar_fotos converte para foto_hash
     foto = models.TextField(blank=True, null=True)
+    # SHA-256 da foto em default_storage (ver users.fotos)
+    foto_hash = models.CharField(max_length=64, blank=True, default='')
 
     def __str__(self):
         return f'Perfil de {self.user.nome_completo}'
@@ -114,4 +130,40 @@ class PasswordResetToken(models.Model):
     
     class Meta:
         ordering = ['-created_at']
-    
\ No newline at end of file
+        indexes = [
+            # Invalidação dos tokens anteriores em esqueceu_a_senha
+            models.Index(fields=['user', 'used'], name='reset_user_used_idx'),
+            # Expurgo dos tokens expirados (expurgar_tokens)
+            models.Index(fields=['expires_at'], name='reset_expires_at_idx'),
+        ]
+    
+
+class EmailPendente(models.Model):
+    """
+    Caixa de saída de emails. Gravada na mesma transação do dado que gera o
+    email e enviada depois pelo comando enviar_emails.
+    """
+    STATUS_CHOICES = [
+        ('pendente', 'Pendente'),
+        ('enviado', 'Enviado'),
+        ('falhou', 'Falhou'),
+    ]
+
+    destinatario = models.EmailField()
+    assunto = models.CharField(max_length=255)
+    corpo = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pendente')
+    tentativas = models.PositiveIntegerField(default=0)
+    proxima_tentativa = models.DateTimeField(default=timezone.now)
+    ultimo_erro = models.TextField(blank=True, default='')
+    criado_em = models.DateTimeField(auto_now_add=True)
+    enviado_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Busca do próximo lote do worker
+            models.Index(fields=['status', 'proxima_tentativa'], name='email_status_proxima_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.assunto} para {self.destinatario} ({self.status})"
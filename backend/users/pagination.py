@@ -0,0 +1,142 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+def _reverse_ordering(ordering):
+    return tuple(campo[1:] if campo.startswith('-') else f"-{campo}" for campo in ordering)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Paginação por cursor (keyset) sobre uma chave composta.
+
+    Diferente do CursorPagination do DRF, que usa apenas o primeiro campo da
+    ordenação e um offset para empates, o cursor guarda o valor de todos os
+    campos da ordenação e 'id' é sempre acrescentado como desempate. Cada
+    página vira um "WHERE (a, id) < (x, y) ORDER BY a, id LIMIT n", com o
+    mesmo custo em qualquer profundidade, sem COUNT(*) nem OFFSET.
+
+    Aceita querysets de models, de .values() ou de .values_list(); neste
+    último caso os campos retornados por campos_ordenacao() devem ser as
+    últimas colunas da projeção.
+    """
+    ordering = ('-id',)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(campo.lstrip('-') in ('id', 'pk') for campo in ordering):
+            desempate = '-id' if ordering[-1].startswith('-') else 'id'
+            ordering = tuple(ordering) + (desempate,)
+        return ordering
+
+    def campos_ordenacao(self, request, queryset, view=None):
+        """
+        Campos (sem direção) cujo valor forma a posição do cursor.
+        """
+        return [campo.lstrip('-') for campo in self.get_ordering(request, queryset, view)]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self._apos(ordering, self.cursor.position))
+
+        resultados = list(queryset[:self.page_size + 1])
+        mais = len(resultados) > self.page_size
+        self.page = resultados[:self.page_size]
+        if reverse:
+            self.page.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = mais
+        else:
+            self.has_next = mais
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(reverse=False, position=self._posicao(self.page[-1])))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(reverse=True, position=self._posicao(self.page[0])))
+
+    def decode_cursor(self, request, model=None):
+        codificado = request.query_params.get(self.cursor_query_param)
+        if codificado is None:
+            return None
+
+        try:
+            dados = json.loads(urlsafe_b64decode(codificado.encode('ascii')))
+            posicao = dados['p']
+            campos = [campo.lstrip('-') for campo in self.ordering]
+            if not isinstance(posicao, list) or len(posicao) != len(campos):
+                raise ValueError
+            if model is not None:
+                posicao = [
+                    model._meta.get_field(campo).to_python(valor)
+                    for campo, valor in zip(campos, posicao)
+                ]
+            return Cursor(reverse=bool(dados.get('r')), position=posicao)
+        except (TypeError, ValueError, KeyError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        dados = {'p': [_serializar(valor) for valor in cursor.position]}
+        if cursor.reverse:
+            dados['r'] = 1
+        codificado = urlsafe_b64encode(json.dumps(dados, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, codificado)
+
+    def _posicao(self, linha):
+        campos = [campo.lstrip('-') for campo in self.ordering]
+        if isinstance(linha, tuple):
+            return list(linha[-len(campos):])
+        if isinstance(linha, dict):
+            return [linha[campo] for campo in campos]
+        return [getattr(linha, campo) for campo in campos]
+
+    def _apos(self, ordering, posicao):
+        # a > x OR (a = x AND b > y), escrito como a >= x AND (a > x OR b > y)
+        # para que o banco use o índice composto como range scan.
+        campo, valor = ordering[0], posicao[0]
+        nome = campo.lstrip('-')
+        decrescente = campo.startswith('-')
+        estrito = Q(**{f"{nome}__{'lt' if decrescente else 'gt'}": valor})
+        if len(ordering) == 1:
+            return estrito
+        inclusivo = Q(**{f"{nome}__{'lte' if decrescente else 'gte'}": valor})
+        return inclusivo & (estrito | self._apos(ordering[1:], posicao[1:]))
+
+
+def _serializar(valor):
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return valor
@@ -0,0 +1,101 @@
+from rest_framework import serializers
+
+# Campos cujo to_representation devolve o próprio valor lido do banco
+# (PrimaryKeyRelatedField recebe o pk já projetado pelo values_list).
+CAMPOS_IDENTIDADE = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ProjecaoLeitura:
+    """
+    Versão somente-leitura de um ModelSerializer baseada em projeções.
+
+    Lê apenas as colunas necessárias com .values_list() (com JOIN para os
+    serializers aninhados) e monta os dicionários com uma função gerada uma
+    única vez a partir dos campos do serializer, sem instanciar models nem
+    percorrer objetos Field por linha. O JSON resultante tem o mesmo formato
+    do serializer original, que continua sendo usado no schema do Swagger.
+
+    Uso:
+        leitura = ProjecaoLeitura(UserDetailSerializer)
+        dados = leitura.serializar(CustomUser.objects.filter(...))
+    """
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._lookups = None
+        self._montar = None
+
+    @property
+    def lookups(self):
+        if self._lookups is None:
+            self._compilar()
+        return self._lookups
+
+    def projetar(self, queryset, *extras):
+        """
+        Retorna o queryset como values_list das colunas projetadas.
+        Pode ser paginado antes de passar por converter(); colunas em
+        'extras' (ex.: a chave do cursor) vão ao final e são ignoradas na
+        montagem.
+        """
+        return queryset.values_list(*self.lookups, *extras)
+
+    def converter(self, linhas):
+        if self._montar is None:
+            self._compilar()
+        montar = self._montar
+        return [montar(linha) for linha in linhas]
+
+    def serializar(self, queryset):
+        return self.converter(self.projetar(queryset))
+
+    def serializar_um(self, queryset):
+        """
+        Retorna o primeiro registro serializado ou None.
+        """
+        dados = self.serializar(queryset[:1])
+        return dados[0] if dados else None
+
+    def _compilar(self):
+        lookups = []
+        conversores = {}
+        expressao = self._expressao(self.serializer_class(), '', lookups, conversores)
+        codigo = f"lambda r: {expressao}"
+        self._montar = eval(codigo, conversores)  # noqa: S307 - gerado apenas a partir dos campos do serializer
+        self._lookups = lookups
+
+    def _expressao(self, serializer, prefixo, lookups, conversores):
+        partes = []
+        for nome, campo in serializer.fields.items():
+            if campo.write_only:
+                continue
+            if isinstance(campo, serializers.BaseSerializer):
+                if getattr(campo, 'many', False):
+                    raise TypeError(f"ProjecaoLeitura não suporta o campo com many=True '{nome}'.")
+                prefixo_aninhado = f"{prefixo}{campo.source}__"
+                lookups.append(f"{prefixo_aninhado}pk")
+                indice_pk = len(lookups) - 1
+                interno = self._expressao(campo, prefixo_aninhado, lookups, conversores)
+                partes.append(f"{nome!r}: ({interno} if r[{indice_pk}] is not None else None)")
+                continue
+            if isinstance(campo, serializers.SerializerMethodField) or campo.source == '*' or '.' in campo.source:
+                raise TypeError(f"ProjecaoLeitura não suporta o campo '{nome}'.")
+
+            lookups.append(f"{prefixo}{campo.source}")
+            indice = len(lookups) - 1
+            if isinstance(campo, CAMPOS_IDENTIDADE):
+                partes.append(f"{nome!r}: r[{indice}]")
+            else:
+                chave = f"c{indice}"
+                conversores[chave] = campo.to_representation
+                partes.append(
+                    f"{nome!r}: ({chave}(r[{indice}]) if r[{indice}] is not None else None)"
+                )
+        return '{' + ', '.join(partes) + '}'
@@ -0,0 +1,68 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+ALIAS_REPLICA = 'replica'
+ESCREVEU = 'escreveu'
+
+# Destino das leituras da requisição atual: ALIAS_REPLICA, DEFAULT_DB_ALIAS
+# ou ESCREVEU (houve escrita; leituras no principal). None fora do
+# ReplicaMiddleware (comandos, workers)
+_destino = ContextVar('users_replica_destino', default=None)
+
+
+def replica_configurada():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def _chave_fixar(ip):
+    return f"users:replica:fixar:{ip}"
+
+
+def iniciar(leitura, ip):
+    """
+    Marca o início de uma requisição. Só as de leitura usam a réplica, e só
+    se o mesmo IP não escreveu há menos de DB_REPLICA_FIXAR_SEGUNDOS (a
+    réplica pode ainda não ter a alteração). Retorna o token de encerrar().
+    """
+    destino = DEFAULT_DB_ALIAS
+    if leitura and not (ip and cache.get(_chave_fixar(ip))):
+        destino = ALIAS_REPLICA
+    return _destino.set(destino)
+
+
+def encerrar(token, ip):
+    """
+    Restaura o estado anterior; se a requisição escreveu, fixa as próximas
+    leituras do IP no banco principal.
+    """
+    escreveu = _destino.get() == ESCREVEU
+    _destino.reset(token)
+    if escreveu and ip and settings.DB_REPLICA_FIXAR_SEGUNDOS:
+        cache.set(_chave_fixar(ip), True, settings.DB_REPLICA_FIXAR_SEGUNDOS)
+
+
+class ReplicaRouter:
+    """
+    Leituras das requisições seguras (BancoView.get, UserViewSet.me,
+    listagens) vão para o alias 'replica' quando ele existe. Todo o resto usa
+    o banco principal: escritas, leituras dentro de transação e, depois da
+    primeira escrita, as demais leituras da mesma requisição.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _destino.get() == ALIAS_REPLICA and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return ALIAS_REPLICA
+        # Explícito: sem isso o Django usaria o banco de origem da instância,
+        # que pode ser a réplica (ex.: usuário guardado em users.cache)
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if _destino.get() is not None:
+            _destino.set(ESCREVEU)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
@@ -3,13 +3,44 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.contrib.auth.password_validation import validate_password
-from .models import CustomUser, UserPerfil
+from django.db import IntegrityError, transaction
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from .models import CustomUser, UserPerfil, validate_cpf
+from .projecoes import ProjecaoLeitura
+from .tokens import RefreshToken
+from .fotos import (
+    FotoInvalida, FotoPreparada, decodificar, gravar_foto, preparar_foto, remover_foto_sem_uso, url_foto,
+)
 from datetime import date, datetime
+from functools import partial
 import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+class FotoField(serializers.Field):
+    """
+    Foto do perfil. Na escrita aceita um arquivo enviado ou uma data URL em
+    base64 (null/'' removem a foto) e só valida: os arquivos são gravados
+    no save() do serializer. Na leitura devolve apenas a URL da miniatura.
+    """
+
+    def to_representation(self, value):
+        return url_foto(value)
+
+    def to_internal_value(self, data):
+        if data in (None, ''):
+            return ''
+        try:
+            if hasattr(data, 'read'):
+                return preparar_foto(data.read())
+            if isinstance(data, str):
+                return preparar_foto(decodificar(data))
+        except FotoInvalida as e:
+            raise serializers.ValidationError(str(e))
+        raise serializers.ValidationError("Envie um arquivo de imagem ou uma data URL em base64.")
+
+
 class UserPerfilSerializer(serializers.ModelSerializer):
     """
     Serializer para o perfil do usuário com validações robustas.
@@ -22,18 +53,37 @@ class UserPerfilSerializer(serializers.ModelSerializer):
     - estado: Estado (UF)
     - telefone: Telefone (10 ou 11 dígitos)
     - genero: Gênero (M/F/O)
-    - foto: Foto do perfil (opcional)
+    - foto: URL da foto do perfil (opcional)
     """
+    foto = FotoField(source='foto_hash', required=False, allow_null=True)
     
     class Meta:
         model = UserPerfil
-        fields = '__all__'
+        exclude = ['foto_hash']
         extra_kwargs = {
             'user': {'read_only': True},
             'cep': {'help_text': 'Formato: 00000-000'},
             'telefone': {'help_text': 'Formato: (00) 00000-0000'},
         }
     
+    def create(self, validated_data):
+        self._gravar_foto(validated_data)
+        return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        anterior = instance.foto_hash
+        self._gravar_foto(validated_data)
+        perfil = super().update(instance, validated_data)
+        if anterior and anterior != perfil.foto_hash:
+            # A foto antiga só sai do storage se a troca for confirmada
+            transaction.on_commit(partial(remover_foto_sem_uso, anterior))
+        return perfil
+
+    def _gravar_foto(self, validated_data):
+        foto = validated_data.get('foto_hash')
+        if isinstance(foto, FotoPreparada):
+            validated_data['foto_hash'] = gravar_foto(foto)
+
     def validate_cep(self, value):
         """
         Valida formato do CEP.
@@ -124,6 +174,26 @@ class UserSerializer(serializers.ModelSerializer):
                 )
         return value.strip().title() if value else value
         
+MENSAGENS_DUPLICADO = {
+    'cpf': "Este CPF já está cadastrado.",
+    'email': "Este email já está cadastrado.",
+}
+
+
+def campo_duplicado(erro):
+    """
+    Campo único violado em um IntegrityError ('cpf', 'email' ou None). A
+    mensagem cita a coluna no SQLite ("UNIQUE constraint failed:
+    users_customuser.cpf") e a constraint no PostgreSQL
+    ("users_customuser_cpf_key" ou "..._email_key").
+    """
+    mensagem = str(erro)
+    for campo in MENSAGENS_DUPLICADO:
+        if re.search(rf'users_customuser[._]{campo}(_key)?\b', mensagem):
+            return campo
+    return None
+
+
 class RegisterUserSerializer(ModelSerializer):
     """
     Serializer para registro de novos usuários com validações completas.
@@ -144,15 +214,18 @@ class RegisterUserSerializer(ModelSerializer):
                 'write_only': True,
                 'help_text': 'Senha deve ter pelo menos 8 caracteres'
             },
-            'cpf': {'help_text': 'CPF com 11 dígitos'},
-            'email': {'help_text': 'Email válido e único'},
+            # Sem os UniqueValidator automáticos: a unicidade é checada
+            # pelas constraints do banco no INSERT (ver create())
+            'cpf': {'help_text': 'CPF com 11 dígitos', 'validators': [validate_cpf]},
+            'email': {'help_text': 'Email válido e único', 'validators': []},
             'nome_completo': {'help_text': 'Nome completo do usuário'},
             'data_nascimento': {'help_text': 'Usuário deve ter pelo menos 18 anos'},
         }
     
     def validate_cpf(self, value):
         """
-        Valida CPF: deve ter 11 dígitos, não pode ser sequência repetida e deve ser único.
+        Valida CPF: deve ter 11 dígitos e não pode ser sequência repetida.
+        A unicidade fica com a constraint do banco (ver create()).
         """
         if not value:
             raise serializers.ValidationError("CPF é obrigatório.")
@@ -172,26 +245,15 @@ class RegisterUserSerializer(ModelSerializer):
                 "CPF não pode ser uma sequência de números iguais."
             )
         
-        # Verifica unicidade
-        if CustomUser.objects.filter(cpf=cpf_clean).exists():
-            raise serializers.ValidationError(
-                "Este CPF já está cadastrado."
-            )
-        
         return cpf_clean
     
     def validate_email(self, value):
         """
-        Valida email: deve ser único.
+        Valida email. A unicidade fica com a constraint do banco (ver create()).
         """
         if not value:
             raise serializers.ValidationError("Email é obrigatório.")
         
-        if CustomUser.objects.filter(email=value).exists():
-            raise serializers.ValidationError(
-                "Este email já está cadastrado."
-            )
-        
         return value.lower()
     
     def validate_nome_completo(self, value):
@@ -280,7 +342,9 @@ class RegisterUserSerializer(ModelSerializer):
     
     def create(self, validated_data):
         """
-        Cria usuário e perfil associado.
+        Cria usuário e perfil associado em uma transação (dois INSERTs).
+        CPF ou email já cadastrados chegam como IntegrityError e viram os
+        mesmos erros de campo da validação.
         """
         try:
             # Remove password_confirm dos dados validados
@@ -289,11 +353,19 @@ class RegisterUserSerializer(ModelSerializer):
             # Cria o usuário (o manager já cria o perfil automaticamente)
             user = CustomUser.objects.create_user(**validated_data)
             
-            logger.info(f"Usuário criado com sucesso: {user.email}")
+            logger.info("Usuário criado com sucesso: %s", user.email)
             return user
             
+        except IntegrityError as e:
+            campo = campo_duplicado(e)
+            if campo is None:
+                logger.error("Erro de integridade ao criar usuário: %s", e)
+                raise serializers.ValidationError(
+                    "Erro interno. Tente novamente mais tarde."
+                )
+            raise serializers.ValidationError({campo: [MENSAGENS_DUPLICADO[campo]]})
         except Exception as e:
-            logger.error(f"Erro ao criar usuário: {str(e)}")
+            logger.error("Erro ao criar usuário: %s", e)
             raise serializers.ValidationError(
                 "Erro interno. Tente novamente mais tarde."
             )
@@ -311,6 +383,11 @@ class UserDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'cpf']
 
 
+# Leitura rápida (somente GET) com o mesmo formato dos serializers acima
+user_leitura = ProjecaoLeitura(UserSerializer)
+user_detail_leitura = ProjecaoLeitura(UserDetailSerializer)
+
+
 class LoginUserSerializer(serializers.Serializer):
     """
     Serializer para login de usuários com validações robustas.
@@ -373,25 +450,33 @@ class LoginUserSerializer(serializers.Serializer):
             user = authenticate(cpf=cpf, password=password)
             
             if not user:
-                logger.warning(f"Tentativa de login falhada para CPF: {cpf[:3]}***")
+                logger.warning("Tentativa de login falhada para CPF: %s***", cpf[:3])
                 raise serializers.ValidationError(
                     "CPF ou senha incorretos."
                 )
             
             if not user.is_active:
-                logger.warning(f"Tentativa de login com conta inativa: {user.email}")
+                logger.warning("Tentativa de login com conta inativa: %s", user.email)
                 raise serializers.ValidationError(
                     "Conta de usuário desativada. Entre em contato com o suporte."
                 )
             
             attrs['user'] = user
-            logger.info(f"Login realizado com sucesso: {user.email}")
+            logger.info("Login realizado com sucesso: %s", user.email)
             return attrs
             
         except serializers.ValidationError:
             raise
         except Exception as e:
-            logger.error(f"Erro durante autenticação: {str(e)}")
+            logger.error("Erro durante autenticação: %s", e)
             raise serializers.ValidationError(
                 "Erro interno. Tente novamente mais tarde."
-            )
\ No newline at end of file
+            )
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    """
+    Renovação de token (/api/token/refresh/) com a blacklist consultada
+    pelo filtro de users.blacklist.
+    """
+    token_class = RefreshToken
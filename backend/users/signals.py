@@ -0,0 +1,49 @@
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from .models import CustomUser, UserPerfil
+from .blacklist import registrar_na_blacklist
+from .busca import instalar_indice
+from .cache import invalidar_usuario
+from .metricas import instalar_na_conexao
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidar_cache_usuario(sender, instance, **kwargs):
+    # Cobre desativação, troca de senha (set_password + save) e last_login
+    _invalidar(instance.pk)
+
+
+@receiver(post_save, sender=UserPerfil)
+@receiver(post_delete, sender=UserPerfil)
+def invalidar_cache_perfil(sender, instance, **kwargs):
+    _invalidar(instance.user_id)
+
+
+def _invalidar(user_id):
+    invalidar_usuario(user_id)
+    # De novo no commit: uma requisição concorrente pode ter recarregado o
+    # usuário antigo enquanto a transação estava aberta
+    transaction.on_commit(lambda: invalidar_usuario(user_id))
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def atualizar_filtro_blacklist(sender, instance, created, **kwargs):
+    if created:
+        registrar_na_blacklist(instance.token.jti)
+
+
+@receiver(connection_created)
+def medir_consultas(sender, connection, **kwargs):
+    instalar_na_conexao(connection)
+
+
+@receiver(post_migrate)
+def recriar_indice_busca(sender, using, **kwargs):
+    # Uma migração que recrie users_customuser no SQLite apaga os triggers
+    # que mantêm o FTS5 em dia; recria o índice ao fim de cada migrate
+    if sender.label == 'users':
+        instalar_indice(connections[using], somente_se_faltar=True)
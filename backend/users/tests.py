@@ -1,3 +1,636 @@
-from django.test import TestCase
+import base64
+import logging
+import queue
+import os
+import smtplib
+import sqlite3
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections, transaction
+from django.http import HttpResponse
+from django.db.models.signals import post_migrate
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .blacklist import CHAVE_VERSAO, FiltroBlacklist
+from .authentication import CachedJWTAuthentication
+from .busca import TABELA_FTS
+from .cache import CHAVE_USUARIO, CHAVE_VERSAO_USUARIO, obter_usuario, usuarios_locais
+from .db import atomic_escrita
+from .emails import ESPERA_BASE, enviar_pendentes
+from .expurgo import expurgar_em_lotes, expurgar_tokens
+from .fotos import TAMANHOS_FOTO, caminho_foto, url_foto
+from .logs import CHAVE_DESCARTADOS, PipelineLogs
+from .metricas import LATENCIA, LATENCIA_SOMA, Metricas
+from .middleware import APIResponseMiddleware, ReplicaMiddleware
+from .models import CustomUser, EmailPendente, PasswordResetToken, UserPerfil
+from .projecoes import ProjecaoLeitura
+from .pagination import KeysetPagination
+from .serializers import UserDetailSerializer, UserPerfilSerializer, UserSerializer, user_detail_leitura, user_leitura
+from .replica import ALIAS_REPLICA
+
+
+def cache_em_arquivos(diretorio):
+    return {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio}}
+
+
+class FiltroBlacklistTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+
+    def bloquear(self, id=None, blacklisted_at=None):
+        token = OutstandingToken.objects.create(
+            jti=uuid.uuid4().hex, token='', expires_at=timezone.now() + timedelta(days=1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            linha = BlacklistedToken.objects.create(id=id, token=token)
+        if blacklisted_at is not None:
+            # auto_now_add ignora o valor passado no create()
+            BlacklistedToken.objects.filter(pk=linha.pk).update(blacklisted_at=blacklisted_at)
+        return token.jti
+
+    def test_sem_cache_compartilhado_consulta_o_banco(self):
+        worker_a, worker_b = FiltroBlacklist(), FiltroBlacklist()
+        self.assertFalse(worker_b.contem(uuid.uuid4().hex))
+        jti = self.bloquear()
+        worker_a.adicionar(jti)
+        self.assertTrue(worker_b.contem(jti))
+        # O LocMemCache não avisaria os outros processos: nenhum filtro é montado
+        self.assertIsNone(worker_b._filtro)
+
+    def test_gravacao_em_um_processo_chega_ao_outro(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio)):
+            worker_a, worker_b = FiltroBlacklist(), FiltroBlacklist()
+            self.assertFalse(worker_b.contem(uuid.uuid4().hex))
+            self.assertIsNotNone(worker_b._filtro)
+
+            jti = self.bloquear()
+            worker_a.adicionar(jti)
+            worker_a.publicar()
+            self.assertTrue(worker_a.contem(jti))
+            self.assertTrue(worker_b.contem(jti))
+
+    def test_linha_confirmada_fora_de_ordem(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio)):
+            worker = FiltroBlacklist()
+            antigo = timezone.now() - timedelta(hours=1)
+            self.bloquear(id=1, blacklisted_at=antigo)
+            self.bloquear(id=10)
+            self.assertFalse(worker.contem(uuid.uuid4().hex))
+
+            # id menor que o último lido, confirmado depois (PostgreSQL)
+            jti = self.bloquear(id=5)
+            cache.incr(CHAVE_VERSAO)
+            self.assertTrue(worker.contem(jti))
+
+
+    def test_expurgo_remonta_o_filtro_dos_outros_processos(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio)):
+            worker = FiltroBlacklist()
+            jti = self.bloquear()
+            self.assertTrue(worker.contem(jti))
+            OutstandingToken.objects.filter(jti=jti).update(expires_at=timezone.now() - timedelta(days=1))
+
+            expurgar_tokens()
+            self.assertFalse(BlacklistedToken.objects.exists())
+            self.assertFalse(worker.contem(jti))
+            self.assertNotIn(jti, worker._filtro)
+
+
+class ExpurgoEmLotesTests(TestCase):
+
+    def test_lotes_pelas_chaves_existentes(self):
+        agora = timezone.now()
+        for pk in (1, 2, 500_000, 1_000_000, 1_000_001):
+            EmailPendente.objects.create(
+                pk=pk, destinatario='maria@example.com', assunto='Teste', corpo='', status='enviado',
+                enviado_em=agora - timedelta(days=30),
+            )
+        EmailPendente.objects.filter(pk=2).update(status='pendente')
+
+        resultado = expurgar_em_lotes(EmailPendente.objects.filter(status='enviado'), tamanho_lote=2)
+        self.assertEqual((resultado.removidas, resultado.lotes), (4, 2))
+        self.assertEqual(list(EmailPendente.objects.values_list('pk', flat=True)), [2])
+
+class LimitePorIPTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    # Relógio parado: em máquina lenta o balde recarregaria uma ficha no meio
+    @mock.patch('users.throttling.time.time', return_value=time.time())
+    def test_x_forwarded_for_forjado_nao_troca_o_balde(self, _):
+        respostas = [
+            self.client.post(
+                '/api/users/login/', {'cpf': f'{tentativa:011d}', 'password': 'errada'},
+                content_type='application/json', HTTP_X_FORWARDED_FOR=f'10.0.0.{tentativa}',
+            ).status_code
+            for tentativa in range(30)
+        ]
+        self.assertEqual(respostas.count(429), 10)
+
+    def test_ip_do_cliente(self):
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='1.1.1.1, 2.2.2.2', REMOTE_ADDR='3.3.3.3')
+        self.assertEqual(APIResponseMiddleware.get_client_ip(request), '3.3.3.3')
+        with override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1}):
+            self.assertEqual(APIResponseMiddleware.get_client_ip(request), '2.2.2.2')
+        with override_settings(REST_FRAMEWORK={'NUM_PROXIES': 5}):
+            self.assertEqual(APIResponseMiddleware.get_client_ip(request), '1.1.1.1')
+
+
+class MetricasPrometheusTests(TestCase):
+
+    def test_sem_token_so_atende_loopback(self):
+        with override_settings(METRICAS_TOKEN=''):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.5').status_code, 403)
+            resposta = self.client.get('/metrics', REMOTE_ADDR='127.0.0.1')
+            self.assertEqual(resposta.status_code, 200)
+            self.assertIn(b'investsmart_logs_descartados_total 0', resposta.content)
+
+    def test_com_token_exige_o_token(self):
+        with override_settings(METRICAS_TOKEN='segredo'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            resposta = self.client.get('/metrics', REMOTE_ADDR='10.0.0.5', HTTP_AUTHORIZATION='Bearer segredo')
+            self.assertEqual(resposta.status_code, 200)
+
+    def diretorio(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        return diretorio.name
+
+    @staticmethod
+    def requisicoes(array):
+        return array[..., LATENCIA:LATENCIA_SOMA].sum()
+
+    def test_pid_reaproveitado_nao_reabre_os_contadores(self):
+        diretorio = self.diretorio()
+        anterior, atual = Metricas(diretorio), Metricas(diretorio)
+        anterior.registrar('<outra>', 'GET', 200, 0.01, 100)
+        atual.registrar('<outra>', 'GET', 200, 0.01, 100)
+        self.assertEqual(len(os.listdir(diretorio)), 2)
+        self.assertEqual(self.requisicoes(atual.array), 1)
+        self.assertEqual(self.requisicoes(atual.somar()), 2)
+
+    async def test_requisicao_assincrona_e_medida(self):
+        coletor = Metricas(self.diretorio())
+        with mock.patch('users.middleware.metricas', coletor):
+            resposta = await AsyncClient().get('/api/bancos/')
+        self.assertIn('Server-Timing', resposta)
+        self.assertEqual(self.requisicoes(coletor.array), 1)
+
+
+class PipelineLogsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.pipeline = PipelineLogs(tamanho_fila=2)
+        self.destino = logging.handlers.QueueHandler(queue.SimpleQueue())
+        self.logger = logging.getLogger('users.tests.pipeline')
+        self.logger.propagate = False
+        self.logger.addHandler(self.destino)
+        self.pipeline.desviar(self.logger)
+        self.addCleanup(self.logger.removeHandler, self.pipeline.filas_handlers[0])
+
+    def test_argumento_mutavel_e_formatado_na_chamada(self):
+        saldo = {'valor': 1}
+        self.logger.warning("saldo %s de %s", saldo, 'maria')
+        saldo['valor'] = 2
+        record, _ = self.pipeline.fila.get_nowait()
+        self.assertEqual(record.getMessage(), "saldo {'valor': 1} de maria")
+        self.assertIsNone(record.args)
+
+        self.logger.warning("usuário %s", 'maria')
+        record, _ = self.pipeline.fila.get_nowait()
+        self.assertEqual(record.args, ('maria',))
+
+    def test_descartados_publicados_no_cache(self):
+        for _ in range(5):
+            self.logger.warning("fila cheia")
+        self.assertEqual(self.pipeline.descartados, 3)
+        self.pipeline.publicar_descartados()
+        self.pipeline.publicar_descartados()
+        self.assertEqual(cache.get(CHAVE_DESCARTADOS), 3)
+
+
+class IndiceBuscaTests(TestCase):
+
+    def encontrados(self, termo):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s", [f'"{termo}"'])
+            return [rowid for rowid, in cursor.fetchall()]
+
+    def test_post_migrate_recria_triggers_perdidos(self):
+        # Como depois de uma migração que recria users_customuser no SQLite
+        with connection.cursor() as cursor:
+            for sufixo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER {TABELA_FTS}_{sufixo}")
+        antes = CustomUser.objects.create_user(
+            nome_completo="José Araújo", cpf='52998224725', email='jose@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.assertEqual(self.encontrados('araujo'), [])
+
+        config = apps.get_app_config('users')
+        post_migrate.send(sender=config, app_config=config, verbosity=0, interactive=False,
+                          using='default', apps=apps, plan=[])
+        depois = CustomUser.objects.create_user(
+            nome_completo="Ana Araújo", cpf='11144477735', email='ana@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.assertEqual(sorted(self.encontrados('araujo')), [antes.pk, depois.pk])
+
+
+class UrlFotoTests(TestCase):
+
+    def test_caminho_relativo_por_padrao(self):
+        hash_foto = 'ab' * 32
+        with override_settings(FOTOS_URL_BASE=''):
+            self.assertEqual(url_foto(hash_foto, 'p'), f'/api/users/fotos/{hash_foto}/p/')
+        with override_settings(FOTOS_URL_BASE='https://cdn.example.com/'):
+            self.assertEqual(url_foto(hash_foto, 'p'), f'https://cdn.example.com/api/users/fotos/{hash_foto}/p/')
+        self.assertIsNone(url_foto(''))
+
+
+class FotoPerfilTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        media = override_settings(MEDIA_ROOT=diretorio.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+
+    def foto(self, cor):
+        saida = BytesIO()
+        Image.new('RGB', (8, 8), cor).save(saida, 'PNG')
+        return 'data:image/png;base64,' + base64.b64encode(saida.getvalue()).decode()
+
+    def gravada(self, hash_foto):
+        return all(default_storage.exists(caminho_foto(hash_foto, tamanho)) for tamanho in TAMANHOS_FOTO)
+
+    def test_validacao_com_erro_nao_grava_arquivos(self):
+        serializer = UserPerfilSerializer(self.user.perfil, data={'foto': self.foto('red'), 'cep': '123'}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(default_storage.listdir('')[0], [])
+
+    def test_troca_remove_a_foto_antiga_depois_do_commit(self):
+        serializer = UserPerfilSerializer(self.user.perfil, data={'foto': self.foto('red')}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        self.assertEqual(default_storage.listdir('')[0], [])
+        antiga = serializer.save().foto_hash
+        self.assertTrue(self.gravada(antiga))
+
+        serializer = UserPerfilSerializer(self.user.perfil, data={'foto': self.foto('blue')}, partial=True)
+        self.assertTrue(serializer.is_valid())
+        with self.captureOnCommitCallbacks() as callbacks:
+            nova = serializer.save().foto_hash
+        self.assertTrue(self.gravada(antiga))
+        for callback in callbacks:
+            callback()
+        self.assertFalse(self.gravada(antiga))
+        self.assertTrue(self.gravada(nova))
+
+
+class ProjecaoLeituraTests(TestCase):
+
+    def test_mesmo_formato_dos_serializers(self):
+        maria = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        CustomUser.objects.create_user(
+            nome_completo="João Lima", cpf='11144477735', email='joao@example.com',
+            data_nascimento=date(1985, 12, 31), password='Senha@12345',
+        )
+        UserPerfil.objects.filter(user=maria).update(
+            cep='01001000', cidade="São Paulo", estado='SP', genero='F', foto_hash='ab' * 32,
+        )
+        usuarios = CustomUser.objects.order_by('id')
+
+        self.assertEqual(user_leitura.serializar(usuarios), UserSerializer(usuarios, many=True).data)
+        self.assertEqual(user_detail_leitura.serializar(usuarios), UserDetailSerializer(usuarios, many=True).data)
+        self.assertEqual(user_detail_leitura.serializar_um(usuarios.filter(pk=maria.pk))['perfil']['foto'],
+                         url_foto('ab' * 32))
+
+    def test_campo_many_nao_suportado(self):
+        class ComLista(UserSerializer):
+            perfis = UserSerializer(many=True, read_only=True)
+
+            class Meta(UserSerializer.Meta):
+                fields = UserSerializer.Meta.fields + ['perfis']
+
+        with self.assertRaises(TypeError):
+            ProjecaoLeitura(ComLista).lookups
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.ids = []
+        for indice, cpf in enumerate(['52998224725', '11144477735', '39053344705', '98765432100', '12345678909']):
+            self.ids.append(CustomUser.objects.create_user(
+                nome_completo=f"Usuário {indice}", cpf=cpf, email=f'u{indice}@example.com',
+                data_nascimento=date(1990, 1, 1), password='Senha@12345',
+            ).pk)
+        # Todos no mesmo instante: a ordem sai só do desempate por id
+        CustomUser.objects.update(created_at=timezone.now())
+
+    def pagina(self, url):
+        paginator = KeysetPagination()
+        paginator.ordering = ('-created_at',)
+        pagina = paginator.paginate_queryset(CustomUser.objects.all(), Request(RequestFactory().get(url)))
+        return [usuario.pk for usuario in pagina], paginator.get_next_link(), paginator.get_previous_link()
+
+    def test_empate_em_created_at_nao_repete_nem_pula(self):
+        vistos, proxima, url = [], '/api/users/?page_size=2', None
+        while proxima:
+            url = proxima
+            ids, proxima, _ = self.pagina(url)
+            vistos += ids
+        self.assertEqual(vistos, sorted(self.ids, reverse=True))
+
+        _, _, anterior = self.pagina(url)
+        ids, _, _ = self.pagina(anterior)
+        self.assertEqual(ids, vistos[2:4])
+
+    def test_cursor_invalido(self):
+        with self.assertRaises(NotFound):
+            self.pagina('/api/users/?cursor=nao-e-cursor')
+
+
+class BulkImportUsersTests(TestCase):
+
+    def test_duplicados_no_arquivo_e_no_banco(self):
+        CustomUser.objects.create_user(
+            nome_completo="Já Cadastrado", cpf='12345678909', email='existente@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        caminho = os.path.join(diretorio.name, 'usuarios.csv')
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(
+                "nome_completo,cpf,email,data_nascimento,senha\n"
+                "Ana Souza,529.982.247-25,ana@example.com,1990-01-01,\n"
+                "Bia Souza,52998224725,bia@example.com,1990-01-01,\n"
+                "Caio Lima,11144477735,existente@example.com,1990-01-01,\n"
+                "Duda Lima,123,duda@example.com,1990-01-01,\n"
+                "Eva Rocha,39053344705,ana@example.com,1990-01-01,\n"
+                "Fabi Rocha,98765432100,fabi@example.com,1990-01-01,Senha@12345\n"
+            )
+        saida, erros = StringIO(), StringIO()
+        call_command('bulk_import_users', caminho, '--lote', '2', '--processos', '1', stdout=saida, stderr=erros)
+
+        self.assertIn("2 usuários criados, 4 linhas rejeitadas", saida.getvalue())
+        self.assertEqual(sorted(linha.split(':')[0] for linha in erros.getvalue().splitlines()),
+                         ['Linha 3', 'Linha 4', 'Linha 5', 'Linha 6'])
+        importados = CustomUser.objects.filter(email__in=['ana@example.com', 'fabi@example.com'])
+        self.assertEqual(importados.filter(perfil__isnull=False).count(), 2)
+        self.assertFalse(importados.get(email='ana@example.com').has_usable_password())
+        self.assertTrue(importados.get(email='fabi@example.com').check_password('Senha@12345'))
+
+
+class ServidorForaDoAr(EmailBackend):
+
+    def send_messages(self, messages):
+        raise smtplib.SMTPServerDisconnected("Conexão recusada")
+
+
+class CaixaDeSaidaTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+
+    def esqueceu_a_senha(self):
+        return self.client.post(
+            '/api/users/esqueceu_a_senha/', {'email': 'maria@example.com'}, content_type='application/json',
+        )
+
+    def test_email_enfileirado_na_transacao_do_token(self):
+        self.assertEqual(self.esqueceu_a_senha().status_code, 200)
+        token = PasswordResetToken.objects.get(user=self.user, used=False)
+        email = EmailPendente.objects.get()
+        self.assertEqual((email.destinatario, email.status), ('maria@example.com', 'pendente'))
+        self.assertIn(str(token.token), email.corpo)
+        # Nada sai na requisição: o envio é do comando enviar_emails
+        self.assertEqual(mail.outbox, [])
+
+        with mock.patch('users.views.enfileirar_email', side_effect=DatabaseError):
+            self.esqueceu_a_senha()
+        # Sem o email, o novo token e a invalidação do anterior são desfeitos
+        self.assertEqual(PasswordResetToken.objects.get(user=self.user, used=False), token)
+        self.assertEqual(EmailPendente.objects.count(), 1)
+
+    def test_lote_enviado_em_uma_conexao(self):
+        for indice in range(3):
+            EmailPendente.objects.create(destinatario=f'u{indice}@example.com', assunto="Olá", corpo="Corpo")
+        with mock.patch.object(EmailBackend, 'open', autospec=True, return_value=True) as abrir:
+            resultado = enviar_pendentes(tamanho_lote=2)
+        self.assertEqual((resultado.enviados, abrir.call_count), (2, 1))
+        self.assertEqual([m.to for m in mail.outbox], [['u0@example.com'], ['u1@example.com']])
+
+        enviar_pendentes(tamanho_lote=2)
+        self.assertEqual(EmailPendente.objects.filter(status='enviado').count(), 3)
+        self.assertIsNotNone(EmailPendente.objects.first().enviado_em)
+
+    def test_falha_volta_para_a_fila_com_backoff(self):
+        email = EmailPendente.objects.create(destinatario='maria@example.com', assunto="Olá", corpo="Corpo")
+        antes = timezone.now()
+        resultado = enviar_pendentes(connection=ServidorForaDoAr(), maximo_tentativas=2)
+        self.assertEqual(resultado.falhas, 1)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.tentativas), ('pendente', 1))
+        self.assertIn('SMTPServerDisconnected', email.ultimo_erro)
+        espera = (email.proxima_tentativa - antes).total_seconds()
+        self.assertTrue(ESPERA_BASE * 0.8 <= espera <= ESPERA_BASE * 1.2 + 5, espera)
+
+        # Antes do backoff nada é reenviado
+        self.assertEqual(enviar_pendentes(connection=ServidorForaDoAr()).falhas, 0)
+
+        EmailPendente.objects.update(proxima_tentativa=timezone.now())
+        resultado = enviar_pendentes(connection=ServidorForaDoAr(), maximo_tentativas=2)
+        email.refresh_from_db()
+        self.assertEqual((resultado.desistencias, email.status, email.tentativas), (1, 'falhou', 2))
+
+    def test_status_da_fila(self):
+        EmailPendente.objects.create(destinatario='a@example.com', assunto="Olá", corpo="Corpo")
+        EmailPendente.objects.create(destinatario='b@example.com', assunto="Olá", corpo="Corpo",
+                                     proxima_tentativa=timezone.now() + timedelta(minutes=5))
+        EmailPendente.objects.create(destinatario='c@example.com', assunto="Olá", corpo="Corpo", status='falhou')
+        saida = StringIO()
+        call_command('enviar_emails', '--status', stdout=saida)
+        self.assertIn("Fila: 1 prontos, 1 agendados, 1 falhos.", saida.getvalue())
+        self.assertEqual(mail.outbox, [])
+
+
+class AtomicEscritaTests(TransactionTestCase):
+
+    def test_so_a_escrita_abre_com_begin_immediate(self):
+        with CaptureQueriesContext(connection) as consultas:
+            with atomic_escrita():
+                EmailPendente.objects.count()
+            with transaction.atomic():
+                EmailPendente.objects.count()
+        inicios = [c['sql'] for c in consultas.captured_queries if c['sql'].startswith('BEGIN')]
+        self.assertEqual(inicios, ['BEGIN IMMEDIATE', 'BEGIN'])
+        self.assertIsNone(connection.transaction_mode)
+
+
+class ReplicaTests(TransactionTestCase):
+    # Fora de TestCase: dentro de transação o ReplicaRouter sempre lê do principal
+
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Principal", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        # Réplica: cópia do banco de testes em outro arquivo SQLite, com o
+        # nome trocado para saber de onde cada leitura veio
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        arquivo = os.path.join(diretorio.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(arquivo) as destino:
+            connection.connection.backup(destino)
+            destino.execute("UPDATE users_customuser SET nome_completo = 'Réplica'")
+        destino.close()
+
+        bancos = {**connections.settings, ALIAS_REPLICA: {**connections.settings['default'], 'NAME': arquivo}}
+        connections.settings[ALIAS_REPLICA] = bancos[ALIAS_REPLICA]
+        self.addCleanup(self._remover_replica)
+        # O alias não existia quando a classe validou 'databases'
+        liberar = mock.patch.object(type(self), 'databases', {*self.databases, ALIAS_REPLICA})
+        liberar.start()
+        self.addCleanup(liberar.stop)
+        configuracao = override_settings(DATABASES=bancos)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        self.middleware = ReplicaMiddleware(self.view)
+
+    def _remover_replica(self):
+        connections[ALIAS_REPLICA].close()
+        del connections[ALIAS_REPLICA]
+        del connections.settings[ALIAS_REPLICA]
+
+    def view(self, request):
+        if request.method == 'POST':
+            CustomUser.objects.filter(pk=self.user.pk).update(last_login=timezone.now())
+        return HttpResponse(CustomUser.objects.get(pk=self.user.pk).nome_completo)
+
+    def nome(self, metodo, ip):
+        request = getattr(RequestFactory(), metodo)('/', REMOTE_ADDR=ip)
+        return self.middleware(request).content.decode()
+
+    def test_get_le_da_replica(self):
+        self.assertEqual(self.nome('get', '10.0.0.1'), "Réplica")
+        self.assertEqual(self.nome('head', '10.0.0.1'), "Réplica")
+        self.assertEqual(self.nome('post', '10.0.0.1'), "Principal")
+
+    def test_escrita_fixa_as_leituras_do_ip_no_principal(self):
+        self.assertEqual(self.nome('post', '10.0.0.1'), "Principal")
+        self.assertEqual(self.nome('get', '10.0.0.1'), "Principal")
+        self.assertEqual(self.nome('get', '10.0.0.2'), "Réplica")
+
+    def test_sem_fixar_depois_da_escrita(self):
+        with override_settings(DB_REPLICA_FIXAR_SEGUNDOS=0):
+            self.assertEqual(self.nome('post', '10.0.0.1'), "Principal")
+            self.assertEqual(self.nome('get', '10.0.0.1'), "Réplica")
+
+
+class CacheUsuarioTests(TestCase):
+
+    def setUp(self):
+        diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(diretorio.cleanup)
+        self.diretorio = diretorio.name
+        usuarios_locais.limpar()
+        self.addCleanup(usuarios_locais.limpar)
+        self.user = CustomUser.objects.create_user(
+            nome_completo="Maria Souza", cpf='52998224725', email='maria@example.com',
+            data_nascimento=date(1990, 1, 1), password='Senha@12345',
+        )
+        self.carregar = CachedJWTAuthentication()._carregar
+
+    def obter(self):
+        return obter_usuario(self.user.pk, self.carregar)
+
+    def em_outro_worker(self, alterar):
+        # A alteração roda aqui, mas este processo guarda de volta o que
+        # tinha em cache, como um worker que não recebeu o sinal
+        item = usuarios_locais.obter(self.user.pk)
+        user = CustomUser.objects.get(pk=self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            alterar(user)
+        usuarios_locais.salvar(self.user.pk, item)
+
+    def test_sem_cache_compartilhado_sempre_consulta_o_banco(self):
+        self.obter()
+        self.assertEqual(len(usuarios_locais), 0)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(self.obter().is_active)
+
+    def test_desativacao_vale_em_todos_os_workers(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio)):
+            self.assertTrue(self.obter().is_active)
+            with self.assertNumQueries(0):
+                self.obter()
+
+            def desativar(user):
+                user.is_active = False
+                user.save()
+            self.em_outro_worker(desativar)
+            self.assertFalse(self.obter().is_active)
+
+    def test_troca_de_senha_vale_em_todos_os_workers(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio)):
+            self.obter()
+
+            def trocar_senha(user):
+                user.set_password('Nova@12345')
+                user.save()
+            self.em_outro_worker(trocar_senha)
+            self.assertTrue(self.obter().check_password('Nova@12345'))
+
+    def test_cache_compartilhado_sem_a_senha(self):
+        with override_settings(CACHES=cache_em_arquivos(self.diretorio), USUARIOS_CACHE_COMPARTILHADO=True):
+            self.obter()
+            versao = cache.get(CHAVE_VERSAO_USUARIO.format(user_id=self.user.pk))
+            dados = cache.get(CHAVE_USUARIO.format(user_id=self.user.pk, versao=versao))
+            self.assertNotIn('password', dados['usuario'])
+            self.assertEqual(dados['usuario']['email'], 'maria@example.com')
+
+            usuarios_locais.limpar()
+            with self.assertNumQueries(0):
+                user = self.obter()
+            self.assertEqual(user.nome_completo, "Maria Souza")
+            # A senha é lida do banco só quando alguém precisa dela
+            with self.assertNumQueries(1):
+                self.assertTrue(user.check_password('Senha@12345'))
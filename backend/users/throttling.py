@@ -0,0 +1,149 @@
+import re
+import time
+
+from django.core.cache import cache
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .middleware import APIResponseMiddleware
+
+CHAVE_BALDE = 'limite:{escopo}:{identificador}'
+CHAVE_REJEICOES = 'limite:rejeicoes:{escopo}'
+PERIODOS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def ler_taxa(taxa):
+    """
+    Converte '5/min' em (5, 60), no mesmo formato das taxas do DRF.
+    """
+    quantidade, periodo = taxa.split('/')
+    return int(quantidade), PERIODOS[periodo[0]]
+
+
+def consumir(chave, capacidade, periodo):
+    """
+    Retira uma ficha do balde 'chave' (capacidade fichas, recarregadas ao
+    longo de 'periodo' segundos). Retorna (permitido, segundos de espera).
+
+    O balde é guardado como o instante teórico (ms) em que estará cheio de
+    novo (GCRA, equivalente a um token bucket). A ficha é retirada com
+    cache.incr atômico, então processos diferentes dividem o mesmo balde
+    quando o cache é compartilhado (REDIS_URL); no LocMemCache cada processo
+    tem o seu.
+    """
+    intervalo = max(int(periodo * 1000 / capacidade), 1)
+    tolerancia = periodo * 1000 - intervalo
+    timeout = int(periodo) + 1
+    agora = int(time.time() * 1000)
+
+    try:
+        cheio_em = cache.incr(chave, intervalo)
+    except ValueError:
+        if cache.add(chave, agora + intervalo, timeout=timeout):
+            return True, 0
+        cheio_em = cache.incr(chave, intervalo)
+
+    anterior = cheio_em - intervalo
+    if anterior < agora:
+        # Balde cheio de novo: recomeça a contagem a partir de agora
+        cache.set(chave, agora + intervalo, timeout=timeout)
+        return True, 0
+    if anterior - agora > tolerancia:
+        # Requisição rejeitada não gasta ficha
+        cache.decr(chave, intervalo)
+        return False, (anterior - tolerancia - agora) / 1000
+    cache.touch(chave, timeout)
+    return True, 0
+
+
+def registrar_rejeicao(escopo):
+    chave = CHAVE_REJEICOES.format(escopo=escopo)
+    try:
+        cache.incr(chave)
+    except ValueError:
+        if not cache.add(chave, 1, timeout=None):
+            cache.incr(chave)
+
+
+def contadores_rejeicao(escopos=None):
+    """
+    Retorna {escopo: requisições rejeitadas} dos escopos configurados em
+    DEFAULT_THROTTLE_RATES.
+    """
+    if escopos is None:
+        escopos = list(api_settings.DEFAULT_THROTTLE_RATES)
+    chaves = {CHAVE_REJEICOES.format(escopo=escopo): escopo for escopo in escopos}
+    valores = cache.get_many(chaves.keys())
+    return {escopo: valores.get(chave, 0) for chave, escopo in chaves.items()}
+
+
+class LimiteExcedido(Throttled):
+    default_detail = 'Muitas tentativas.'
+    extra_detail_singular = 'Tente novamente em {wait} segundo.'
+    extra_detail_plural = 'Tente novamente em {wait} segundos.'
+    default_code = 'rate_limited'
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Limite por token bucket no cache. O escopo é '<view.throttle_scope>_<sufixo>'
+    e a taxa vem de REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] ('5/min' = balde
+    de 5 fichas recarregado em 1 minuto). Escopos sem taxa não são limitados.
+    """
+    sufixo = None
+
+    def __init__(self):
+        self.espera = None
+
+    def identificador(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        escopo = f"{getattr(view, 'throttle_scope', None)}_{self.sufixo}"
+        taxa = api_settings.DEFAULT_THROTTLE_RATES.get(escopo)
+        if not taxa:
+            return True
+        identificador = self.identificador(request)
+        if not identificador:
+            return True
+
+        capacidade, periodo = ler_taxa(taxa)
+        chave = CHAVE_BALDE.format(escopo=escopo, identificador=identificador)
+        permitido, self.espera = consumir(chave, capacidade, periodo)
+        if not permitido:
+            registrar_rejeicao(escopo)
+        return permitido
+
+    def wait(self):
+        return self.espera
+
+
+class LimitePorIP(TokenBucketThrottle):
+    sufixo = 'ip'
+
+    def identificador(self, request):
+        return APIResponseMiddleware.get_client_ip(request)
+
+
+class LimitePorConta(TokenBucketThrottle):
+    """
+    Limita pelo CPF ou email do corpo da requisição, para ataques a uma
+    mesma conta vindos de vários IPs.
+    """
+    sufixo = 'conta'
+
+    def identificador(self, request):
+        try:
+            dados = request.data
+        except ParseError:
+            return None
+        if not hasattr(dados, 'get'):
+            return None
+        cpf = re.sub(r'[^0-9]', '', str(dados.get('cpf') or ''))
+        if cpf:
+            return f"cpf:{cpf}"
+        email = str(dados.get('email') or '').strip().lower()
+        if email:
+            return f"email:{email}"
+        return None
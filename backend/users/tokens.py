@@ -0,0 +1,27 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+
+from .blacklist import filtro_blacklist
+
+
+class RefreshToken(BaseRefreshToken):
+    """
+    RefreshToken que consulta a blacklist pelo filtro de Bloom de
+    users.blacklist antes de ir ao banco.
+    """
+
+    def check_blacklist(self):
+        jti = self.payload[api_settings.JTI_CLAIM]
+        if filtro_blacklist.contem(jti):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        # O token quase sempre já está em OutstandingToken (criado no login
+        # ou na rotação): evita a consulta do usuário feita pelo simplejwt.
+        token = OutstandingToken.objects.filter(jti=self.payload[api_settings.JTI_CLAIM]).first()
+        if token is None:
+            return super().blacklist()
+        return BlacklistedToken.objects.get_or_create(token=token)
@@ -1,11 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet
+from .views import UserViewSet, foto_perfil
 
 # Router para ViewSets
 router = DefaultRouter()
 router.register(r'', UserViewSet, basename='user')
 
 urlpatterns = [
+    path('fotos/<str:hash_foto>/<str:tamanho>/', foto_perfil, name='foto-perfil'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,29 +1,40 @@
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth import authenticate
 from django.db import transaction
-from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.pagination import PageNumberPagination
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.http import Http404, FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_safe
+import ipaddress
 import logging
 
 from .models import CustomUser, UserPerfil, PasswordResetToken
+from .emails import enfileirar_email, profundidade_fila
+from .logs import logs_descartados
+from .metricas import metricas
+from .fotos import abrir_foto
+from .tokens import RefreshToken
+from .pagination import KeysetPagination
+from .busca import BuscaNormalizadaFilter
+from .throttling import LimitePorIP, LimitePorConta, LimiteExcedido, contadores_rejeicao
 from .serializers import (
     UserSerializer, 
     RegisterUserSerializer, 
     LoginUserSerializer, 
     UserPerfilSerializer,
-    UserDetailSerializer
+    UserDetailSerializer,
+    user_leitura,
+    user_detail_leitura
 )
 from .exceptions import (
     ValidationException,
@@ -34,13 +45,14 @@ from .exceptions import (
 logger = logging.getLogger(__name__)
 
 
-class UserPagination(PageNumberPagination):
+class UserPagination(KeysetPagination):
     """
-    Paginação customizada para usuários.
+    Paginação por cursor para usuários, ordenada por (created_at, id).
     """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    ordering = ('-created_at',)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -62,21 +74,19 @@ class UserViewSet(viewsets.ModelViewSet):
     - PUT /users/me/ - Atualizar perfil do usuário logado
     
     Filtros disponíveis:
-    - ?search=termo - Busca por nome, email ou CPF
-    - ?ordering=campo - Ordena por campo (nome_completo, email, data_nascimento)
-    - ?page=1&page_size=20 - Paginação
+    - ?search=termo - Busca por nome (com ou sem acentos), email ou CPF
+    - ?ordering=campo - Ordena por campo (nome_completo, email, data_nascimento, created_at)
+    - ?cursor=...&page_size=20 - Paginação por cursor (links em next/previous)
     """
-    queryset = CustomUser.objects.select_related('perfil').all()
+    queryset = CustomUser.objects.select_related('perfil').defer('perfil__foto')
     serializer_class = UserSerializer
     pagination_class = UserPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    
-    # Campos para busca
-    search_fields = ['nome_completo', 'email', 'cpf']
+    # Busca por nome (sem acentos), email ou CPF em CustomUser.busca
+    filter_backends = [DjangoFilterBackend, BuscaNormalizadaFilter, filters.OrderingFilter]
     
     # Campos para ordenação
-    ordering_fields = ['nome_completo', 'email', 'data_nascimento', 'date_joined']
-    ordering = ['-date_joined']  # Ordenação padrão
+    ordering_fields = ['nome_completo', 'email', 'data_nascimento', 'created_at']
+    ordering = ['-created_at']  # Ordenação padrão
     
     # Campos para filtro
     filterset_fields = ['perfil__genero', 'perfil__estado', 'perfil__cidade']
@@ -89,11 +99,26 @@ class UserViewSet(viewsets.ModelViewSet):
             permission_classes = [AllowAny]
         elif self.action in ['me', 'logout', 'update_profile']:
             permission_classes = [IsAuthenticated]
+        elif self.action == 'limites':
+            permission_classes = [IsAdminUser]
         else:
             permission_classes = [IsAuthenticated]  # Admin only para list, retrieve, etc
         
         return [permission() for permission in permission_classes]
     
+    def get_throttles(self):
+        """
+        Limita por IP e por CPF/email as actions públicas; roda antes de
+        qualquer hash de senha ou consulta ao banco.
+        """
+        if self.action in ['create', 'login', 'esqueceu_a_senha']:
+            self.throttle_scope = self.action
+            return [LimitePorIP(), LimitePorConta()]
+        return super().get_throttles()
+    
+    def throttled(self, request, wait):
+        raise LimiteExcedido(wait)
+    
     def get_serializer_class(self):
         """
         Retorna o serializer apropriado baseado na action.
@@ -106,6 +131,30 @@ class UserViewSet(viewsets.ModelViewSet):
             return UserDetailSerializer
         return UserSerializer
     
+    def list(self, request, *args, **kwargs):
+        """
+        Lista usuários a partir de uma projeção (sem instanciar models).
+        GET /users/
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        campos_cursor = self.paginator.campos_ordenacao(request, queryset, self)
+        linhas = user_leitura.projetar(queryset, *campos_cursor)
+        pagina = self.paginate_queryset(linhas)
+        if pagina is not None:
+            return self.get_paginated_response(user_leitura.converter(pagina))
+        return Response(user_leitura.converter(linhas))
+    
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Detalhes do usuário a partir de uma projeção (usuário + perfil em uma query).
+        GET /users/{id}/
+        """
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        dados = user_detail_leitura.serializar_um(self.get_queryset().filter(**{self.lookup_field: lookup}))
+        if dados is None:
+            raise Http404
+        return Response(dados)
+    
     @swagger_auto_schema(
         operation_description="Registra um novo usuário no sistema",
         operation_summary="Registro de usuário",
@@ -153,10 +202,11 @@ class UserViewSet(viewsets.ModelViewSet):
         try:
             serializer = self.get_serializer(data=request.data)
             if serializer.is_valid():
-                with transaction.atomic():
-                    user = serializer.save()
+                # Usuário e perfil na transação do manager; CPF/email
+                # duplicados voltam como erro de campo do serializer
+                user = serializer.save()
                     
-                logger.info(f"Usuário criado com sucesso: {user.cpf}")
+                logger.info("Usuário criado com sucesso: %s", user.cpf)
                 user_serializer = UserDetailSerializer(user)
                 
                 return Response({
@@ -167,15 +217,15 @@ class UserViewSet(viewsets.ModelViewSet):
                     'message': 'Usuário criado com sucesso!'
                 }, status=status.HTTP_201_CREATED)
             else:
-                logger.warning(f"Tentativa de registro com dados inválidos: {request.data.get('cpf', 'N/A')}")
+                logger.warning("Tentativa de registro com dados inválidos: %s", request.data.get('cpf', 'N/A'))
                 raise ValidationException(
                     message="Dados de registro inválidos.",
                     code="invalid_registration_data"
                 )
-        except ValidationException:
+        except (ValidationException, serializers.ValidationError):
             raise
         except Exception as e:
-            logger.error(f"Erro inesperado no registro: {str(e)}", exc_info=True)
+            logger.error("Erro inesperado no registro: %s", e, exc_info=True)
             raise ValidationException(
                 message="Erro interno durante o registro.",
                 code="registration_internal_error"
@@ -235,7 +285,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 user = serializer.validated_data['user']
                 refresh = RefreshToken.for_user(user)
                 
-                logger.info(f"Login realizado com sucesso para usuário: {user.cpf}")
+                logger.info("Login realizado com sucesso para usuário: %s", user.cpf)
                 
                 return Response({
                     'success': True,
@@ -247,7 +297,7 @@ class UserViewSet(viewsets.ModelViewSet):
                     'message': 'Login realizado com sucesso.'
                 }, status=status.HTTP_200_OK)
             else:
-                logger.warning(f"Tentativa de login com dados inválidos: {request.data.get('cpf', 'N/A')}")
+                logger.warning("Tentativa de login com dados inválidos: %s", request.data.get('cpf', 'N/A'))
                 raise ValidationException(
                     message="Dados de login inválidos.",
                     code="invalid_login_data"
@@ -255,7 +305,7 @@ class UserViewSet(viewsets.ModelViewSet):
         except ValidationException:
             raise
         except Exception as e:
-            logger.error(f"Erro inesperado no login: {str(e)}", exc_info=True)
+            logger.error("Erro inesperado no login: %s", e, exc_info=True)
             raise AuthenticationException(
                 message="Erro interno durante o login.",
                 code="login_internal_error"
@@ -303,48 +353,45 @@ class UserViewSet(viewsets.ModelViewSet):
             try:
                 user = CustomUser.objects.get(email=email)
                 
-                # Invalidar tokens anteriores
-                PasswordResetToken.objects.filter(
-                    user=user, 
-                    used=False
-                ).update(used=True)
-                
-                # Criar novo token
-                reset_token = PasswordResetToken.objects.create(user=user)
-                
-                # Enviar email
-                reset_url = f"http://localhost:3000/redefinir-senha?token={reset_token.token}"
-                
-                subject = 'Redefinir senha - InvestSmart'
-                message = f"""
-                Olá {user.nome_completo},
-                
-                Você solicitou a redefinição de sua senha no InvestSmart.
-                
-                Clique no link abaixo para redefinir sua senha:
-                {reset_url}
-                
-                Este link é válido por 1 hora.
-                
-                Se você não solicitou esta redefinição, ignore este email.
-                
-                Atenciosamente,
-                Equipe InvestSmart
-                """
-                
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [user.email],
-                    fail_silently=False,
-                )
+                # Token e email são gravados na mesma transação; o envio
+                # fica com o comando enviar_emails, fora da requisição.
+                with transaction.atomic():
+                    # Invalidar tokens anteriores
+                    PasswordResetToken.objects.filter(
+                        user=user, 
+                        used=False
+                    ).update(used=True)
+                    
+                    # Criar novo token
+                    reset_token = PasswordResetToken.objects.create(user=user)
+                    
+                    # Enfileirar email
+                    reset_url = f"http://localhost:3000/redefinir-senha?token={reset_token.token}"
+                    
+                    subject = 'Redefinir senha - InvestSmart'
+                    message = f"""
+                    Olá {user.nome_completo},
+                    
+                    Você solicitou a redefinição de sua senha no InvestSmart.
+                    
+                    Clique no link abaixo para redefinir sua senha:
+                    {reset_url}
+                    
+                    Este link é válido por 1 hora.
+                    
+                    Se você não solicitou esta redefinição, ignore este email.
+                    
+                    Atenciosamente,
+                    Equipe InvestSmart
+                    """
+                    
+                    enfileirar_email(user.email, subject, message)
                 
-                logger.info(f"Password reset email sent to {email}")
+                logger.info("Password reset email queued for %s", email)
                 
             except CustomUser.DoesNotExist:
                 # Por segurança, não revelamos se o email existe ou não
-                logger.warning(f"Password reset attempted for non-existent email: {email}")
+                logger.warning("Password reset attempted for non-existent email: %s", email)
             
             return Response({
                 'success': True,
@@ -352,7 +399,7 @@ class UserViewSet(viewsets.ModelViewSet):
             })
             
         except ValidationException as e:
-            logger.error(f"Validation error in forgot password: {e}")
+            logger.error("Validation error in forgot password: %s", e)
             return Response(
                 {
                     'success': False,
@@ -365,7 +412,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Unexpected error in forgot password: {e}")
+            logger.error("Unexpected error in forgot password: %s", e)
             return Response(
                 {
                     'success': False,
@@ -453,7 +500,7 @@ class UserViewSet(viewsets.ModelViewSet):
                     used=False
                 ).update(used=True)
                 
-                logger.info(f"Password reset successful for user {user.email}")
+                logger.info("Password reset successful for user %s", user.email)
                 
                 return Response({
                     'success': True,
@@ -467,7 +514,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 )
             
         except ValidationException as e:
-            logger.error(f"Validation error in reset password: {e}")
+            logger.error("Validation error in reset password: %s", e)
             return Response(
                 {
                     'success': False,
@@ -480,7 +527,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         except Exception as e:
-            logger.error(f"Unexpected error in reset password: {e}")
+            logger.error("Unexpected error in reset password: %s", e)
             return Response(
                 {
                     'success': False,
@@ -510,7 +557,7 @@ class UserViewSet(viewsets.ModelViewSet):
             token = RefreshToken(refresh_token)
             token.blacklist()
             
-            logger.info(f"Logout realizado com sucesso para usuário: {request.user.cpf if request.user.is_authenticated else 'N/A'}")
+            logger.info("Logout realizado com sucesso para usuário: %s", request.user.cpf if request.user.is_authenticated else 'N/A')
             
             return Response({
                 'success': True,
@@ -520,12 +567,25 @@ class UserViewSet(viewsets.ModelViewSet):
         except ValidationException:
             raise
         except Exception as e:
-            logger.warning(f"Tentativa de logout com token inválido: {str(e)}")
+            logger.warning("Tentativa de logout com token inválido: %s", e)
             raise ValidationException(
                 message="Token inválido ou expirado.",
                 code="invalid_refresh_token"
             )
     
+    @action(detail=False, methods=['get'])
+    def limites(self, request):
+        """
+        Requisições rejeitadas pelos limites de taxa, por escopo (admin).
+        GET /users/limites/
+        """
+        return Response({
+            'success': True,
+            'data': {
+                'rejeicoes': contadores_rejeicao()
+            }
+        })
+    
     @action(detail=False, methods=['get', 'put', 'patch'])
     def me(self, request):
         """
@@ -535,11 +595,11 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         try:
             if request.method == 'GET':
-                serializer = UserDetailSerializer(request.user)
+                # request.user já vem com o perfil do cache de autenticação
                 return Response({
                     'success': True,
                     'data': {
-                        'user': serializer.data
+                        'user': UserDetailSerializer(request.user).data
                     }
                 }, status=status.HTTP_200_OK)
             
@@ -563,7 +623,7 @@ class UserViewSet(viewsets.ModelViewSet):
                         user_serializer.save()
                         perfil_serializer.save()
                     
-                    logger.info(f"Perfil atualizado com sucesso para usuário: {request.user.cpf}")
+                    logger.info("Perfil atualizado com sucesso para usuário: %s", request.user.cpf)
                     
                     # Retorna dados atualizados
                     response_serializer = UserDetailSerializer(request.user)
@@ -575,7 +635,7 @@ class UserViewSet(viewsets.ModelViewSet):
                         'message': 'Perfil atualizado com sucesso!'
                     }, status=status.HTTP_200_OK)
                 else:
-                    logger.warning(f"Tentativa de atualização de perfil com dados inválidos: {request.user.cpf}")
+                    logger.warning("Tentativa de atualização de perfil com dados inválidos: %s", request.user.cpf)
                     raise ValidationException(
                         message="Dados de perfil inválidos.",
                         code="invalid_profile_data"
@@ -583,8 +643,68 @@ class UserViewSet(viewsets.ModelViewSet):
         except ValidationException:
             raise
         except Exception as e:
-            logger.error(f"Erro inesperado na atualização do perfil: {str(e)}", exc_info=True)
+            logger.error("Erro inesperado na atualização do perfil: %s", e, exc_info=True)
             raise ValidationException(
                 message="Erro interno durante a atualização do perfil.",
                 code="profile_internal_error"
-            )
\ No newline at end of file
+            )
+
+@require_safe
+def foto_perfil(request, hash_foto, tamanho):
+    """
+    Serve uma foto de perfil gravada por users.fotos.
+    GET /users/fotos/<hash>/<p|m|g>/
+
+    O conteúdo nunca muda para uma mesma URL (endereçado por hash), então
+    a resposta pode ficar em cache indefinidamente.
+    """
+    etag = f'"{hash_foto}-{tamanho}"'
+    if request.headers.get('If-None-Match') == etag:
+        resposta = HttpResponseNotModified()
+    else:
+        arquivo = abrir_foto(hash_foto, tamanho)
+        if arquivo is None:
+            raise Http404
+        resposta = FileResponse(arquivo, content_type='image/webp')
+    resposta['ETag'] = etag
+    resposta['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resposta
+
+
+def _conexao_local(request):
+    try:
+        return ipaddress.ip_address(request.META.get('REMOTE_ADDR', '')).is_loopback
+    except ValueError:
+        return False
+
+
+@require_safe
+def metricas_prometheus(request):
+    """
+    Métricas no formato de texto do Prometheus.
+    GET /metrics
+
+    Histogramas por rota de users.metricas (somados entre os workers),
+    rejeições dos limites de taxa, logs descartados por fila cheia e
+    profundidade da fila de emails. Exige
+    'Authorization: Bearer <METRICAS_TOKEN>'; sem o token configurado, só
+    atende conexões de loopback (o Prometheus na mesma máquina).
+    """
+    if settings.METRICAS_TOKEN:
+        if not constant_time_compare(
+            request.headers.get('Authorization', ''), f'Bearer {settings.METRICAS_TOKEN}'
+        ):
+            return HttpResponse(status=401)
+    elif not _conexao_local(request):
+        return HttpResponse(status=403)
+
+    fila = profundidade_fila()
+    extras = [
+        ('investsmart_limite_rejeicoes_total', 'counter', "Requisições rejeitadas pelos limites de taxa.",
+         [(f'escopo="{escopo}"', total) for escopo, total in contadores_rejeicao().items()]),
+        ('investsmart_logs_descartados_total', 'counter', "Registros de log descartados com a fila cheia.",
+         [('', logs_descartados())]),
+        ('investsmart_emails_fila', 'gauge', "Emails na caixa de saída por situação.",
+         [(f'situacao="{situacao}"', total) for situacao, total in fila.items()]),
+    ]
+    return HttpResponse(metricas.exportar(extras), content_type='text/plain; version=0.0.4; charset=utf-8')
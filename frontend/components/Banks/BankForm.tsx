@@ -22,6 +22,7 @@ import { Command, CommandEmpty, CommandGroup, CommandInput, CommandItem } from "
 import { Popover, PopoverContent, PopoverTrigger } from "@/components/ui/popover"
 import { Check, ChevronsUpDown } from "lucide-react"
 import { cn } from "@/lib/utilities/utils"
+import { searchBankCatalog } from "@/services/banks/banks"
 
 interface Banco {
   nome: string
@@ -74,8 +75,7 @@ export function BankForm({ onAdd, onEdit, editingBank, editingIndex, trigger }:
     
     setLoading(true)
     try {
-      const response = await fetch(`/api/banks?search=${encodeURIComponent(search)}`)
-      const data = await response.json()
+      const data = await searchBankCatalog(search)
       
       if (data.success) {
         setBancos(data.data)
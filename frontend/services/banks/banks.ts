@@ -27,4 +27,8 @@ export const getBank = async (bancoId: string) => {
 export const deleteBank = async (bancoId: string) => {
   const response = await api.delete(`/api/bancos/${bancoId}/`);
   return response.data;
-};
\ No newline at end of file
+};
+export const searchBankCatalog = async (search: string) => {
+  const response = await api.get('/api/bancos/catalogo/', { params: { q: search } });
+  return response.data;
+};